@@ -1,9 +1,141 @@
+import sys
+import time
+
+# --profile-startup has to start the clock and profiler before the other
+# imports run, so it is checked here rather than in the argument parser.
+STARTUP_BEGAN = time.perf_counter()
+STARTUP_PROFILER = None
+if __name__ == "__main__" and "--profile-startup" in sys.argv:
+    import cProfile
+    STARTUP_PROFILER = cProfile.Profile()
+    STARTUP_PROFILER.enable()
+
 import tkinter as tk
-from tkinter import ttk, filedialog, scrolledtext
-from PIL import Image, ImageTk
-import calendar
-from datetime import datetime, timedelta
-from tkcalendar import Calendar
+from tkinter import ttk, filedialog, messagebox, scrolledtext
+import os
+import queue
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
+from socialsync.media import MediaIngestor, media_kind
+from socialsync.profiles import ProfileIndex, max_profile_id, pending_counts
+from socialsync.recurrence import PRESETS, RecurrenceRules
+from socialsync.schedule_index import ScheduleIndex
+from socialsync.search import PostSearch, needs_rebuild
+from socialsync.store import ScheduleStore
+from socialsync.timezones import GAP, OVERLAP
+
+IMPORTS_DONE = time.perf_counter()
+
+# Pillow, the variant renderer (Pillow plus a process pool) and the importer
+# are loaded on first use by the media and import features only.
+
+def image_tk():
+    from PIL import ImageTk
+    return ImageTk
+
+# Chip colors (background, text) for each platform in the calendar
+PLATFORM_COLORS = {
+    "Facebook": ("#1877F2", "#FFFFFF"),
+    "Twitter": ("#1DA1F2", "#FFFFFF"),
+    "Instagram": ("#E1306C", "#FFFFFF"),
+    "LinkedIn": ("#0A66C2", "#FFFFFF"),
+    "TikTok": ("#25F4EE", "#000000"),
+    "YouTube": ("#FF0000", "#FFFFFF"),
+    "Pinterest": ("#E60023", "#FFFFFF"),
+    "Snapchat": ("#FFFC00", "#000000"),
+    "RedNote": ("#FF2442", "#FFFFFF"),
+    "Lemon8": ("#F9E547", "#000000")
+}
+
+# Fixed number of post chips each day cell owns
+CHIPS_PER_DAY = 3
+
+# Day post list: rows have a fixed height so only visible ones get widgets
+POST_LIST_WIDTH = 360
+POST_ROW_HEIGHT = 44
+POST_CAPTION_CHARS = 120
+WHEEL_ROWS = 2
+
+# Profile sidebar: same virtual rows, over an index loaded after startup
+SIDEBAR_WIDTH = 200
+PROFILE_ROW_HEIGHT = 26
+PROFILE_POLL_MS = 50
+PROFILE_REFRESH_MS = 5000
+ALL_PLATFORMS = "All platforms"
+POST_SORTS = {
+    "Time": lambda post: (post['when'], str(post['id'])),
+    "Platform": lambda post: (post['platform'] or "", post['when'], str(post['id'])),
+    "Status": lambda post: (post['status'] or "", post['when'], str(post['id']))
+}
+
+# Bind tag shared by every widget of a calendar day cell
+DAY_CELL_TAG = "DayCell"
+
+# How strongly the calendar tints the best weekday (0-1 blend with "button")
+BEST_DAY_TINT = 0.35
+
+# Suggested times offered in the schedule dialog
+SUGGESTED_SLOTS = 3
+
+# Schedules search box: pause before querying, and rows shown
+SEARCH_DELAY_MS = 250
+SEARCH_LIMIT = 50
+
+# How often new engagement rows are folded into the heatmaps
+ENGAGEMENT_REFRESH_MS = 60000
+
+# Captions fingerprinted on the Tk thread when a post is saved; a larger
+# backlog (first run, imports) is worked off on a thread in chunks
+SAVE_REFRESH = 500
+CAPTION_DRAIN_CHUNK = 1000
+
+# Auto-place looks this many days ahead for legal slots
+AUTO_PLACE_DAYS = 14
+
+# ttk theme for the Platform Algorithms notebook
+DARK_THEME = {
+    "TNotebook": {
+        "configure": {
+            "background": "#151517",
+            "tabmargins": [2, 5, 2, 0],
+            "padding": [10, 5]
+        }
+    },
+    "TNotebook.Tab": {
+        "configure": {
+            "background": "#1E1E1E",
+            "foreground": "#FFFFFF",
+            "padding": [15, 5],
+            "font": ('Helvetica', 10)
+        },
+        "map": {
+            "background": [("selected", "#1890ff")],
+            "foreground": [("selected", "#FFFFFF")],
+            "expand": [("selected", [1, 1, 1, 0])]
+        }
+    },
+    "TFrame": {
+        "configure": {
+            "background": "#151517"
+        }
+    }
+}
+
+
+def blend(color_a, color_b, amount):
+    # Mix two "#rrggbb" colors; amount 0 gives color_a, 1 gives color_b
+    a = [int(color_a[i:i + 2], 16) for i in (1, 3, 5)]
+    b = [int(color_b[i:i + 2], 16) for i in (1, 3, 5)]
+    return "#" + "".join(f"{round(x + (y - x) * amount):02x}" for x, y in zip(a, b))
+
+
+def use_dark_theme():
+    style = ttk.Style()
+    if "dark" not in style.theme_names():
+        style.theme_create("dark", parent="alt", settings=DARK_THEME)
+    style.theme_use("dark")
+
 
 class PostingInterface:
     def __init__(self, root):
@@ -23,6 +155,20 @@ class PostingInterface:
         
         self.root.configure(bg=self.colors["bg"])
         
+        # Persistent schedule storage
+        self.store = ScheduleStore()
+        
+        # Media probing and thumbnails run off the Tk thread
+        self.media_ingestor = MediaIngestor(self.root)
+        self.media_preparer = None
+        self.media_path = None
+        self.media_request = None
+        
+        # Views and help windows are built the first time they are shown
+        self.views = {}
+        self.current_view = None
+        self.info_windows = {}
+        
         # Create main layout
         self.create_navbar()
         self.create_main_layout()
@@ -50,7 +196,7 @@ class PostingInterface:
         nav_buttons = {
             "Post": self.show_post_content,
             "Schedules": self.show_schedule_content,
-            "MonoLink": lambda: None  # Placeholder for MonoLink
+            "MonoLink": self.show_monolink_content
         }
         
         for btn_text, command in nav_buttons.items():
@@ -82,7 +228,17 @@ class PostingInterface:
             btn.pack(side=tk.RIGHT, padx=5)
 
     def show_info_window(self, window_type):
+        # Reuse the window if it was opened before; closing only hides it
+        info_window = self.info_windows.get(window_type)
+        if info_window is not None and info_window.winfo_exists():
+            info_window.deiconify()
+            info_window.lift()
+            info_window.focus_set()
+            return
+        
         info_window = tk.Toplevel(self.root)
+        info_window.protocol("WM_DELETE_WINDOW", info_window.withdraw)
+        self.info_windows[window_type] = info_window
         info_window.configure(bg=self.colors["bg"])
         info_window.geometry("800x600")
         
@@ -134,36 +290,8 @@ For additional support, please contact support@example.com
     def create_algorithm_content(self, window):
         window.configure(bg="#151517")
         
-        # Style configuration for the notebook
-        style = ttk.Style()
-        style.theme_create("dark", parent="alt", settings={
-            "TNotebook": {
-                "configure": {
-                    "background": "#151517",
-                    "tabmargins": [2, 5, 2, 0],
-                    "padding": [10, 5]
-                }
-            },
-            "TNotebook.Tab": {
-                "configure": {
-                    "background": "#1E1E1E",
-                    "foreground": "#FFFFFF",
-                    "padding": [15, 5],
-                    "font": ('Helvetica', 10)
-                },
-                "map": {
-                    "background": [("selected", "#1890ff")],
-                    "foreground": [("selected", "#FFFFFF")],
-                    "expand": [("selected", [1, 1, 1, 0])]
-                }
-            },
-            "TFrame": {
-                "configure": {
-                    "background": "#151517"
-                }
-            }
-        })
-        style.theme_use("dark")
+        # The "dark" ttk theme is registered once per interpreter
+        use_dark_theme()
 
         # Create notebook with custom style
         notebook = ttk.Notebook(window)
@@ -181,49 +309,60 @@ For additional support, please contact support@example.com
             "Lemon8": {"color": "#1E1E1E", "text": "#FFFFFF"}
         }
 
-        # Create tabs for each platform
-        for platform, colors in platforms.items():
-            frame = ttk.Frame(notebook)
-            notebook.add(frame, text=platform)
-            
-            text_widget = scrolledtext.ScrolledText(
-                frame,
-                bg="#1E1E1E",
-                fg="#FFFFFF",
-                font=("Helvetica", 11),
-                padx=20,
-                pady=20,
-                insertbackground="#FFFFFF",  # Cursor color
-                selectbackground="#1890ff",  # Selection background
-                selectforeground="#FFFFFF",  # Selection text color
-                borderwidth=0,
-                highlightthickness=0
-            )
-            text_widget.pack(fill=tk.BOTH, expand=True)
-            
-            # Add custom tags for formatting
-            text_widget.tag_configure("heading1", 
-                font=("Helvetica", 16, "bold"), 
-                foreground="#1890ff"
-            )
-            text_widget.tag_configure("heading2", 
-                font=("Helvetica", 14, "bold"),
-                foreground="#FFFFFF"
-            )
-            text_widget.tag_configure("bullet", 
-                font=("Helvetica", 11),
-                foreground="#CCCCCC"
-            )
-            
-            # Insert content with formatting
-            content = self.get_platform_content(platform)
-            text_widget.insert(tk.END, content)
-            
-            # Apply formatting to headings and bullets
-            text_widget.tag_add("heading1", "1.0", "1.end")
-            
-            # Make text read-only
-            text_widget.configure(state='disabled')
+        # Tabs start empty and are filled the first time they are selected
+        for platform in platforms:
+            notebook.add(ttk.Frame(notebook), text=platform)
+        filled = set()
+        
+        def fill_selected(event=None):
+            frame = notebook.nametowidget(notebook.select())
+            if frame in filled:
+                return
+            filled.add(frame)
+            self.fill_algorithm_tab(frame, notebook.tab(frame, "text"))
+        
+        notebook.bind("<<NotebookTabChanged>>", fill_selected)
+        fill_selected()
+
+    def fill_algorithm_tab(self, frame, platform):
+        text_widget = scrolledtext.ScrolledText(
+            frame,
+            bg="#1E1E1E",
+            fg="#FFFFFF",
+            font=("Helvetica", 11),
+            padx=20,
+            pady=20,
+            insertbackground="#FFFFFF",  # Cursor color
+            selectbackground="#1890ff",  # Selection background
+            selectforeground="#FFFFFF",  # Selection text color
+            borderwidth=0,
+            highlightthickness=0
+        )
+        text_widget.pack(fill=tk.BOTH, expand=True)
+        
+        # Add custom tags for formatting
+        text_widget.tag_configure("heading1", 
+            font=("Helvetica", 16, "bold"), 
+            foreground="#1890ff"
+        )
+        text_widget.tag_configure("heading2", 
+            font=("Helvetica", 14, "bold"),
+            foreground="#FFFFFF"
+        )
+        text_widget.tag_configure("bullet", 
+            font=("Helvetica", 11),
+            foreground="#CCCCCC"
+        )
+        
+        # Insert content with formatting
+        content = self.get_platform_content(platform)
+        text_widget.insert(tk.END, content)
+        
+        # Apply formatting to headings and bullets
+        text_widget.tag_add("heading1", "1.0", "1.end")
+        
+        # Make text read-only
+        text_widget.configure(state='disabled')
 
     def get_platform_content(self, platform):
         # Platform-specific content remains the same as before
@@ -279,52 +418,30 @@ For additional support, please contact support@example.com
         )
         self.content_area.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        # Create different content frames
-        self.post_content = self.create_post_content()
-        self.schedule_content = self.create_schedule_content()
+        # Content frames are created on first navigation
+        self.view_builders = {
+            "post": self.create_post_content,
+            "schedule": self.create_schedule_content,
+            "monolink": self.create_monolink_content
+        }
         
         # Initially show post content
         self.show_post_content()
 
     def create_sidebar(self):
-        # Sidebar frame
-        self.sidebar = tk.Frame(
-            self.main_container,
-            bg=self.colors["sidebar"],
-            width=200
-        )
+        # Profiles of every platform, read from the database once the
+        # window is up
+        self.profile_sidebar = ProfileSidebar(self.main_container, self.colors, self.store)
+        self.sidebar = self.profile_sidebar.frame
         self.sidebar.pack(side=tk.LEFT, fill=tk.Y)
-        self.sidebar.pack_propagate(False)
-        
-        # Platform buttons
-        platforms = [
-            "Facebook", "Twitter", "Instagram", "LinkedIn",
-            "TikTok", "YouTube", "Pinterest", "Snapchat",
-            "RedNote", "Lemon8"
-        ]
-        
-        for platform in platforms:
-            btn = tk.Button(
-                self.sidebar,
-                text=platform,
-                bg=self.colors["sidebar"],
-                fg=self.colors["fg"],
-                relief=tk.FLAT,
-                padx=20,
-                pady=10,
-                anchor="w",
-                width=20,
-                activebackground=self.colors["hover"]
-            )
-            btn.pack(fill=tk.X, padx=5, pady=2)
 
     def create_post_content(self):
         # Post content area
         post_frame = tk.Frame(
             self.content_area,
-            bg=self.colors["bg"]
+            bg=self.colors["bg"],
+            pady=20
         )
-        post_frame.pack(fill=tk.BOTH, expand=True, pady=20)
         
         # Media upload area
         upload_frame = tk.LabelFrame(
@@ -344,7 +461,16 @@ For additional support, please contact support@example.com
             bg=self.colors["button"],
             fg=self.colors["fg"]
         )
-        upload_btn.pack(pady=20)
+        upload_btn.pack(pady=(20, 10))
+        
+        # Thumbnail and details of the selected file
+        self.media_preview = tk.Label(
+            upload_frame,
+            bg=self.colors["bg"],
+            fg=self.colors["fg"],
+            compound=tk.TOP
+        )
+        self.media_preview.pack(pady=(0, 10))
         
         # Post content area
         content_frame = tk.LabelFrame(
@@ -393,16 +519,79 @@ For additional support, please contact support@example.com
             bg=self.colors["bg"]
         )
         
-        self.schedule_calendar = ScheduleCalendar(schedule_frame, self.colors)
+        self.schedule_calendar = ScheduleCalendar(
+            schedule_frame,
+            self.colors,
+            self.store,
+            draft_provider=self.current_draft,
+            on_schedule=self.on_schedule
+        )
         return schedule_frame
 
+    def create_monolink_content(self):
+        # The redirect service module is only loaded once the view is opened
+        from socialsync.monolink import LinkStore
+        self.link_manager = LinkManager(
+            self.content_area,
+            self.colors,
+            LinkStore(self.store),
+            on_insert=self.insert_link
+        )
+        return self.link_manager.frame
+
+    def show_view(self, name):
+        view = self.views.get(name)
+        if view is None:
+            view = self.views[name] = self.view_builders[name]()
+        if self.current_view is not None and self.current_view is not view:
+            self.current_view.pack_forget()
+        view.pack(fill=tk.BOTH, expand=True)
+        self.current_view = view
+        return view
+
     def show_post_content(self):
-        self.schedule_content.pack_forget()
-        self.post_content.pack(fill=tk.BOTH, expand=True)
+        self.show_view("post")
 
     def show_schedule_content(self):
-        self.post_content.pack_forget()
-        self.schedule_content.pack(fill=tk.BOTH, expand=True)
+        self.show_view("schedule")
+
+    def show_monolink_content(self):
+        built = "monolink" in self.views
+        self.show_view("monolink")
+        if built:
+            self.link_manager.refresh()  # click counts moved on meanwhile
+
+    def insert_link(self, url):
+        # Add a short link to the caption being written
+        self.show_post_content()
+        self.content_text.insert(tk.INSERT, url)
+        self.content_text.focus_set()
+
+    def current_draft(self):
+        # Caption and media from the Post view, used when scheduling
+        return {
+            'caption': self.content_text.get("1.0", tk.END).strip(),
+            'media_path': self.media_path,
+            'content_type': media_kind(self.media_path) if self.media_path else "text"
+        }
+
+    def on_schedule(self, media_path, platforms):
+        self.prepare_media(media_path, platforms)
+        self.profile_sidebar.refresh()
+
+    def prepare_media(self, media_path, platforms):
+        # Render platform variants in the background so the dispatcher
+        # finds them already cached
+        if media_path and platforms:
+            self.media_ingestor.pool.submit(
+                self.get_media_preparer().submit, [(media_path, platforms)]
+            )
+
+    def get_media_preparer(self):
+        if self.media_preparer is None:
+            from socialsync.variants import MediaPreparer
+            self.media_preparer = MediaPreparer()
+        return self.media_preparer
 
     def upload_media(self):
         file_path = filedialog.askopenfilename(
@@ -412,16 +601,558 @@ For additional support, please contact support@example.com
             ]
         )
         if file_path:
-            print(f"Selected file: {file_path}")
+            self.media_request = file_path
+            self.media_preview.config(image="", text="Processing...")
+            self.media_ingestor.submit(file_path, self.on_media_ready)
+
+    def on_media_ready(self, path, info, error):
+        # Called on the Tk thread; ignore results for superseded selections
+        if path != self.media_request:
+            return
+        if error is not None:
+            self.media_path = None
+            self.media_preview.config(image="", text=f"Could not load media: {error}")
+            return
+        
+        self.media_path = info['path']
+        details = [os.path.basename(info['path'])]
+        if info['width'] and info['height']:
+            details.append(f"{info['width']}x{info['height']}")
+        if info['codec']:
+            details.append(info['codec'])
+        if info['duration']:
+            details.append(f"{info['duration']:.1f}s")
+        details.append(f"{info['size'] / 1024 ** 2:.1f} MB")
+        
+        # Keep a reference so Tk does not drop the image
+        self.media_thumbnail = None
+        if info['thumbnail'] is not None:
+            self.media_thumbnail = image_tk().PhotoImage(info['thumbnail'])
+        self.media_preview.config(
+            image=self.media_thumbnail or "",
+            text=" · ".join(details)
+        )
+
+class ProfileSidebar:
+    """Every profile, grouped by platform, with search and pending counts.
+
+    Built like PostList: rows have a fixed height and a pool of row
+    frames sized to the window is moved onto the rows in view, so the
+    widgets follow the window height, never the number of profiles. The
+    profiles themselves are read into a ProfileIndex on a worker thread
+    once the window is idle; until then the sidebar says so. Pending
+    counts are read for the profiles in view only, and read again on
+    refresh.
+    """
+
+    def __init__(self, parent, colors, store):
+        self.colors = colors
+        self.store = store
+        self.index = None
+        self.loading = False
+        self.rows = []          # (platform, None) headers and (platform, position) profiles
+        self.group_counts = {}  # platform -> matching profiles
+        self.counts = {}        # profile id -> pending posts, read since the last refresh
+        self.collapsed = set()
+        self.selected = None    # profile id
+        self.pool = []
+        self.width = 1
+        
+        self.frame = tk.Frame(parent, bg=colors["sidebar"], width=SIDEBAR_WIDTH)
+        self.frame.pack_propagate(False)
+        
+        # Filters on every keystroke: the index is in memory
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.apply(reset=True))
+        tk.Entry(
+            self.frame,
+            textvariable=self.search_var,
+            bg=colors["border"],
+            fg=colors["fg"],
+            insertbackground=colors["fg"],
+            relief=tk.FLAT
+        ).pack(fill=tk.X, padx=5, pady=(10, 2))
+        self.status = tk.Label(
+            self.frame,
+            text="Loading profiles...",
+            bg=colors["sidebar"],
+            fg=colors["fg"],
+            font=("Helvetica", 8),
+            anchor="w"
+        )
+        self.status.pack(fill=tk.X, padx=5, pady=(0, 5))
+        
+        body = tk.Frame(self.frame, bg=colors["sidebar"])
+        body.pack(fill=tk.BOTH, expand=True)
+        self.scrollbar = tk.Scrollbar(body, orient=tk.VERTICAL)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(
+            body,
+            bg=colors["sidebar"],
+            highlightthickness=0,
+            yscrollincrement=PROFILE_ROW_HEIGHT,
+            yscrollcommand=self.on_scroll
+        )
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.config(command=self.canvas.yview)
+        self.empty = self.canvas.create_text(
+            10, 10,
+            text="No matching profiles",
+            fill=colors["fg"],
+            anchor="nw",
+            state="hidden"
+        )
+        self.canvas.bind("<Configure>", self.on_resize)
+        self.bind_wheel(self.canvas)
+        self.frame.after_idle(self.load)
+
+    def load(self):
+        # Read the profiles on a worker thread with its own connection
+        if self.loading:
+            return
+        self.loading = True
+        results = queue.Queue()
+        
+        def work():
+            # Always post a result, or finish_load would poll forever
+            try:
+                store = ScheduleStore(self.store.path)
+                try:
+                    results.put(ProfileIndex.from_store(store))
+                finally:
+                    store.close()
+            except Exception as e:
+                results.put(e)
+        
+        threading.Thread(target=work, daemon=True).start()
+        self.frame.after(PROFILE_POLL_MS, self.finish_load, results)
+
+    def finish_load(self, results):
+        try:
+            index = results.get_nowait()
+        except queue.Empty:
+            self.frame.after(PROFILE_POLL_MS, self.finish_load, results)
+            return
+        
+        self.loading = False
+        if isinstance(index, Exception):
+            self.status.config(text=f"Could not load profiles: {index}")
+            return
+        if self.index is None:
+            self.frame.after(PROFILE_REFRESH_MS, self.tick)
+        self.index = index
+        self.counts = {}
+        for row in self.pool:
+            row['content'] = None  # positions now name other profiles
+        self.apply()
+
+    def tick(self):
+        self.refresh()
+        self.frame.after(PROFILE_REFRESH_MS, self.tick)
+
+    def refresh(self):
+        """Re-read the pending counts in view, or every profile if one was added."""
+        if self.index is None:
+            return
+        if max_profile_id(self.store) != self.index.max_id:
+            self.load()
+            return
+        self.counts = {}
+        self.layout()
+
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self.on_wheel)
+        widget.bind("<Button-4>", lambda event: self.canvas.yview_scroll(-WHEEL_ROWS, "units"))
+        widget.bind("<Button-5>", lambda event: self.canvas.yview_scroll(WHEEL_ROWS, "units"))
+
+    def on_wheel(self, event):
+        self.canvas.yview_scroll(-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS, "units")
+
+    def make_row(self):
+        frame = tk.Frame(self.canvas, bg=self.colors["sidebar"])
+        frame.pack_propagate(False)
+        count = tk.Label(
+            frame,
+            bg=self.colors["sidebar"],
+            fg=self.colors["fg"],
+            font=("Helvetica", 8),
+            anchor="e"
+        )
+        count.pack(side=tk.RIGHT, padx=(0, 5))
+        name = tk.Label(frame, bg=self.colors["sidebar"], fg=self.colors["fg"], anchor="w")
+        name.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        window = self.canvas.create_window(
+            0, 0,
+            window=frame,
+            anchor="nw",
+            width=self.width,
+            height=PROFILE_ROW_HEIGHT - 2,
+            state="hidden"
+        )
+        row = {
+            'window': window,
+            'widgets': (frame, name, count),
+            'name': name,
+            'count': count,
+            'index': None,
+            'content': None
+        }
+        for widget in row['widgets']:
+            self.bind_wheel(widget)
+            widget.bind("<Button-1>", lambda event: self.on_click(row))
+        return row
+
+    def fill_row(self, row, content):
+        platform, position, marked, count = content
+        if position is None:
+            # Header: marked when collapsed, count of matching profiles
+            bg = self.colors["sidebar"]
+            fg = PLATFORM_COLORS.get(platform, (self.colors["button"],))[0]
+            arrow = "▸" if marked else "▾"
+            row['name'].config(
+                text=f"{arrow} {platform}  ({count})",
+                font=("Helvetica", 10, "bold"),
+                fg=fg,
+                padx=5
+            )
+            row['count'].config(text="")
+        else:
+            # Profile: marked when selected, count of pending posts
+            bg = self.colors["hover"] if marked else self.colors["sidebar"]
+            row['name'].config(
+                text=self.index.names[position],
+                font=("Helvetica", 10),
+                fg=self.colors["fg"],
+                padx=20
+            )
+            row['count'].config(text=str(count) if count else "")
+        for widget in row['widgets']:
+            widget.config(bg=bg)
+        row['content'] = content
+
+    def apply(self, reset=False):
+        if self.index is None:
+            return
+        found = self.index.search(self.search_var.get())
+        self.rows, self.group_counts = self.index.grouped(found, self.collapsed)
+        
+        total = len(self.index)
+        shown = f"{len(found)} of {total}" if len(found) != total else total
+        self.status.config(text=f"{shown} profiles")
+        self.canvas.itemconfigure(self.empty, state="hidden" if self.rows else "normal")
+        self.canvas.config(scrollregion=(0, 0, self.width, len(self.rows) * PROFILE_ROW_HEIGHT))
+        if reset:
+            self.canvas.yview_moveto(0)
+        self.layout()
+
+    def on_click(self, row):
+        if row['content'] is None:
+            return
+        platform, position = row['content'][:2]
+        if position is None:
+            self.collapsed ^= {platform}
+            self.apply()
+        else:
+            self.selected = self.index.ids[position]
+            self.layout()
+
+    def on_resize(self, event):
+        self.width = event.width
+        wanted = event.height // PROFILE_ROW_HEIGHT + 2
+        while len(self.pool) < wanted:
+            self.pool.append(self.make_row())
+        for row in self.pool:
+            self.canvas.itemconfigure(row['window'], width=self.width)
+            row['index'] = None
+        self.canvas.config(scrollregion=(0, 0, self.width, len(self.rows) * PROFILE_ROW_HEIGHT))
+        self.layout()
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.layout()
+
+    def layout(self):
+        # Same pool rotation as PostList.layout; pending counts of the
+        # profiles coming into view are read in one query
+        if not self.pool or self.index is None:
+            return
+        first = max(0, int(self.canvas.canvasy(0)) // PROFILE_ROW_HEIGHT)
+        ids = self.index.ids
+        missing = [
+            ids[position] for _, position in self.rows[first:first + len(self.pool)]
+            if position is not None and ids[position] not in self.counts
+        ]
+        if missing:
+            self.counts.update(pending_counts(self.store, missing))
+        for index in range(first, first + len(self.pool)):
+            row = self.pool[index % len(self.pool)]
+            if index >= len(self.rows):
+                if row['index'] is not None or row['content'] is not None:
+                    self.canvas.itemconfigure(row['window'], state="hidden")
+                    row['index'] = row['content'] = None
+                continue
+            if row['index'] != index:
+                self.canvas.coords(row['window'], 0, index * PROFILE_ROW_HEIGHT)
+                if row['index'] is None:
+                    self.canvas.itemconfigure(row['window'], state="normal")
+                row['index'] = index
+            platform, position = self.rows[index]
+            if position is None:
+                content = (platform, None, platform in self.collapsed, self.group_counts[platform])
+            else:
+                profile_id = ids[position]
+                content = (platform, position, profile_id == self.selected, self.counts[profile_id])
+            if row['content'] != content:
+                self.fill_row(row, content)
+
+
+class PostList:
+    """Scrolling list of one day's posts that only builds the visible rows.
+
+    Rows have a fixed height, so the canvas scroll region stands in for
+    the whole list and a small pool of row frames is moved onto whichever
+    rows are in view. The pool follows the window height, never the
+    number of posts.
+    """
 
-class ScheduleCalendar:
     def __init__(self, parent, colors):
+        self.colors = colors
+        self.day = None
+        self.source = []  # the day's posts in time order, as given
+        self.rows = []    # filtered and sorted
+        self.pool = []
+        self.width = 1
+        
+        self.frame = tk.Frame(parent, bg=colors["bg"], width=POST_LIST_WIDTH)
+        self.frame.pack_propagate(False)
+        
+        self.title = tk.Label(
+            self.frame,
+            text="",
+            bg=colors["bg"],
+            fg=colors["fg"],
+            font=("Helvetica", 12, "bold"),
+            anchor="w"
+        )
+        self.title.pack(fill=tk.X)
+        
+        # Sort order and platform filter
+        toolbar = tk.Frame(self.frame, bg=colors["bg"])
+        toolbar.pack(fill=tk.X, pady=(5, 10))
+        self.sort_var = tk.StringVar(value="Time")
+        sort_menu = tk.OptionMenu(toolbar, self.sort_var, *POST_SORTS, command=lambda value: self.apply())
+        self.platform_var = tk.StringVar(value=ALL_PLATFORMS)
+        self.platform_menu = tk.OptionMenu(toolbar, self.platform_var, ALL_PLATFORMS)
+        for menu in (sort_menu, self.platform_menu):
+            menu.config(
+                bg=colors["border"],
+                fg=colors["fg"],
+                activebackground=colors["hover"],
+                activeforeground=colors["fg"],
+                highlightthickness=0,
+                bd=0
+            )
+            menu.pack(side=tk.LEFT, padx=(0, 5))
+        
+        body = tk.Frame(self.frame, bg=colors["bg"])
+        body.pack(fill=tk.BOTH, expand=True)
+        self.scrollbar = tk.Scrollbar(body, orient=tk.VERTICAL)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(
+            body,
+            bg=colors["bg"],
+            highlightthickness=0,
+            yscrollincrement=POST_ROW_HEIGHT,
+            yscrollcommand=self.on_scroll
+        )
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.config(command=self.canvas.yview)
+        self.empty = self.canvas.create_text(
+            10, 10,
+            text="No posts on this day",
+            fill=colors["fg"],
+            anchor="nw",
+            state="hidden"
+        )
+        self.canvas.bind("<Configure>", self.on_resize)
+        self.bind_wheel(self.canvas)
+
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self.on_wheel)
+        widget.bind("<Button-4>", lambda event: self.canvas.yview_scroll(-WHEEL_ROWS, "units"))
+        widget.bind("<Button-5>", lambda event: self.canvas.yview_scroll(WHEEL_ROWS, "units"))
+
+    def on_wheel(self, event):
+        self.canvas.yview_scroll(-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS, "units")
+
+    def make_row(self):
+        frame = tk.Frame(self.canvas, bg=self.colors["sidebar"], padx=8)
+        frame.pack_propagate(False)
+        time_label = tk.Label(
+            frame,
+            bg=self.colors["sidebar"],
+            fg=self.colors["fg"],
+            font=("Helvetica", 10, "bold"),
+            width=8,
+            anchor="w"
+        )
+        time_label.pack(side=tk.LEFT)
+        chip = tk.Label(frame, font=("Helvetica", 8), width=10, padx=4)
+        chip.pack(side=tk.LEFT, padx=(0, 8))
+        status = tk.Label(
+            frame,
+            bg=self.colors["sidebar"],
+            fg=self.colors["fg"],
+            font=("Helvetica", 8),
+            anchor="e"
+        )
+        status.pack(side=tk.RIGHT)
+        caption = tk.Label(frame, bg=self.colors["sidebar"], fg=self.colors["fg"], anchor="w")
+        caption.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        for widget in (frame, time_label, chip, caption, status):
+            self.bind_wheel(widget)
+        window = self.canvas.create_window(
+            0, 0,
+            window=frame,
+            anchor="nw",
+            width=self.width,
+            height=POST_ROW_HEIGHT - 4,
+            state="hidden"
+        )
+        return {
+            'window': window,
+            'time': time_label,
+            'chip': chip,
+            'caption': caption,
+            'status': status,
+            'index': None,
+            'post': None
+        }
+
+    def fill_row(self, row, post):
+        bg, fg = PLATFORM_COLORS.get(post['platform'], (self.colors["button"], self.colors["fg"]))
+        caption = (post['caption'] or "").strip().split("\n", 1)[0]
+        row['time'].config(text=post['when'].strftime("%I:%M %p"))
+        row['chip'].config(text=post['platform'] or "", bg=bg, fg=fg)
+        row['caption'].config(text=caption[:POST_CAPTION_CHARS])
+        row['status'].config(text=post['status'] or "")
+        row['post'] = post
+
+    def show(self, day, posts):
+        """Show posts, the day's posts in time order (ScheduleIndex.posts_on)."""
+        if day == self.day and posts is self.source:
+            return
+        new_day = day != self.day
+        self.day, self.source = day, posts
+        
+        platforms = sorted({post['platform'] or "" for post in posts})
+        menu = self.platform_menu["menu"]
+        menu.delete(0, tk.END)
+        for name in [ALL_PLATFORMS] + platforms:
+            menu.add_command(label=name, command=lambda name=name: self.filter_platform(name))
+        if self.platform_var.get() not in platforms:
+            self.platform_var.set(ALL_PLATFORMS)
+        self.apply(reset=new_day)
+
+    def filter_platform(self, platform):
+        self.platform_var.set(platform)
+        self.apply(reset=True)
+
+    def apply(self, reset=False):
+        platform = self.platform_var.get()
+        rows = self.source
+        if platform != ALL_PLATFORMS:
+            rows = [post for post in rows if post['platform'] == platform]
+        sort = self.sort_var.get()
+        if sort != "Time":
+            rows = sorted(rows, key=POST_SORTS[sort])
+        self.rows = rows
+        
+        shown = f"{len(rows)} of {len(self.source)}" if len(rows) != len(self.source) else len(rows)
+        self.title.config(text=f"{self.day:%a %b %d, %Y}  ({shown})")
+        self.canvas.itemconfigure(self.empty, state="hidden" if rows else "normal")
+        self.canvas.config(scrollregion=(0, 0, self.width, len(rows) * POST_ROW_HEIGHT))
+        if reset:
+            self.canvas.yview_moveto(0)
+        self.layout()
+
+    def on_resize(self, event):
+        self.width = event.width
+        wanted = event.height // POST_ROW_HEIGHT + 2
+        while len(self.pool) < wanted:
+            self.pool.append(self.make_row())
+        for row in self.pool:
+            self.canvas.itemconfigure(row['window'], width=self.width)
+            row['index'] = None
+        self.canvas.config(scrollregion=(0, 0, self.width, len(self.rows) * POST_ROW_HEIGHT))
+        self.layout()
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.layout()
+
+    def layout(self):
+        # Row i always goes to pool[i % len(pool)]: scrolling by one row
+        # moves and refills a single frame
+        if not self.pool:
+            return
+        first = max(0, int(self.canvas.canvasy(0)) // POST_ROW_HEIGHT)
+        for index in range(first, first + len(self.pool)):
+            row = self.pool[index % len(self.pool)]
+            if index >= len(self.rows):
+                if row['index'] is not None or row['post'] is not None:
+                    self.canvas.itemconfigure(row['window'], state="hidden")
+                    row['index'] = row['post'] = None
+                continue
+            if row['index'] != index:
+                self.canvas.coords(row['window'], 0, index * POST_ROW_HEIGHT)
+                if row['index'] is None:
+                    self.canvas.itemconfigure(row['window'], state="normal")
+                row['index'] = index
+            post = self.rows[index]
+            if row['post'] is not post:
+                self.fill_row(row, post)
+
+
+class ScheduleCalendar:
+    def __init__(self, parent, colors, store, draft_provider=None, on_schedule=None):
         self.parent = parent
         self.colors = colors
+        self.store = store
+        self.draft_provider = draft_provider
+        self.on_schedule = on_schedule
         self.current_date = datetime.now()
-        self.scheduled_posts = {}
+        
+        # Month-bucketed index of scheduled posts, keyed by date objects
+        self.scheduled_posts = ScheduleIndex(store, RecurrenceRules(store))
+        
+        # A missing or outdated search index takes seconds to build, so
+        # build_search does it on a worker; search is off until then
+        self.search = None
+        if not needs_rebuild(store):
+            self.search = PostSearch(store)
+        
+        # Best-time heatmaps; NumPy loads with this view, not at startup.
+        # The Tk thread only reads the saved grids; new engagement rows
+        # are folded by fold_engagement on a worker.
+        from socialsync.engagement import EngagementModel
+        self.engagement = EngagementModel(store)
+        
+        # Per-profile posting limits, checked on save and used by auto-place
+        from socialsync.cadence import CadenceScheduler
+        self.cadence = CadenceScheduler(store, self.scheduled_posts.rules, self.engagement)
+        
+        # Near-duplicate captions on the same platform, checked on save
+        from socialsync.similarity import CaptionIndex
+        self.similar = CaptionIndex(store)
+        self.caption_drain = None
+        if self.similar.pending():
+            self.drain_captions()
         
         self.create_calendar_interface()
+        self.fold_engagement()
+        if self.search is None:
+            self.build_search()
 
     def create_calendar_interface(self):
         # Main container with padding
@@ -441,7 +1172,7 @@ class ScheduleCalendar:
         self.header_frame.pack(fill=tk.X, pady=(0, 20))
 
         # Previous month button
-        self.prev_month = tk.Button(
+        self.prev_month_btn = tk.Button(
             self.header_frame,
             text="◄",
             bg=self.colors["bg"],
@@ -449,7 +1180,7 @@ class ScheduleCalendar:
             bd=0,
             command=self.previous_month
         )
-        self.prev_month.pack(side=tk.LEFT)
+        self.prev_month_btn.pack(side=tk.LEFT)
 
         # Month and year labels
         self.month_label = tk.Label(
@@ -462,7 +1193,7 @@ class ScheduleCalendar:
         self.month_label.pack(side=tk.LEFT, padx=10)
 
         # Previous/Next year buttons
-        self.prev_year = tk.Button(
+        self.prev_year_btn = tk.Button(
             self.header_frame,
             text="◄",
             bg=self.colors["bg"],
@@ -470,7 +1201,7 @@ class ScheduleCalendar:
             bd=0,
             command=self.previous_year
         )
-        self.prev_year.pack(side=tk.LEFT, padx=(20, 0))
+        self.prev_year_btn.pack(side=tk.LEFT, padx=(20, 0))
 
         self.year_label = tk.Label(
             self.header_frame,
@@ -481,7 +1212,7 @@ class ScheduleCalendar:
         )
         self.year_label.pack(side=tk.LEFT, padx=10)
 
-        self.next_year = tk.Button(
+        self.next_year_btn = tk.Button(
             self.header_frame,
             text="►",
             bg=self.colors["bg"],
@@ -489,10 +1220,10 @@ class ScheduleCalendar:
             bd=0,
             command=self.next_year
         )
-        self.next_year.pack(side=tk.LEFT)
+        self.next_year_btn.pack(side=tk.LEFT)
 
         # Next month button
-        self.next_month = tk.Button(
+        self.next_month_btn = tk.Button(
             self.header_frame,
             text="►",
             bg=self.colors["bg"],
@@ -500,7 +1231,7 @@ class ScheduleCalendar:
             bd=0,
             command=self.next_month
         )
-        self.next_month.pack(side=tk.LEFT, padx=(20, 0))
+        self.next_month_btn.pack(side=tk.LEFT, padx=(20, 0))
 
         # New Schedule button
         self.new_schedule_btn = tk.Button(
@@ -515,6 +1246,75 @@ class ScheduleCalendar:
         )
         self.new_schedule_btn.pack(side=tk.RIGHT)
 
+        # Bulk import button
+        self.import_btn = tk.Button(
+            self.header_frame,
+            text="Import",
+            bg=self.colors["bg"],
+            fg=self.colors["fg"],
+            padx=15,
+            pady=5,
+            bd=0,
+            command=self.import_schedules
+        )
+        self.import_btn.pack(side=tk.RIGHT, padx=10)
+
+        # Spread imported drafts (rows without a time) over legal slots
+        self.place_drafts_btn = tk.Button(
+            self.header_frame,
+            text="Place drafts",
+            bg=self.colors["bg"],
+            fg=self.colors["fg"],
+            padx=15,
+            pady=5,
+            bd=0,
+            command=self.place_drafts
+        )
+        self.place_drafts_btn.pack(side=tk.RIGHT)
+
+        # Search over captions and #hashtags; results update as you type
+        self.search_frame = tk.Frame(
+            self.container,
+            bg=self.colors["bg"]
+        )
+        self.search_frame.pack(fill=tk.X, pady=(0, 10))
+
+        tk.Label(
+            self.search_frame,
+            text="Search:",
+            bg=self.colors["bg"],
+            fg=self.colors["fg"]
+        ).pack(side=tk.LEFT)
+
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+        self.search_entry = tk.Entry(
+            self.search_frame,
+            textvariable=self.search_var,
+            bg=self.colors["border"],
+            fg=self.colors["fg"],
+            insertbackground=self.colors["fg"],
+            relief=tk.FLAT
+        )
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10)
+
+        self.search_results = tk.Listbox(
+            self.container,
+            bg=self.colors["sidebar"],
+            fg=self.colors["fg"],
+            selectbackground=self.colors["button"],
+            height=8,
+            relief=tk.FLAT,
+            activestyle="none"
+        )
+        self.search_results.bind("<<ListboxSelect>>", self.on_search_select)
+        self.search_hits = []
+        self.search_job = None
+
+        # Posts of the selected day, right of the calendar
+        self.post_list = PostList(self.container, self.colors)
+        self.post_list.frame.pack(side=tk.RIGHT, fill=tk.Y, padx=(20, 0))
+
         # Calendar grid
         self.calendar_frame = tk.Frame(
             self.container,
@@ -534,8 +1334,9 @@ class ScheduleCalendar:
             )
             label.grid(row=0, column=i, pady=(0, 10))
 
-        # Create calendar days
+        # Create calendar days; clicks anywhere in a cell select its day
         self.day_frames = {}
+        self.cell_keys = {}  # widget path -> day_frames key
         for row in range(6):
             for col in range(7):
                 frame = tk.Frame(
@@ -558,12 +1359,40 @@ class ScheduleCalendar:
                 )
                 day_label.pack(fill=tk.X)
                 
-                self.day_frames[f"{row+1},{col}"] = {
+                content = tk.Frame(frame, bg=self.colors["sidebar"])
+                content.pack(fill=tk.BOTH, expand=True)
+                
+                # Reusable post chips plus a "+N more" label; these are
+                # reconfigured in place on every refresh, never recreated
+                chips = [
+                    tk.Label(content, font=("Helvetica", 8), anchor="w", padx=4)
+                    for _ in range(CHIPS_PER_DAY)
+                ]
+                more_label = tk.Label(
+                    content,
+                    bg=self.colors["sidebar"],
+                    fg=self.colors["fg"],
+                    font=("Helvetica", 8),
+                    anchor="w"
+                )
+                
+                key = f"{row+1},{col}"
+                for widget in [frame, day_label, content, more_label] + chips:
+                    widget.bindtags((DAY_CELL_TAG,) + widget.bindtags())
+                    self.cell_keys[str(widget)] = key
+                
+                self.day_frames[key] = {
                     'frame': frame,
                     'label': day_label,
-                    'content': tk.Frame(frame, bg=self.colors["sidebar"])
+                    'content': content,
+                    'chips': chips,
+                    'more': more_label,
+                    'shown': 0,
+                    'more_shown': False,
+                    'state': None,
+                    'date': None
                 }
-                self.day_frames[f"{row+1},{col}"]['content'].pack(fill=tk.BOTH, expand=True)
+        self.calendar_frame.bind_class(DAY_CELL_TAG, "<Button-1>", self.on_cell_click)
 
         # Configure grid weights
         for i in range(7):
@@ -578,45 +1407,96 @@ class ScheduleCalendar:
         self.month_label.config(text=self.current_date.strftime("%B"))
         self.year_label.config(text=str(self.current_date.year))
 
-        # Clear existing calendar
-        for frame_data in self.day_frames.values():
-            frame_data['label'].config(text="")
-            frame_data['frame'].config(bg=self.colors["sidebar"])
+        # Per-day, per-platform post counts for the visible month
+        year, month = self.current_date.year, self.current_date.month
+        counts = self.scheduled_posts.month(year, month).platform_counts
+        
+        # Tint weekday columns by how well their best slot has performed
+        strength = self.engagement.weekday_strength()
+        tints = [
+            blend(self.colors["sidebar"], self.colors["button"], BEST_DAY_TINT * level)
+            for level in (strength if strength is not None else [0] * 7)
+        ]
             
         # Get calendar data
-        cal = calendar.monthcalendar(self.current_date.year, self.current_date.month)
+        import calendar
+        cal = calendar.monthcalendar(year, month)
+        now = datetime.now()
+        selected = self.get_selected_date()
         
-        # Fill in days
-        for row, week in enumerate(cal):
+        # Fill in days; rows beyond the month's last week are blanked
+        for row in range(6):
+            week = cal[row] if row < len(cal) else [0] * 7
             for col, day in enumerate(week):
-                if day != 0:
-                    frame_data = self.day_frames[f"{row+1},{col}"]
-                    frame_data['label'].config(text=str(day))
-                    
-                    # Highlight current day
-                    if (day == self.current_date.day and 
-                        self.current_date.month == datetime.now().month and 
-                        self.current_date.year == datetime.now().year):
-                        frame_data['frame'].config(bg=self.colors["button"])
-                    
-                    # Highlight days with scheduled posts
-                    date_str = f"{self.current_date.year}-{self.current_date.month}-{day}"
-                    if date_str in self.scheduled_posts:
-                        self.add_schedule_indicator(frame_data['content'])
-
-    def add_schedule_indicator(self, frame):
-        indicator = tk.Frame(
-            frame,
-            bg=self.colors["button"],
-            height=4
+                frame_data = self.day_frames[f"{row+1},{col}"]
+                
+                # Highlight current day
+                highlight = (day != 0 and
+                    day == self.current_date.day and 
+                    month == now.month and 
+                    year == now.year)
+                
+                frame_data['date'] = date(year, month, day) if day else None
+                day_counts = counts.get(frame_data['date'], {}) if day else {}
+                self.render_day(
+                    frame_data, day, day_counts, highlight,
+                    day != 0 and frame_data['date'] == selected, tints[col]
+                )
+        
+        self.update_posts_display(selected or now.date())
+
+    def render_day(self, frame_data, day, platform_counts, highlight, selected, tint):
+        # Busiest platforms first; skip the cell if nothing changed
+        chips = sorted(platform_counts.items(), key=lambda item: (-item[1], item[0] or ""))
+        state = (day, highlight, selected, tint, tuple(chips))
+        if frame_data['state'] == state:
+            return
+        frame_data['state'] = state
+        
+        total = sum(platform_counts.values())
+        if day == 0:
+            text = ""
+        elif total:
+            text = f"{day}   ({total})"
+        else:
+            text = str(day)
+        frame_data['label'].config(text=text, bg=tint if day else self.colors["sidebar"])
+        frame_data['frame'].config(
+            bg=self.colors["button"] if highlight else tint if day else self.colors["sidebar"],
+            highlightthickness=2 if selected else 0,
+            highlightbackground=self.colors["fg"]
         )
-        indicator.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=5)
+        frame_data['content'].config(bg=tint if day else self.colors["sidebar"])
+        frame_data['more'].config(bg=tint if day else self.colors["sidebar"])
+        
+        # Reconfigure the pooled chips, packing/unpacking only on change
+        visible = chips[:CHIPS_PER_DAY]
+        for i, chip in enumerate(frame_data['chips']):
+            if i < len(visible):
+                platform, count = visible[i]
+                bg, fg = PLATFORM_COLORS.get(platform, (self.colors["button"], self.colors["fg"]))
+                chip.config(text=f"{platform} {count}", bg=bg, fg=fg)
+                if i >= frame_data['shown']:
+                    chip.pack(fill=tk.X, padx=4, pady=1)
+            elif i < frame_data['shown']:
+                chip.pack_forget()
+        frame_data['shown'] = len(visible)
+        
+        hidden = len(chips) - len(visible)
+        if hidden:
+            frame_data['more'].config(text=f"+{hidden} more")
+            if not frame_data['more_shown']:
+                frame_data['more'].pack(fill=tk.X, padx=4)
+                frame_data['more_shown'] = True
+        elif frame_data['more_shown']:
+            frame_data['more'].pack_forget()
+            frame_data['more_shown'] = False
 
     def show_schedule_dialog(self):
         dialog = tk.Toplevel(self.parent)
         dialog.title("Schedule New Post")
         dialog.configure(bg=self.colors["bg"])
-        dialog.geometry("400x500")
+        dialog.geometry("400x540")
 
         # Time selection
         time_frame = tk.Frame(dialog, bg=self.colors["bg"], pady=10)
@@ -677,8 +1557,44 @@ class ScheduleCalendar:
         platforms = ["Facebook", "Instagram", "Twitter", "LinkedIn", "TikTok"]
         platform_vars = {}
         
+        # Best times for this weekday from engagement history; follows the
+        # platform checkboxes (all platforms while none are ticked)
+        suggest_frame = tk.Frame(dialog, bg=self.colors["bg"])
+        suggest_frame.pack(fill=tk.X, padx=20, after=time_frame)
+        
+        def pick_time(hour, minute):
+            hour_var.set(f"{(hour - 1) % 12 + 1:02d}")
+            minute_var.set(f"{minute:02d}")
+            period_var.set("AM" if hour < 12 else "PM")
+        
+        def update_suggestions(*args):
+            for child in suggest_frame.winfo_children():
+                child.destroy()
+            chosen = [p for p, v in platform_vars.items() if v.get()] or platforms
+            day = self.get_selected_date() or self.current_date.date()
+            slots = self.engagement.best_slots(
+                SUGGESTED_SLOTS, weekday=day.weekday(), platforms=chosen
+            )
+            tk.Label(
+                suggest_frame,
+                text=f"Best on {day:%a}:" if slots else "No engagement history yet",
+                bg=self.colors["bg"],
+                fg=self.colors["fg"]
+            ).pack(side=tk.LEFT)
+            for _, hour, minute, _ in slots:
+                tk.Button(
+                    suggest_frame,
+                    text=datetime(2000, 1, 1, hour, minute).strftime("%I:%M %p").lstrip("0"),
+                    bg=self.colors["border"],
+                    fg=self.colors["fg"],
+                    bd=0,
+                    padx=8,
+                    command=lambda h=hour, m=minute: pick_time(h, m)
+                ).pack(side=tk.LEFT, padx=(5, 0))
+        
         for platform in platforms:
             var = tk.BooleanVar()
+            var.trace_add("write", update_suggestions)
             platform_vars[platform] = var
             tk.Checkbutton(
                 platform_frame,
@@ -689,6 +1605,27 @@ class ScheduleCalendar:
                 selectcolor=self.colors["sidebar"]
             ).pack(anchor=tk.W)
 
+        update_suggestions()
+
+        # Repeat: a preset or a raw RRULE such as FREQ=WEEKLY;BYDAY=TU,TH
+        repeat_frame = tk.Frame(dialog, bg=self.colors["bg"])
+        repeat_frame.pack(fill=tk.X, padx=20)
+
+        tk.Label(
+            repeat_frame,
+            text="Repeat:",
+            bg=self.colors["bg"],
+            fg=self.colors["fg"]
+        ).pack(side=tk.LEFT)
+
+        repeat_var = tk.StringVar(value="Does not repeat")
+        ttk.Combobox(
+            repeat_frame,
+            textvariable=repeat_var,
+            values=list(PRESETS),
+            width=28
+        ).pack(side=tk.LEFT, padx=5)
+
         # Buttons
         button_frame = tk.Frame(dialog, bg=self.colors["bg"])
         button_frame.pack(side=tk.BOTTOM, pady=20)
@@ -703,10 +1640,19 @@ class ScheduleCalendar:
                 minute_var.get(),
                 period_var.get(),
                 platform_vars,
-                dialog
+                dialog,
+                repeat_var.get()
             )
         ).pack(side=tk.LEFT, padx=5)
 
+        tk.Button(
+            button_frame,
+            text="Auto-place",
+            bg=self.colors["bg"],
+            fg=self.colors["fg"],
+            command=lambda: self.auto_place(platform_vars, dialog)
+        ).pack(side=tk.LEFT, padx=5)
+
         tk.Button(
             button_frame,
             text="Cancel",
@@ -715,57 +1661,343 @@ class ScheduleCalendar:
             command=dialog.destroy
         ).pack(side=tk.LEFT, padx=5)
 
-    def save_schedule(self, hour, minute, period, platform_vars, dialog):
-        selected_date = self.calendar.get_date()
+    def save_schedule(self, hour, minute, period, platform_vars, dialog, repeat=None):
+        selected_date = self.get_selected_date() or self.current_date.date()
         time_str = f"{hour}:{minute} {period}"
         platforms = [p for p, v in platform_vars.items() if v.get()]
         
-        if selected_date not in self.scheduled_posts:
-            self.scheduled_posts[selected_date] = []
-            
-        self.scheduled_posts[selected_date].append({
-            'time': time_str,
-            'platforms': platforms
-        })
+        # One scheduled_posts row per target platform
+        schedule_time = datetime.strptime(time_str, "%I:%M %p")
+        schedule_date = datetime(
+            selected_date.year, selected_date.month, selected_date.day,
+            schedule_time.hour, schedule_time.minute
+        )
+        draft = self.draft_provider() if self.draft_provider else {}
+        rule_text = PRESETS.get(repeat, repeat)
+        # Read-only until the user confirms: None marks a profile to create
+        profile_ids = {platform: self.store.find_profile(platform) for platform in platforms}
         
-        self.update_posts_display(selected_date)
+        # The dialog works on the calendar's clock: settle the instant once
+        # (DST gaps and repeats included), then each profile's wall time
+        display = self.store.display_zone
+        schedule_at, resolution = display.to_epoch(schedule_date)
+        instant = datetime.fromtimestamp(schedule_at, timezone.utc)
+        local_times = {
+            platform: self.store.zone_for(profile_id).to_local(schedule_at)
+            for platform, profile_id in profile_ids.items()
+        }
+        
+        problems = []
+        if resolution == GAP:
+            problems.append(
+                f"{schedule_date:%I:%M %p} does not exist on {schedule_date:%b %d} (clocks go "
+                f"forward); it would go out at {display.to_local(schedule_at):%I:%M %p}"
+            )
+        elif resolution == OVERLAP:
+            problems.append(
+                f"{schedule_date:%I:%M %p} happens twice on {schedule_date:%b %d} (clocks go "
+                f"back); the first one is used"
+            )
+        problems += [
+            f"{platform}: {problem}"
+            for platform, profile_id in profile_ids.items()
+            for problem in self.cadence.check(profile_id, local_times[platform], platform)
+        ]
+        problems += self.duplicate_problems(draft.get('caption'), profile_ids, schedule_at)
+        if problems and not messagebox.askyesno(
+            "Check schedule",
+            "\n".join(problems) + "\n\nSchedule anyway?",
+            parent=dialog
+        ):
+            return
+        
+        for platform, profile_id in profile_ids.items():
+            if profile_id is None:
+                profile_id = self.store.get_or_create_profile(platform)
+            if rule_text:
+                try:
+                    # Rules repeat on the profile's own wall clock
+                    self.scheduled_posts.add_rule(profile_id, local_times[platform], rule_text, **draft)
+                except ValueError as e:
+                    messagebox.showerror("Invalid repeat rule", str(e), parent=dialog)
+                    return
+            else:
+                self.scheduled_posts.add_post(profile_id, instant, **draft)
+        
+        if self.on_schedule:
+            self.on_schedule(draft.get('media_path'), platforms)
+        
+        self.update_calendar()
         dialog.destroy()
 
-    def on_date_select(self, event=None):
-        selected_date = self.calendar.get_date()
-        self.update_posts_display(selected_date)
+    def duplicate_problems(self, caption, profile_ids, schedule_at, shown=3):
+        # Platforms penalize repeated content: list the closest captions
+        # already scheduled around this time on each platform
+        if not caption:
+            return []
+        # While a drain runs it owns the queue; waiting on its write lock
+        # would stall the dialog. Posts still queued are not compared.
+        draining = self.caption_drain is not None and self.caption_drain.is_alive()
+        if not draining and self.similar.refresh(limit=SAVE_REFRESH) == SAVE_REFRESH:
+            self.drain_captions()
+        problems = []
+        for platform, profile_id in profile_ids.items():
+            if profile_id is None:
+                continue  # not created yet, so nothing scheduled
+            matches = self.similar.check(caption, profile_id, schedule_at, limit=shown)
+            for _, post in matches:
+                when = self.store.display_zone.to_local(post['schedule_at'])
+                text = post['caption'] if len(post['caption']) <= 40 else post['caption'][:37] + "..."
+                problems.append(
+                    f"{platform}: caption nearly repeats the {when:%b %d, %I:%M %p} post "
+                    f"of {post['profile_name']} (\"{text}\")"
+                )
+        return problems
 
-    def update_posts_display(self, date):
-        # Clear existing posts
-        for widget in self.posts_scrollable_frame.winfo_children():
-            widget.destroy()
+    def fold_engagement(self):
+        # Fold new engagement rows on a worker thread with its own
+        # connection; the grids are saved in the database for the Tk side
+        results = queue.Queue()
+        
+        def work():
+            try:
+                from socialsync.engagement import EngagementModel
+                store = ScheduleStore(self.store.path)
+                try:
+                    model = EngagementModel(store)
+                    model.refresh()
+                    results.put(model.last_id)
+                finally:
+                    store.close()
+            except Exception as e:
+                results.put(e)
+        
+        threading.Thread(target=work, daemon=True).start()
+        self.parent.after(100, self.finish_fold, results)
+
+    def finish_fold(self, results):
+        try:
+            last_id = results.get_nowait()
+        except queue.Empty:
+            self.parent.after(100, self.finish_fold, results)
+            return
+        
+        # Reload only when the saved grids moved on (here or elsewhere)
+        if not isinstance(last_id, Exception) and last_id != self.engagement.last_id:
+            self.engagement.load()
+            self.update_calendar()
+        self.parent.after(ENGAGEMENT_REFRESH_MS, self.fold_engagement)
+
+    def build_search(self):
+        # Index every post on a worker thread with its own connection
+        results = queue.Queue()
+        
+        def work():
+            try:
+                store = ScheduleStore(self.store.path)
+                try:
+                    PostSearch(store)
+                    results.put(None)
+                finally:
+                    store.close()
+            except Exception as e:
+                results.put(e)
+        
+        threading.Thread(target=work, daemon=True).start()
+        self.parent.after(100, self.finish_search_build, results)
+
+    def finish_search_build(self, results):
+        try:
+            error = results.get_nowait()
+        except queue.Empty:
+            self.parent.after(100, self.finish_search_build, results)
+            return
+        
+        if error is not None:
+            return  # search stays off; the next start builds again
+        self.search = PostSearch(self.store)
+        # Run what was typed while the index was being built
+        if self.search_var.get().strip():
+            self.run_search()
+
+    def drain_captions(self):
+        # Fingerprint the caption queue on a worker thread with its own
+        # connection; each chunk holds the write lock only briefly
+        if self.caption_drain is not None and self.caption_drain.is_alive():
+            return
+        
+        def work():
+            from socialsync.similarity import CaptionIndex
+            store = ScheduleStore(self.store.path)
+            try:
+                index = CaptionIndex(store)
+                while index.refresh(limit=CAPTION_DRAIN_CHUNK) == CAPTION_DRAIN_CHUNK:
+                    pass
+            except sqlite3.Error:
+                pass  # left queued; the next save or import picks it up
+            finally:
+                store.close()
+        
+        self.caption_drain = threading.Thread(target=work, daemon=True)
+        self.caption_drain.start()
 
-        # Show scheduled posts for selected date
-        if date in self.scheduled_posts:
-            for post in self.scheduled_posts[date]:
-                post_frame = tk.Frame(
-                    self.posts_scrollable_frame,
-                    bg=self.colors["sidebar"],
-                    padx=10,
-                    pady=10
-                )
-                post_frame.pack(fill=tk.X, pady=5)
+    def auto_place(self, platform_vars, dialog):
+        # Put the current draft at the best legal slot of each platform,
+        # starting from the selected day
+        platforms = [p for p, v in platform_vars.items() if v.get()]
+        if not platforms:
+            messagebox.showinfo("Auto-place", "Pick at least one platform.", parent=dialog)
+            return
+        selected_date = self.get_selected_date() or self.current_date.date()
+        start = max(datetime.now(), datetime.combine(selected_date, datetime.min.time()))
+        end = start + timedelta(days=AUTO_PLACE_DAYS)
+        # Profiles are only created for the posts actually added
+        profile_ids = {platform: self.store.find_profile(platform) for platform in platforms}
+        placed = self.cadence.place(
+            [(platform, profile_id) for platform, profile_id in profile_ids.items() if profile_id is not None],
+            start, end
+        )
+        for platform, profile_id in profile_ids.items():
+            if profile_id is None:
+                when = self.cadence.place_new(platform, start, end)
+                if when is not None:
+                    placed[platform] = when
+        
+        draft = self.draft_provider() if self.draft_provider else {}
+        lines = []
+        for platform, profile_id in profile_ids.items():
+            when = placed.get(platform)
+            if when is None:
+                lines.append(f"{platform}: no free slot in the next {AUTO_PLACE_DAYS} days")
+                continue
+            if profile_id is None:
+                profile_id = self.store.get_or_create_profile(platform)
+            post_id = self.scheduled_posts.add_post(profile_id, when, **draft)
+            shown = self.store.display_zone.to_local(self.store.get_post(post_id)['schedule_at'])
+            lines.append(f"{platform}: {shown:%a %b %d, %I:%M %p}")
+        
+        if self.on_schedule and placed:
+            self.on_schedule(draft.get('media_path'), list(placed))
+        
+        self.update_calendar()
+        dialog.destroy()
+        messagebox.showinfo("Auto-placed", "\n".join(lines))
 
-                tk.Label(
-                    post_frame,
-                    text=post['time'],
-                    bg=self.colors["sidebar"],
-                    fg=self.colors["fg"],
-                    font=('Helvetica', 12, 'bold')
-                ).pack(anchor=tk.W)
+    def place_drafts(self):
+        now = datetime.now()
+        placed, unplaced = self.cadence.place_drafts(now, now + timedelta(days=AUTO_PLACE_DAYS))
+        
+        self.scheduled_posts.invalidate()
+        self.update_calendar()
+        
+        summary = f"{placed} drafts scheduled"
+        if unplaced:
+            summary += f", {unplaced} left as drafts (no free slot in the next {AUTO_PLACE_DAYS} days)"
+        messagebox.showinfo("Place drafts", summary)
 
-                platforms_text = ", ".join(post['platforms'])
-                tk.Label(
-                    post_frame,
-                    text=platforms_text,
-                    bg=self.colors["sidebar"],
-                    fg=self.colors["fg"]
-                ).pack(anchor=tk.W)
+    def import_schedules(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[
+                ("Schedule files", "*.csv *.jsonl *.ndjson"),
+                ("All files", "*.*")
+            ]
+        )
+        if not file_path:
+            return
+        
+        self.import_btn.config(state=tk.DISABLED, text="Importing...")
+        results = queue.Queue()
+        
+        # Import on a worker thread with its own connection
+        def work():
+            # Always post a result, or finish_import would poll forever
+            try:
+                from socialsync.importer import import_file
+                store = ScheduleStore(self.store.path)
+                try:
+                    results.put(import_file(store, file_path))
+                finally:
+                    store.close()
+            except Exception as e:
+                results.put(e)
+        
+        threading.Thread(target=work, daemon=True).start()
+        self.parent.after(100, self.finish_import, results)
+
+    def finish_import(self, results):
+        try:
+            report = results.get_nowait()
+        except queue.Empty:
+            self.parent.after(100, self.finish_import, results)
+            return
+        
+        self.import_btn.config(state=tk.NORMAL, text="Import")
+        if isinstance(report, Exception):
+            messagebox.showerror("Import failed", str(report))
+            return
+        
+        # Refresh the calendar once for the whole batch
+        self.scheduled_posts.invalidate()
+        self.update_calendar()
+        self.drain_captions()
+        
+        summary = f"{report.inserted} imported, {report.updated} updated, {report.error_count} errors"
+        if report.errors:
+            details = "\n".join(f"Line {line}: {message}" for line, message in report.errors[:10])
+            if report.error_count > 10:
+                details += f"\n... and {report.error_count - 10} more"
+            messagebox.showwarning("Import finished with errors", f"{summary}\n\n{details}")
+        else:
+            messagebox.showinfo("Import finished", summary)
+
+    def schedule_search(self):
+        # Debounce: only query once typing pauses
+        if self.search_job is not None:
+            self.parent.after_cancel(self.search_job)
+        self.search_job = self.parent.after(SEARCH_DELAY_MS, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        if self.search is None:
+            return  # finish_search_build runs it
+        self.search_hits = self.search.search(self.search_var.get(), limit=SEARCH_LIMIT)
+        self.search_results.delete(0, tk.END)
+        for post in self.search_hits:
+            caption = " ".join((post['caption'] or "").split())
+            if post['schedule_at'] is None:
+                when = "Draft".ljust(19)
+            else:
+                when = f"{self.store.display_zone.to_local(post['schedule_at']):%Y-%m-%d %I:%M %p}"
+            self.search_results.insert(
+                tk.END,
+                f"{when}  {post['platform'] or '':<10}  {caption[:80]}"
+            )
+        if self.search_hits:
+            self.search_results.pack(fill=tk.X, pady=(0, 10), after=self.search_frame)
+        else:
+            self.search_results.pack_forget()
+
+    def on_search_select(self, event=None):
+        # Jump the calendar to the selected result's day
+        selection = self.search_results.curselection()
+        if not selection:
+            return
+        post = self.search_hits[selection[0]]
+        if post['schedule_at'] is None:
+            return
+        when = self.store.display_zone.to_local(post['schedule_at'])
+        self.current_date = when.replace(day=1)
+        self.selected_date = when.date()
+        self.update_calendar()
+
+    def on_date_select(self, event=None):
+        selected_date = self.get_selected_date() or self.current_date.date()
+        self.update_posts_display(selected_date)
+
+    def update_posts_display(self, selected_date):
+        # posts_on hands back the same list until the day changes, so
+        # this is a no-op on month navigation
+        self.post_list.show(selected_date, self.scheduled_posts.posts_on(selected_date))
 
     def previous_month(self):
         self.current_date = self.current_date.replace(day=1)  # Go to first day of current month
@@ -789,17 +2021,250 @@ class ScheduleCalendar:
         self.current_date = self.current_date.replace(year=self.current_date.year + 1)
         self.update_calendar()
 
+    def on_cell_click(self, event):
+        day = self.day_frames[self.cell_keys[str(event.widget)]]['date']
+        if day is not None:
+            self.on_day_click(day)
+
     def on_day_click(self, day):
         # Handle day selection
         self.selected_date = day
         self.update_calendar()
-        # You can add more functionality here when a day is clicked
 
     def get_selected_date(self):
         return self.selected_date if hasattr(self, 'selected_date') else None
 
+class LinkManager:
+    """MonoLink view: create and edit short links and watch their clicks.
+
+    The redirect service (python -m socialsync.monolink) picks up edits
+    made here within a second, and writes the click counts back.
+    """
+
+    def __init__(self, parent, colors, link_store, on_insert=None):
+        from socialsync.monolink import DEFAULT_BASE_URL
+        self.colors = colors
+        self.links = link_store
+        self.on_insert = on_insert
+        self.base_url = DEFAULT_BASE_URL
+        self.selected = None
+
+        self.frame = tk.Frame(parent, bg=colors["bg"], padx=20, pady=20)
+        tk.Label(
+            self.frame,
+            text="MonoLink",
+            bg=colors["bg"],
+            fg=colors["fg"],
+            font=("Helvetica", 16, "bold"),
+            anchor="w"
+        ).pack(fill=tk.X)
+        tk.Label(
+            self.frame,
+            text=f"Short links redirect from {self.base_url}/<code>",
+            bg=colors["bg"],
+            fg=colors["fg"],
+            anchor="w"
+        ).pack(fill=tk.X, pady=(0, 10))
+
+        # Link editor
+        form = tk.LabelFrame(
+            self.frame,
+            text="Link",
+            bg=colors["bg"],
+            fg=colors["fg"],
+            padx=10,
+            pady=10
+        )
+        form.pack(fill=tk.X, pady=(0, 10))
+        self.code_var = tk.StringVar()
+        self.target_var = tk.StringVar()
+        self.title_var = tk.StringVar()
+        fields = [
+            ("Short code (blank for random)", self.code_var),
+            ("Target URL", self.target_var),
+            ("Title", self.title_var)
+        ]
+        for row, (label, var) in enumerate(fields):
+            tk.Label(form, text=label, bg=colors["bg"], fg=colors["fg"], anchor="w").grid(
+                row=row, column=0, sticky="w", pady=2
+            )
+            tk.Entry(
+                form,
+                textvariable=var,
+                bg=colors["border"],
+                fg=colors["fg"],
+                insertbackground=colors["fg"],
+                relief=tk.FLAT
+            ).grid(row=row, column=1, sticky="ew", padx=(10, 0), pady=2)
+        form.columnconfigure(1, weight=1)
+
+        buttons = tk.Frame(form, bg=colors["bg"])
+        buttons.grid(row=len(fields), column=0, columnspan=2, sticky="w", pady=(10, 0))
+        actions = [
+            ("New", self.new_link),
+            ("Save", self.save_link),
+            ("Delete", self.delete_link),
+            ("Insert in post", self.insert_link),
+            ("Copy link", self.copy_link),
+            ("Refresh", self.refresh)
+        ]
+        for text, command in actions:
+            tk.Button(
+                buttons,
+                text=text,
+                command=command,
+                bg=colors["button"] if text == "Save" else colors["border"],
+                fg=colors["fg"],
+                relief=tk.FLAT,
+                padx=10,
+                activebackground=colors["hover"]
+            ).pack(side=tk.LEFT, padx=(0, 5))
+
+        # Links and their clicks
+        table = tk.Frame(self.frame, bg=colors["bg"])
+        table.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(
+            table,
+            columns=("code", "target", "title", "clicks"),
+            show="headings",
+            selectmode="browse"
+        )
+        for column, heading, width, stretch in (
+            ("code", "Code", 100, False),
+            ("target", "Target", 360, True),
+            ("title", "Title", 160, True),
+            ("clicks", "Clicks", 80, False)
+        ):
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, stretch=stretch,
+                             anchor="e" if column == "clicks" else "w")
+        scrollbar = tk.Scrollbar(table, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+
+        self.refresh()
+
+    def refresh(self):
+        self.tree.delete(*self.tree.get_children())
+        for link in self.links.links():
+            self.tree.insert("", tk.END, iid=str(link["id"]), values=(
+                link["code"], link["target"], link["title"], link["clicks"]
+            ))
+        if self.selected is not None and self.tree.exists(str(self.selected)):
+            self.tree.selection_set(str(self.selected))
+        else:
+            self.selected = None
+
+    def on_select(self, event=None):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        link = self.links.get(int(selection[0]))
+        if link is None:
+            return
+        self.selected = link["id"]
+        self.code_var.set(link["code"])
+        self.target_var.set(link["target"])
+        self.title_var.set(link["title"])
+
+    def new_link(self):
+        self.selected = None
+        self.tree.selection_set(())
+        for var in (self.code_var, self.target_var, self.title_var):
+            var.set("")
+
+    def save_link(self):
+        code = self.code_var.get().strip()
+        target = self.target_var.get()
+        title = self.title_var.get().strip()
+        try:
+            if self.selected is None:
+                self.selected = self.links.create(target, code=code or None, title=title)
+            else:
+                fields = {"target": target, "title": title}
+                if code:
+                    fields["code"] = code
+                self.links.update(self.selected, **fields)
+        except ValueError as e:
+            messagebox.showerror("MonoLink", str(e), parent=self.frame)
+            return
+        self.refresh()
+        self.on_select()
+
+    def delete_link(self):
+        if self.selected is None:
+            return
+        if not messagebox.askyesno(
+            "Delete link",
+            f"Delete {self.code_var.get()}? Captions that use it will stop redirecting.",
+            parent=self.frame
+        ):
+            return
+        self.links.delete(self.selected)
+        self.new_link()
+        self.refresh()
+
+    def current_url(self):
+        if self.selected is None:
+            messagebox.showinfo("MonoLink", "Save or select a link first.", parent=self.frame)
+            return None
+        from socialsync.monolink import short_url
+        return short_url(self.links.get(self.selected)["code"], self.base_url)
+
+    def insert_link(self):
+        url = self.current_url()
+        if url and self.on_insert is not None:
+            self.on_insert(url)
+
+    def copy_link(self):
+        url = self.current_url()
+        if url:
+            self.frame.clipboard_clear()
+            self.frame.clipboard_append(url)
+
+def report_startup(root, built):
+    # Per-phase timings plus a cProfile dump, for --profile-startup
+    root.update_idletasks()
+    idle = time.perf_counter()
+    STARTUP_PROFILER.disable()
+    import pstats
+    STARTUP_PROFILER.dump_stats("startup.prof")
+    
+    print(f"imports            {(IMPORTS_DONE - STARTUP_BEGAN) * 1000:8.1f} ms")
+    print(f"widget tree        {(built - IMPORTS_DONE) * 1000:8.1f} ms")
+    print(f"update_idletasks   {(idle - built) * 1000:8.1f} ms")
+    print(f"total              {(idle - STARTUP_BEGAN) * 1000:8.1f} ms")
+    print("profile written to startup.prof; slowest calls:")
+    pstats.Stats(STARTUP_PROFILER).sort_stats("cumulative").print_stats(15)
+
+
+def report_monitor(monitor):
+    # Callback timings and stalls of the session, for --monitor-ui
+    monitor.stop()
+    monitor.write_json("ui_monitor.json")
+    monitor.write_trace("ui_trace.json")
+    print(monitor.report())
+    print("written to ui_monitor.json and ui_trace.json (chrome://tracing)")
+
+
 if __name__ == "__main__":
+    monitor = None
+    if "--monitor-ui" in sys.argv:
+        # Callbacks are wrapped when registered, so before any widget exists
+        from socialsync.tkmonitor import LoopMonitor
+        monitor = LoopMonitor()
+        monitor.install()
     root = tk.Tk()
     root.geometry("1200x800")  # Set initial window size
     app = PostingInterface(root)
-    root.mainloop()
+    if STARTUP_PROFILER is not None:
+        report_startup(root, time.perf_counter())
+        root.destroy()
+    else:
+        if monitor is not None:
+            monitor.start(root)
+        root.mainloop()
+        if monitor is not None:
+            report_monitor(monitor)
@@ -0,0 +1,134 @@
+"""Benchmark archiving finished posts out of the hot table.
+
+Builds years of posting history (finished posts in the past, a month of
+pending ones ahead), times calendar and due-post queries, archives
+everything older than --after days in dispatcher-sized slices, and times
+the same queries again:
+
+    python benchmarks/bench_archive.py --posts 1000000 --years 3
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.archive import SLICE, PostArchive  # noqa: E402
+from socialsync.store import PLATFORMS, ScheduleStore  # noqa: E402
+
+
+def populate(store, posts, years, profiles, now, rng):
+    start = now - timedelta(days=365 * years)
+    span = int((now + timedelta(days=30) - start).total_seconds())
+    batch = []
+    for i in range(posts):
+        when = start + timedelta(seconds=rng.randrange(span))
+        status = "pending" if when > now else ("failed" if rng.random() < 0.05 else "posted")
+        batch.append((rng.choice(profiles), "text", None, f"post {i} #tag{i % 50}", "",
+                      when, status))
+        if len(batch) >= 50000:
+            store.add_posts(batch)
+            batch = []
+    store.add_posts(batch)
+    store.conn.execute("ANALYZE")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def measure(store, now, past, archived_id, repeat):
+    return {
+        "due scan": timeit(lambda: store.due_post_ids(60, now=now, limit=1000), repeat),
+        "month (current)": timeit(lambda: store.posts_in_month(now.year, now.month), repeat),
+        "month (past)": timeit(lambda: store.posts_in_month(past.year, past.month), repeat),
+        "day counts (current)": timeit(
+            lambda: store.day_platform_counts(now.year, now.month), repeat
+        ),
+        "day counts (past)": timeit(lambda: store.day_platform_counts(past.year, past.month), repeat),
+        "get_post (old)": timeit(lambda: store.get_post(archived_id), repeat),
+    }
+
+
+def db_size(path):
+    return sum(
+        os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix)
+    ) / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--years", type=float, default=3.0)
+    parser.add_argument("--profiles", type=int, default=200)
+    parser.add_argument("--after", type=float, default=90.0, help="archive age in days")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    now = datetime(2025, 6, 15, 9, 0, 0)
+    past = now - timedelta(days=365)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        store = ScheduleStore(path)
+        profiles = [store.get_or_create_profile(PLATFORMS[i % len(PLATFORMS)], f"account{i}")
+                    for i in range(args.profiles)]
+        t0 = time.perf_counter()
+        populate(store, args.posts, args.years, profiles, now, rng)
+        print(f"{args.posts} posts over {args.years:g} years built in "
+              f"{time.perf_counter() - t0:.1f}s")
+        old_id = store.conn.execute(
+            "SELECT id FROM scheduled_posts WHERE status = 'posted' AND schedule_at < ? LIMIT 1",
+            (int(past.timestamp()),)
+        ).fetchone()[0]
+        hot_before = store.conn.execute("SELECT COUNT(*) FROM scheduled_posts").fetchone()[0]
+        store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size_before = db_size(path)
+        before = measure(store, now, past, old_id, args.repeat)
+
+        archive = PostArchive(store, after_days=args.after)
+        slices, archived, released = [], 0, 0
+        t0 = time.perf_counter()
+        while True:
+            started = time.perf_counter()
+            moved, pages = archive.step(SLICE, now=now)
+            slices.append(time.perf_counter() - started)
+            archived += moved
+            released += pages
+            if not moved and not pages:
+                break
+        elapsed = time.perf_counter() - t0
+        store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        store.conn.execute("ANALYZE")
+        print(f"archived {archived} posts into {len(archive.archives())} monthly tables in "
+              f"{elapsed:.1f}s ({archived / elapsed:.0f}/s), {len(slices)} slices of "
+              f"{SLICE * 1000:.0f} ms budget: p99 {percentile(slices, 99) * 1000:.0f} ms, "
+              f"longest {max(slices) * 1000:.0f} ms, "
+              f"{released} pages released")
+        hot_after = store.conn.execute("SELECT COUNT(*) FROM scheduled_posts").fetchone()[0]
+        after = measure(store, now, past, old_id, args.repeat)
+        print(f"hot rows {hot_before} -> {hot_after}, database {size_before:.0f} MB -> "
+              f"{db_size(path):.0f} MB")
+        print(f"{'query (ms, best of ' + str(args.repeat) + ')':28} {'before':>9} {'after':>9}")
+        for name in before:
+            print(f"{name:28} {before[name]:9.2f} {after[name]:9.2f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
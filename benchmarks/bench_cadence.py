@@ -0,0 +1,97 @@
+"""Benchmark cadence checks and auto-placing drafts.
+
+    python benchmarks/bench_cadence.py --drafts 5000 --profiles 48
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.cadence import CadenceScheduler  # noqa: E402
+from socialsync.engagement import EngagementModel  # noqa: E402
+from socialsync.recurrence import RecurrenceRules  # noqa: E402
+from socialsync.store import PLATFORMS, ScheduleStore  # noqa: E402
+
+
+def populate(store, rules, model, profiles, posts, days, start, rng):
+    profile_ids = [store.get_or_create_profile(PLATFORMS[i % len(PLATFORMS)], f"client{i}")
+                   for i in range(profiles)]
+    # Posting history for the engagement heatmaps, already scheduled posts
+    # in the placement range and one daily recurring post per profile
+    history = [(rng.choice(profile_ids), "text", None, "", "",
+                start - timedelta(minutes=rng.randrange(180 * 24 * 60)), "posted")
+               for _ in range(posts)]
+    upcoming = [(rng.choice(profile_ids), "text", None, "", "",
+                 start + timedelta(minutes=rng.randrange(days * 24 * 60)), "pending")
+                for _ in range(posts // 50)]
+    store.add_posts(history + upcoming)
+    model.record_many((post_id, rng.randrange(100), rng.randrange(10), rng.randrange(5), 0, None)
+                      for post_id in range(1, len(history) + 1))
+    for profile_id in profile_ids:
+        rules.add_rule(profile_id, start.replace(hour=12, minute=0), "FREQ=DAILY")
+    return profile_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drafts", type=int, default=5000)
+    parser.add_argument("--profiles", type=int, default=48)
+    parser.add_argument("--posts", type=int, default=100000, help="posts already in the database")
+    parser.add_argument("--days", type=int, default=30, help="placement range")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    end = start + timedelta(days=args.days)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ScheduleStore(os.path.join(tmp, "bench.db"))
+        rules = RecurrenceRules(store)
+        model = EngagementModel(store)
+        profile_ids = populate(store, rules, model, args.profiles, args.posts, args.days, start, rng)
+        model.refresh()
+        scheduler = CadenceScheduler(store, rules, model)
+        print(f"{args.posts} posts, {args.profiles} profiles, {args.drafts} drafts over {args.days} days")
+
+        t0 = time.perf_counter()
+        checks = 1000
+        conflicts = sum(
+            bool(scheduler.check(rng.choice(profile_ids), start + timedelta(minutes=rng.randrange(args.days * 1440))))
+            for _ in range(checks)
+        )
+        print(f"check:             {(time.perf_counter() - t0) * 1000 / checks:8.2f} ms per save "
+              f"({conflicts}/{checks} in conflict)")
+
+        drafts = [(i, rng.choice(profile_ids)) for i in range(args.drafts)]
+        t0 = time.perf_counter()
+        placed = scheduler.place(drafts, start, end)
+        elapsed = time.perf_counter() - t0
+        print(f"place:             {elapsed * 1000:8.1f} ms ({len(placed)} placed, "
+              f"{len(drafts) - len(placed)} without a legal slot)")
+
+        # Every placement has to be legal against everything else
+        t0 = time.perf_counter()
+        by_profile = {}
+        for key, profile_id in drafts:
+            if key in placed:
+                by_profile.setdefault(profile_id, []).append(placed[key])
+        violations = 0
+        for profile_id, times in by_profile.items():
+            timeline = scheduler.timeline(profile_id, start, end)
+            for when in times:
+                timeline.add(when)
+            for when in times:
+                timeline.days[when.date().toordinal()].remove(when.hour * 60 + when.minute)
+                violations += bool(timeline.problems(when))
+                timeline.add(when)
+        print(f"verified:          {(time.perf_counter() - t0) * 1000:8.1f} ms ({violations} violations)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark ScheduleCalendar month navigation: frame time and widget count.
+
+Navigation is timed twice: warm, cycling through months already loaded,
+and cold, with every month but the one of the day listed below the
+calendar dropped from the schedule index before each step, so the month navigated to is read from
+the database again. Needs a display; on a headless
+machine run it under Xvfb:
+
+    xvfb-run -a python benchmarks/bench_calendar.py --navigations 1000 --per-day 300
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tkinter as tk
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from socialsync.store import ScheduleStore  # noqa: E402
+
+COLORS = {
+    "bg": "#151517",
+    "fg": "#ffffff",
+    "button": "#1890ff",
+    "border": "#26262A",
+    "sidebar": "#101010",
+    "hover": "#26262A",
+    "text_bg": "#1E1E1E"
+}
+PLATFORMS = ["Facebook", "Twitter", "Instagram", "LinkedIn", "TikTok"]
+
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("hootsuit_alt", os.path.join(ROOT, "Hootsuit-alt.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def populate(store, per_day, months):
+    rng = random.Random(0)
+    profiles = [store.get_or_create_profile(p) for p in PLATFORMS]
+    start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    rows = []
+    for day in range(months * 31):
+        base = start + timedelta(days=day)
+        for _ in range(per_day):
+            rows.append((
+                rng.choice(profiles), "text", None, "caption", "",
+                base + timedelta(minutes=rng.randrange(24 * 60)), "pending"
+            ))
+    store.add_posts(rows)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--navigations", type=int, default=1000)
+    parser.add_argument("--per-day", type=int, default=300)
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=16.0)
+    args = parser.parse_args()
+
+    app = load_app()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ScheduleStore(os.path.join(tmp, "bench.db"))
+        populate(store, args.per_day, args.months)
+
+        root = tk.Tk()
+        root.geometry("1200x800")
+        parent = tk.Frame(root)
+        parent.pack(fill=tk.BOTH, expand=True)
+        cal = app.ScheduleCalendar(parent, COLORS, store)
+        root.update()
+        # Let the startup workers (caption index, engagement fold) finish
+        while threading.active_count() > 1:
+            root.update()
+            time.sleep(0.05)
+
+        widgets_before = count_widgets(root)
+        times = {}
+        # Walk forward through the populated months and back again
+        steps = [cal.next_month] * args.months + [cal.previous_month] * args.months
+        first = cal.current_date
+        for mode in ("warm", "cold"):
+            times[mode] = []
+            cal.current_date = first
+            for i in range(args.navigations):
+                if mode == "cold":
+                    shown = cal.get_selected_date() or date.today()
+                    for year, month in list(cal.scheduled_posts.buckets):
+                        if (year, month) != (shown.year, shown.month):
+                            cal.scheduled_posts.invalidate(year, month)
+                t0 = time.perf_counter()
+                steps[i % len(steps)]()
+                root.update_idletasks()
+                times[mode].append((time.perf_counter() - t0) * 1000)
+        widgets_after = count_widgets(root)
+        root.destroy()
+        store.close()
+
+    print(f"{args.navigations} navigations, {args.per_day} posts/day")
+    for mode, samples in times.items():
+        over = sum(t > args.budget_ms for t in samples)
+        print(f"{mode} frame ms: p50 {percentile(samples, 50):.2f}  "
+              f"p99 {percentile(samples, 99):.2f}  max {max(samples):.2f}  "
+              f"over {args.budget_ms:.0f}ms: {over}")
+    print(f"widgets: {widgets_before} before, {widgets_after} after")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark dispatcher throughput and lateness against the fake publisher.
+
+    python benchmarks/bench_dispatch.py --posts 5000 --window 20
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.dispatch import Dispatcher, FakePublisher  # noqa: E402
+from socialsync.store import ScheduleStore  # noqa: E402
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--window", type=int, default=20,
+                        help="seconds over which the posts come due")
+    parser.add_argument("--latency", type=float, default=0.002,
+                        help="simulated publish latency in seconds")
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        store = ScheduleStore(path)
+        profile = store.get_or_create_profile("TikTok")
+        start = datetime.now().replace(microsecond=0) + timedelta(seconds=3)
+        store.add_posts(
+            (profile, "text", None, f"post {i}", "", start + timedelta(
+                seconds=i * args.window // args.posts
+            ), "pending")
+            for i in range(args.posts)
+        )
+
+        publisher = FakePublisher(latency=args.latency)
+        dispatcher = Dispatcher(
+            ScheduleStore(path, check_same_thread=False), publisher,
+            workers=args.workers
+        )
+        thread = threading.Thread(target=dispatcher.run)
+        t0 = time.time()
+        thread.start()
+        deadline = start.timestamp() + args.window + 30
+        while dispatcher.stats["posted"] + dispatcher.stats["failed"] < args.posts:
+            if time.time() > deadline:
+                break
+            time.sleep(0.1)
+        dispatcher.stop()
+        thread.join()
+        elapsed = time.time() - t0
+
+        lateness = dispatcher.stats["lateness"]
+        remaining = store.conn.execute(
+            "SELECT status, COUNT(*) FROM scheduled_posts GROUP BY status"
+        ).fetchall()
+        store.close()
+
+    print(f"posts: {args.posts} due over {args.window}s "
+          f"({args.posts * 60 // args.window}/min), workers {args.workers}")
+    print(f"published: {len(publisher.published)} in {elapsed:.1f}s")
+    print("lateness ms: p50 {:.1f}  p99 {:.1f}  max {:.1f}".format(
+        percentile(lateness, 50) * 1000,
+        percentile(lateness, 99) * 1000,
+        max(lateness or [0]) * 1000
+    ))
+    print("final status:", ", ".join(f"{s}={n}" for s, n in remaining))
+
+
+if __name__ == "__main__":
+    main()
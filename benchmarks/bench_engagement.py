@@ -0,0 +1,84 @@
+"""Benchmark folding engagement history into best-time heatmaps.
+
+    python benchmarks/bench_engagement.py --posts 1000000 --snapshots 2
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.engagement import EngagementModel  # noqa: E402
+from socialsync.store import ScheduleStore  # noqa: E402
+
+
+def populate(store, model, posts, snapshots, rng):
+    profiles = [store.get_or_create_profile(p, f"client{i}")
+                for p in ("Facebook", "Twitter", "Instagram", "TikTok") for i in range(25)]
+    now = datetime.now()
+    rows = []
+    for i in range(posts):
+        rows.append((rng.choice(profiles), "text", None, "", "",
+                     now - timedelta(minutes=rng.randrange(2 * 365 * 24 * 60)), "posted"))
+    store.add_posts(rows)
+    engagement = []
+    for snapshot in range(1, snapshots + 1):
+        for post_id in range(1, posts + 1):
+            engagement.append((post_id, rng.randrange(50) * snapshot, rng.randrange(5) * snapshot,
+                               rng.randrange(3) * snapshot, 0, None))
+    model.record_many(engagement)
+    return profiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--snapshots", type=int, default=2)
+    parser.add_argument("--new", type=int, default=10000, help="rows added before the incremental fold")
+    parser.add_argument("--slots-per-hour", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        store = ScheduleStore(path)
+        model = EngagementModel(store, args.slots_per_hour)
+        profiles = populate(store, model, args.posts, args.snapshots, rng)
+        rows = args.posts * args.snapshots
+        print(f"{rows} engagement rows for {args.posts} posts on {len(profiles)} profiles")
+
+        t0 = time.perf_counter()
+        model.refresh()
+        print(f"first fold:        {(time.perf_counter() - t0) * 1000:8.1f} ms (once per database)")
+
+        t0 = time.perf_counter()
+        reopened = EngagementModel(ScheduleStore(path), args.slots_per_hour)
+        reopened.refresh()
+        print(f"reopen + refresh:  {(time.perf_counter() - t0) * 1000:8.1f} ms (nothing new)")
+
+        model.record_many(
+            (rng.randrange(1, args.posts + 1), rng.randrange(500), rng.randrange(50), 0, 0, None)
+            for _ in range(args.new)
+        )
+        t0 = time.perf_counter()
+        folded = model.refresh()
+        print(f"incremental fold:  {(time.perf_counter() - t0) * 1000:8.1f} ms ({folded} new rows)")
+
+        t0 = time.perf_counter()
+        for _ in range(100):
+            model.best_slots(3, platforms=["TikTok"])
+        print(f"best_slots:        {(time.perf_counter() - t0) * 10:8.2f} ms per platform query")
+        t0 = time.perf_counter()
+        for _ in range(100):
+            model.weekday_strength()
+        print(f"weekday_strength:  {(time.perf_counter() - t0) * 10:8.2f} ms (all profiles)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
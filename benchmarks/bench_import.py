@@ -0,0 +1,93 @@
+"""Benchmark bulk CSV/JSONL import throughput and memory.
+
+Each format is imported twice: into a bare store, and into one with the
+search (PostSearch) and repeated-caption (CaptionIndex) triggers
+installed, as the app's database has them:
+
+    python benchmarks/bench_import.py --rows 100000
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.importer import import_file  # noqa: E402
+from socialsync.search import PostSearch  # noqa: E402
+from socialsync.similarity import CaptionIndex  # noqa: E402
+from socialsync.store import ScheduleStore  # noqa: E402
+
+PLATFORMS = ["Facebook", "Twitter", "Instagram", "LinkedIn", "TikTok"]
+FIELDS = ["profile", "platform", "datetime", "caption", "hashtags", "media_path"]
+
+
+def generate(rows, error_rate=0.01):
+    rng = random.Random(0)
+    start = datetime(2026, 1, 1)
+    for i in range(rows):
+        when = start + timedelta(minutes=rng.randrange(365 * 24 * 60))
+        row = {
+            "profile": f"client{rng.randrange(200)}",
+            "platform": rng.choice(PLATFORMS),
+            "datetime": when.strftime("%Y-%m-%d %H:%M"),
+            "caption": f"Post number {i} about our spring launch",
+            "hashtags": "#launch #spring",
+            "media_path": "" if i % 3 else f"/media/asset{i % 500}.jpg",
+        }
+        if rng.random() < error_rate:
+            row["datetime"] = "someday"
+        yield row
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        writer.writerows(generate(rows))
+
+
+def write_jsonl(path, rows):
+    with open(path, "w") as f:
+        for row in generate(rows):
+            f.write(json.dumps(row) + "\n")
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, writer in (("csv", write_csv), ("jsonl", write_jsonl)):
+            source = os.path.join(tmp, f"posts.{name}")
+            writer(source, args.rows)
+            for indexed in (False, True):
+                store = ScheduleStore(os.path.join(tmp, f"{name}-{int(indexed)}.db"))
+                if indexed:
+                    PostSearch(store)
+                    CaptionIndex(store)
+                rss_before = max_rss_mb()
+                t0 = time.perf_counter()
+                report = import_file(store, source, chunk_size=args.chunk_size)
+                elapsed = time.perf_counter() - t0
+                store.close()
+                label = f"{name} + triggers" if indexed else name
+                print(f"{label:>16}: {report.rows} rows in {elapsed:.2f}s "
+                      f"({report.rows / elapsed:,.0f} rows/s), {report.inserted} inserted, "
+                      f"{report.error_count} errors, max RSS +{max_rss_mb() - rss_before:.1f} MB")
+
+if __name__ == "__main__":
+    main()
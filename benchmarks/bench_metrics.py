@@ -0,0 +1,88 @@
+"""Benchmark polling many live posts into the metrics store.
+
+    python benchmarks/bench_metrics.py --posts 30000 --days 4 --interval 300
+
+Simulated time: every post is sampled once per interval, the buffer is
+flushed after each poll and compacted once per simulated hour.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.metrics import MetricsStore  # noqa: E402
+from socialsync.store import ScheduleStore  # noqa: E402
+
+
+def timed(fn, repeat=20):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=30000)
+    parser.add_argument("--days", type=float, default=4)
+    parser.add_argument("--interval", type=int, default=300, help="seconds between polls")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        store = ScheduleStore(path)
+        profiles = [store.get_or_create_profile("TikTok", f"client{i}") for i in range(50)]
+        store.add_posts((profiles[i % len(profiles)], "text", None, "", "", "2026-01-01 00:00:00", "posted")
+                        for i in range(args.posts))
+        post_ids = np.arange(1, args.posts + 1)
+        metrics = MetricsStore(store)
+
+        start = int(time.time()) // 86400 * 86400
+        counters = np.zeros((args.posts, 4), dtype=np.int64)
+        polls = int(args.days * 86400 // args.interval)
+        append_s = flush_s = compact_s = 0.0
+        compactions = 0
+        for poll in range(polls):
+            now = start + poll * args.interval
+            counters += rng.integers(0, [5, 2, 2, 60], size=counters.shape)
+            t0 = time.perf_counter()
+            metrics.append(post_ids, np.full(args.posts, now), counters)
+            t1 = time.perf_counter()
+            metrics.flush()
+            t2 = time.perf_counter()
+            append_s += t1 - t0
+            flush_s += t2 - t1
+            if (now + args.interval) // 3600 != now // 3600:
+                metrics.compact(now + args.interval)
+                compact_s += time.perf_counter() - t2
+                compactions += 1
+        end = start + polls * args.interval
+
+        rows = store.conn.execute("SELECT COUNT(*) FROM metric_segments").fetchone()[0]
+        store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size = os.path.getsize(path) / 2 ** 20
+        print(f"{args.posts} posts x {polls} polls = {args.posts * polls} samples")
+        print(f"append: {append_s / polls * 1000:.1f} ms/poll, flush: {flush_s / polls * 1000:.1f} ms/poll, "
+              f"compact: {compact_s / max(compactions, 1) * 1000:.1f} ms/hour")
+        print(f"database: {size:.1f} MiB, {rows} segment rows "
+              f"({size * 2 ** 20 / (args.posts * polls):.1f} bytes/sample)")
+
+        post = int(post_ids[len(post_ids) // 2])
+        print(f"series, last hour @1min:   {timed(lambda: metrics.series(post, end - 3600, end, 60)):6.2f} ms")
+        print(f"series, last day @1min:    {timed(lambda: metrics.series(post, end - 86400, end, 60)):6.2f} ms")
+        print(f"series, all days (auto):   {timed(lambda: metrics.series(post, start, end)):6.2f} ms")
+        per_profile = args.posts // len(profiles)
+        print(f"profile ({per_profile} posts), last day @1h: "
+              f"{timed(lambda: metrics.profile_series(profiles[0], end - 86400, end, 3600), 5):6.2f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
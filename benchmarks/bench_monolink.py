@@ -0,0 +1,215 @@
+"""Load-test the MonoLink redirect service on localhost.
+
+Starts the service as a separate process on a copy of N links, drives it
+from client processes over keep-alive connections with pipelining, then
+checks that every redirect was counted and times how long an edit takes
+to go live:
+
+    python benchmarks/bench_monolink.py --links 10000 --seconds 5 --clients 2
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from socialsync.monolink import LinkStore  # noqa: E402
+from socialsync.store import ScheduleStore  # noqa: E402
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def populate(path, links):
+    store = ScheduleStore(path)
+    link_store = LinkStore(store)
+    codes = [f"c{i}" for i in range(links)]
+    for code in codes:
+        link_store.create(f"https://example.com/landing/{code}", code=code)
+    store.close()
+    return codes
+
+
+async def connection(port, codes, deadline, pipeline, rng, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    done = 0
+    while time.perf_counter() < deadline:
+        batch = b"".join(
+            b"GET /" + rng.choice(codes) + b" HTTP/1.1\r\nHost: bench\r\n\r\n"
+            for _ in range(pipeline)
+        )
+        started = time.perf_counter()
+        writer.write(batch)
+        # Every answer is a 302 without a body
+        seen, data = 0, b""
+        while seen < pipeline:
+            data += await reader.read(65536)
+            seen = data.count(b"\r\n\r\n")
+        latencies.append(time.perf_counter() - started)
+        done += pipeline
+    writer.close()
+    return done
+
+
+async def drive(port, codes, seconds, connections, pipeline, seed):
+    rng = random.Random(seed)
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    counts = await asyncio.gather(*(
+        connection(port, codes, deadline, pipeline, rng, latencies) for _ in range(connections)
+    ))
+    return sum(counts), latencies
+
+
+def run_client(port, codes, args, seed, results):
+    codes = [code.encode("ascii") for code in codes]
+    results.put(asyncio.run(drive(port, codes, args.seconds, args.connections, args.pipeline, seed)))
+
+
+async def location(port, code):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /{code} HTTP/1.1\r\nConnection: close\r\n\r\n".encode("ascii"))
+    data = await reader.read()
+    writer.close()
+    for line in data.split(b"\r\n"):
+        if line.lower().startswith(b"location:"):
+            return line.split(b":", 1)[1].strip().decode("ascii")
+    return None
+
+
+# What a browser sends on a click; the load generator's requests are bare
+BROWSER_HEADERS = (
+    "Host: 127.0.0.1\r\n"
+    "User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0\r\n"
+    "Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8\r\n"
+    "Accept-Language: en-US,en;q=0.5\r\n"
+    "Accept-Encoding: gzip, deflate, br\r\n"
+    "Connection: close\r\n"
+)
+
+
+async def browser_status(port, code):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /{code} HTTP/1.1\r\n{BROWSER_HEADERS}\r\n".encode("ascii"))
+    data = await reader.read()
+    writer.close()
+    return data.split(b"\r\n", 1)[0].decode("ascii")
+
+
+def wait_for_port(port, process, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("MonoLink service exited")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("MonoLink service did not start")
+
+
+def total_clicks(path):
+    store = ScheduleStore(path)
+    try:
+        return store.conn.execute("SELECT COALESCE(SUM(clicks), 0) FROM links").fetchone()[0]
+    finally:
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--links", type=int, default=10000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--connections", type=int, default=32, help="connections per client")
+    parser.add_argument("--pipeline", type=int, default=8, help="requests in flight per connection")
+    parser.add_argument("--workers", type=int, default=1, help="service processes")
+    parser.add_argument("--flush", type=float, default=1.0)
+    parser.add_argument("--reload", type=float, default=0.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        t0 = time.perf_counter()
+        codes = populate(path, args.links)
+        print(f"{args.links} links created in {time.perf_counter() - t0:.1f}s")
+
+        port = free_port()
+        service = subprocess.Popen(
+            [sys.executable, "-m", "socialsync.monolink", "--db", path, "--port", str(port),
+             "--workers", str(args.workers), "--flush", str(args.flush),
+             "--reload", str(args.reload)],
+            cwd=ROOT, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for_port(port, service)
+            time.sleep(0.5 * args.workers)  # every worker listening
+
+            status = asyncio.run(browser_status(port, codes[0]))
+            print(f"browser-style request: {status}")
+            if not status.endswith("302 Found"):
+                raise RuntimeError("a request with browser headers was not redirected")
+            probe_clicks = 1  # that redirect is counted too, apart from the load
+
+            ctx = multiprocessing.get_context("spawn")
+            results = ctx.Queue()
+            clients = [
+                ctx.Process(target=run_client, args=(port, codes, args, seed, results))
+                for seed in range(args.clients)
+            ]
+            for client in clients:
+                client.start()
+            outcomes = [results.get() for _ in clients]
+            for client in clients:
+                client.join()
+            requests = sum(done for done, _ in outcomes)
+            latencies = [latency for _, batch in outcomes for latency in batch]
+            print(f"{requests} redirects in {args.seconds:.0f}s: {requests / args.seconds:.0f}/s  "
+                  f"({args.workers} service workers, {args.clients} clients x "
+                  f"{args.connections} connections x {args.pipeline} pipelined)")
+            print(f"batch round trip ms: p50 {percentile(latencies, 50) * 1000:.2f}  "
+                  f"p99 {percentile(latencies, 99) * 1000:.2f}")
+
+            deadline = time.time() + args.flush * 3 + 2
+            while total_clicks(path) - probe_clicks < requests and time.time() < deadline:
+                time.sleep(0.1)
+            print(f"clicks counted: {total_clicks(path) - probe_clicks} of {requests} "
+                  f"(+{probe_clicks} browser-style)")
+
+            store = ScheduleStore(path)
+            link_store = LinkStore(store)
+            link_id = store.conn.execute("SELECT id FROM links WHERE code = 'c0'").fetchone()[0]
+            link_store.update(link_id, target="https://example.com/edited")
+            t0 = time.perf_counter()
+            while asyncio.run(location(port, "c0")) != "https://example.com/edited":
+                time.sleep(0.005)
+            print(f"edit live after {(time.perf_counter() - t0) * 1000:.0f} ms "
+                  f"(reload interval {args.reload * 1000:.0f} ms)")
+            store.close()
+        finally:
+            service.terminate()
+            service.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Benchmark recovering a dispatcher that died with many deliveries in flight.
+
+The database is left as a crash would leave it: every post running and
+leased to worker w1, with its outbox delivery sent, sending or pending.
+Recovery is timed twice, by w1 restarting and by another worker taking
+over once w1's leases expired:
+
+    python benchmarks/bench_outbox.py --posts 100000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.dispatch import Dispatcher, FakePublisher  # noqa: E402
+from socialsync.outbox import Outbox  # noqa: E402
+from socialsync.sharding import Membership  # noqa: E402
+from socialsync.store import PLATFORMS, ScheduleStore  # noqa: E402
+
+
+def populate(path, posts, profiles, sent, sending):
+    rng = random.Random(0)
+    store = ScheduleStore(path)
+    profile_ids = [store.get_or_create_profile(PLATFORMS[i % len(PLATFORMS)], f"client{i}")
+                   for i in range(profiles)]
+    start = datetime.now() - timedelta(minutes=10)
+    store.add_posts(
+        (rng.choice(profile_ids), "text", None, f"post {i}", "",
+         start + timedelta(seconds=rng.randrange(300)), "pending")
+        for i in range(posts)
+    )
+    outbox = Outbox(store)
+    now = time.time()
+    with store.conn:
+        store.conn.execute(
+            "UPDATE scheduled_posts SET status = 'running', lease_owner = 'w1', lease_expires = ?",
+            (now + 3600,)
+        )
+    outbox.adopt("w1", now)
+    # What w1 got through before it died
+    states = ["sent"] * int(posts * sent) + ["sending"] * int(posts * sending)
+    states += ["pending"] * (posts - len(states))
+    rng.shuffle(states)
+    with store.conn:
+        store.conn.executemany(
+            "UPDATE outbox SET status = ?, attempts = ?, sent_at = ? WHERE post_id = ?",
+            ((state, int(state == "sent"), now if state == "sent" else None, post_id)
+             for post_id, state in enumerate(states, 1))
+        )
+    store.close()
+
+
+def sent_keys(path):
+    store = ScheduleStore(path)
+    keys = {row[0] for row in store.conn.execute(
+        "SELECT idempotency_key FROM outbox WHERE status = 'sent'"
+    )}
+    store.close()
+    return keys
+
+
+def recover(path, worker_id, expire, args):
+    store = ScheduleStore(path)
+    if expire:
+        # w1 is gone for good and its leases have run out
+        with store.conn:
+            store.conn.execute("UPDATE scheduled_posts SET lease_expires = 0")
+    publisher = FakePublisher()
+    dispatcher = Dispatcher(
+        store, publisher,
+        workers=args.threads,
+        batch_size=args.batch,
+        membership=Membership(store, worker_id)
+    )
+    t0 = time.perf_counter()
+    wall0 = time.time()
+    dispatcher.run(once=True)
+    elapsed = time.perf_counter() - t0
+    first = min((at for _, _, at in publisher.published), default=wall0) - wall0
+    counts = dict(store.conn.execute(
+        "SELECT status, COUNT(*) FROM scheduled_posts GROUP BY status"
+    ).fetchall())
+    store.close()
+    return elapsed, first, publisher, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--profiles", type=int, default=500)
+    parser.add_argument("--sent", type=float, default=0.4, help="share already confirmed")
+    parser.add_argument("--sending", type=float, default=0.1, help="share in flight at the crash")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "crashed.db")
+        t0 = time.perf_counter()
+        populate(template, args.posts, args.profiles, args.sent, args.sending)
+        print(f"{args.posts} in-flight deliveries ({args.sent:.0%} sent, {args.sending:.0%} sending) "
+              f"built in {time.perf_counter() - t0:.1f}s")
+        confirmed = sent_keys(template)
+        for label, worker_id, expire in (("restart as w1", "w1", False),
+                                         ("takeover by w2", "w2", True)):
+            path = os.path.join(tmp, f"{worker_id}.db")
+            shutil.copy(template, path)
+            elapsed, first, publisher, counts = recover(path, worker_id, expire, args)
+            resent = len(publisher.keys & confirmed)
+            print(f"{label:15} {elapsed:6.2f}s  first send after {first * 1000:6.1f} ms  "
+                  f"sent {len(publisher.published)} ({len(publisher.published) / elapsed:.0f}/s)  "
+                  f"confirmed resent {resent}  "
+                  f"final {', '.join(f'{s}={n}' for s, n in sorted(counts.items()))}")
+
+
+if __name__ == "__main__":
+    main()
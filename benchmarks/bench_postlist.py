@@ -0,0 +1,120 @@
+"""Benchmark the calendar's day post list: showing, scrolling and filtering busy days.
+
+Needs a display; on a headless machine run it under Xvfb:
+
+    xvfb-run -a python benchmarks/bench_postlist.py --sizes 10 1000 10000
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import time
+import tkinter as tk
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from socialsync.store import ScheduleStore  # noqa: E402
+
+COLORS = {
+    "bg": "#151517",
+    "fg": "#ffffff",
+    "button": "#1890ff",
+    "border": "#26262A",
+    "sidebar": "#101010",
+    "hover": "#26262A",
+    "text_bg": "#1E1E1E"
+}
+PLATFORMS = ["Facebook", "Twitter", "Instagram", "LinkedIn", "TikTok"]
+
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("hootsuit_alt", os.path.join(ROOT, "Hootsuit-alt.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def populate(store, sizes, start):
+    # One day per size, each holding that many posts
+    rng = random.Random(0)
+    profiles = [store.get_or_create_profile(p) for p in PLATFORMS]
+    days = []
+    rows = []
+    for i, size in enumerate(sizes):
+        day = start + timedelta(days=i)
+        base = datetime.combine(day, datetime.min.time())
+        rows += [
+            (rng.choice(profiles), "text", None, f"caption {n}", "",
+             base + timedelta(seconds=rng.randrange(86400)), rng.choice(["pending", "posted"]))
+            for n in range(size)
+        ]
+        days.append(day)
+    store.add_posts(rows)
+    return days
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--scrolls", type=int, default=500)
+    args = parser.parse_args()
+
+    app = load_app()
+    start = date.today().replace(day=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ScheduleStore(os.path.join(tmp, "bench.db"))
+        days = populate(store, args.sizes, start)
+
+        root = tk.Tk()
+        root.geometry("1200x800")
+        parent = tk.Frame(root)
+        parent.pack(fill=tk.BOTH, expand=True)
+        cal = app.ScheduleCalendar(parent, COLORS, store)
+        post_list = cal.post_list
+        root.update()
+
+        for size, day in zip(args.sizes, days):
+            t0 = time.perf_counter()
+            cal.on_day_click(day)
+            root.update_idletasks()
+            shown = (time.perf_counter() - t0) * 1000
+
+            times = []
+            for i in range(args.scrolls):
+                t0 = time.perf_counter()
+                post_list.canvas.yview_scroll(1 if i % 200 < 100 else -1, "units")
+                root.update_idletasks()
+                times.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            post_list.filter_platform(PLATFORMS[0])
+            post_list.sort_var.set("Status")
+            post_list.apply()
+            post_list.filter_platform(app.ALL_PLATFORMS)
+            root.update_idletasks()
+            refiltered = (time.perf_counter() - t0) * 1000
+            post_list.sort_var.set("Time")
+
+            print(f"{size:6d} posts: show {shown:7.2f} ms  scroll p50 {percentile(times, 50):.2f} "
+                  f"p99 {percentile(times, 99):.2f} ms  filter+sort {refiltered:7.2f} ms  "
+                  f"widgets {count_widgets(root)}")
+        root.destroy()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark the profile sidebar's index: loading, typing and pending counts.
+
+For each size, creates that many profiles spread over the platforms
+(with pending posts on them), then times what the sidebar does off and
+on the Tk thread: loading the ProfileIndex (worker thread), filtering
+and grouping on every keystroke of a few typed queries, and reading the
+pending counts of one screen of rows:
+
+    python benchmarks/bench_profiles.py --sizes 1000 10000 100000
+
+The widgets are a fixed pool sized to the window, so what the sidebar
+builds at startup does not depend on the size.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.profiles import ProfileIndex, pending_counts  # noqa: E402
+from socialsync.store import PLATFORMS, ScheduleStore, format_datetime  # noqa: E402
+
+SYLLABLES = ("ac me ko ra bel lo vi ta nor du sen pa ri zo mar ket fin lux "
+             "eco sol ter gra nu").split()
+KINDS = ["Shoes", "Coffee", "Studio", "Fitness", "Travel", "Bakery", "Dental", "Motors",
+         "Books", "Garden", "Official", "Support", "News", "Careers"]
+REGIONS = ["", " UK", " US", " DE", " FR", " ES", " JP", " AU"]
+QUERIES = ["acme sh", "coffee", "ta", "marfin official", "support de", "zzz"]
+SCREEN_ROWS = 30
+
+
+def profile_name(rng):
+    brand = "".join(rng.choice(SYLLABLES) for _ in range(rng.randrange(2, 4))).capitalize()
+    return f"{brand} {rng.choice(KINDS)}{rng.choice(REGIONS)}"
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def populate(store, profiles, rng):
+    platform_ids = [store.get_or_create_platform(name) for name in PLATFORMS]
+    added = format_datetime(datetime.now())
+    store.conn.executemany(
+        "INSERT INTO profiles (platform_id, profile_name, added_date) VALUES (?, ?, ?)",
+        ((rng.choice(platform_ids), profile_name(rng), added) for _ in range(profiles))
+    )
+    store.conn.commit()
+    ids = [row[0] for row in store.conn.execute("SELECT id FROM profiles")]
+    store.add_posts([
+        (rng.choice(ids), "text", None, "post", "", "2030-01-01 10:00:00",
+         "pending" if rng.random() < 0.5 else "posted")
+        for _ in range(profiles * 5)
+    ])
+    store.conn.execute("ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'profiles':>9} {'load ms':>9} {'keystroke p50':>14} {'p99':>8} {'max':>8} "
+          f"{'screen counts ms':>17}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ScheduleStore(os.path.join(tmp, "bench.db"))
+            populate(store, size, rng)
+
+            t0 = time.perf_counter()
+            index = ProfileIndex.from_store(store)
+            load = time.perf_counter() - t0
+
+            # Type each query a letter at a time, then clear the box
+            keystrokes = []
+            for query in QUERIES:
+                for end in list(range(1, len(query) + 1)) + [0]:
+                    t0 = time.perf_counter()
+                    index.grouped(index.search(query[:end]))
+                    keystrokes.append(time.perf_counter() - t0)
+
+            counts = []
+            for _ in range(50):
+                first = rng.randrange(max(1, size - SCREEN_ROWS))
+                ids = index.ids[first:first + SCREEN_ROWS]
+                t0 = time.perf_counter()
+                pending_counts(store, ids)
+                counts.append(time.perf_counter() - t0)
+
+            print(f"{size:9} {load * 1000:9.1f} {percentile(keystrokes, 50) * 1000:14.2f} "
+                  f"{percentile(keystrokes, 99) * 1000:8.2f} {max(keystrokes) * 1000:8.2f} "
+                  f"{percentile(counts, 50) * 1000:17.2f}")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
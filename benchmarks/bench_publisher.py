@@ -0,0 +1,104 @@
+"""Benchmark PublishEngine throughput (posts/sec) against the local stub server.
+
+    python benchmarks/bench_publisher.py --posts 500 --delay 0.01
+
+Each post fans out to every platform; the stub runs in a separate process.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.publisher import PLATFORMS, PublishEngine  # noqa: E402
+from socialsync.stub_server import main as stub_main  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("stub server did not start")
+
+
+async def run(base_url, posts, platforms, concurrency):
+    engine = PublishEngine.from_base_url(base_url, platforms, concurrency=concurrency)
+    post = {"id": 1, "caption": "benchmark", "hashtags": "#bench"}
+    t0 = time.perf_counter()
+    results = await engine.publish_many(
+        [dict(post, id=i) for i in range(posts)], platforms
+    )
+    elapsed = time.perf_counter() - t0
+    await engine.close()
+    flat = [r for rs in results for r in rs]
+    ok = sum(r.ok for r in flat)
+    latencies = sorted(r.latency for r in flat)
+    connections = sum(a.pool.opened for a in engine.adapters.values())
+    return elapsed, ok, len(flat), latencies[len(latencies) // 2], connections
+
+
+async def sequential(base_url, posts, platforms):
+    # Baseline: one platform after another, one connection each.
+    engine = PublishEngine.from_base_url(base_url, platforms, concurrency=1)
+    t0 = time.perf_counter()
+    for i in range(posts):
+        for name in platforms:
+            await engine.publish_to(name, {"id": i, "caption": "benchmark"})
+    elapsed = time.perf_counter() - t0
+    await engine.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--delay", type=float, default=0.01,
+                        help="stub response delay in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--platforms", nargs="+",
+                        default=["Facebook", "Instagram", "Twitter", "LinkedIn", "TikTok"],
+                        choices=PLATFORMS)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = multiprocessing.Process(
+        target=stub_main, args=(["--port", str(port), "--delay", str(args.delay)],),
+        daemon=True
+    )
+    server.start()
+    try:
+        wait_for(port)
+        base_url = f"http://127.0.0.1:{port}"
+        baseline_posts = max(1, args.posts // 10)
+        baseline = asyncio.run(sequential(base_url, baseline_posts, args.platforms))
+        print(f"{len(args.platforms)} platforms/post, stub delay {args.delay * 1000:.0f} ms")
+        print(f"sequential baseline: {baseline_posts / baseline:8.1f} posts/s")
+        print(f"{'concurrency':>11} {'posts/s':>9} {'ok':>7} {'p50 ms':>7} {'conns':>6}")
+        for concurrency in args.concurrency:
+            elapsed, ok, total, p50, conns = asyncio.run(
+                run(base_url, args.posts, args.platforms, concurrency)
+            )
+            print(f"{concurrency:>11} {args.posts / elapsed:>9.1f} "
+                  f"{ok:>3}/{total:<3} {p50 * 1000:>7.1f} {conns:>6}")
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark month rendering and materialization with long-running rules.
+
+    python benchmarks/bench_recurrence.py --rules 500 --years 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.recurrence import RecurrenceRules  # noqa: E402
+from socialsync.schedule_index import ScheduleIndex  # noqa: E402
+from socialsync.store import ScheduleStore  # noqa: E402
+
+RULES = [
+    "FREQ=DAILY",
+    "FREQ=WEEKLY;BYDAY=TU,TH;BYHOUR=19;BYMINUTE=0;BYSECOND=0",
+    "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "FREQ=MONTHLY;BYMONTHDAY=1,15",
+    "FREQ=HOURLY;INTERVAL=6",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, default=500)
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    now = datetime.now().replace(microsecond=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ScheduleStore(os.path.join(tmp, "bench.db"))
+        rules = RecurrenceRules(store)
+        profiles = [store.get_or_create_profile("Twitter", f"client{i}") for i in range(20)]
+        for i in range(args.rules):
+            start = now - timedelta(days=rng.randrange(args.years * 365))
+            rules.add_rule(rng.choice(profiles), start, RULES[i % len(RULES)], caption=f"series {i}")
+
+        index = ScheduleIndex(store, rules)
+        t0 = time.perf_counter()
+        bucket = index.month(now.year, now.month)
+        cold = time.perf_counter() - t0
+        shown = sum(bucket.day_counts.values())
+
+        timings = []
+        for offset in range(1, 13):
+            year, month = divmod(now.month - 1 + offset, 12)
+            index.invalidate()
+            t0 = time.perf_counter()
+            index.month(now.year + year, month + 1)
+            timings.append(time.perf_counter() - t0)
+        timings.sort()
+
+        t0 = time.perf_counter()
+        created = rules.materialize(now + timedelta(minutes=1), now=now)
+        first = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        rules.materialize(now + timedelta(minutes=2), now=now)
+        steady = time.perf_counter() - t0
+        rows = store.conn.execute("SELECT COUNT(*) FROM scheduled_posts").fetchone()[0]
+
+        print(f"{args.rules} rules over up to {args.years} years")
+        print(f"month load: cold {cold * 1000:.1f} ms ({shown} occurrences), "
+              f"warm p50 {timings[len(timings) // 2] * 1000:.1f} ms, "
+              f"max {timings[-1] * 1000:.1f} ms")
+        print(f"materialize: first pass {first * 1000:.1f} ms ({created} posts), "
+              f"next pass {steady * 1000:.2f} ms, {rows} rows in scheduled_posts")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
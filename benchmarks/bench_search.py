@@ -0,0 +1,94 @@
+"""Benchmark FTS5/hashtag search against a LIKE scan.
+
+    python benchmarks/bench_search.py --posts 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.search import PostSearch  # noqa: E402
+from socialsync.store import POST_COLUMNS, POST_FROM, ScheduleStore, format_datetime  # noqa: E402
+
+WORDS = ("spring summer launch sale webinar recap behind scenes team update giveaway "
+         "tutorial product feature customer story event live weekly tips guide news").split()
+TAGS = [f"tag{i}" for i in range(2000)] + ["launch", "sale", "tbt", "mondaymotivation"]
+
+
+def populate(store, count):
+    rng = random.Random(0)
+    profiles = [store.get_or_create_profile(p, f"client{i}")
+                for p in ("Facebook", "Twitter", "Instagram") for i in range(20)]
+    start = datetime(2026, 1, 1)
+    batch = []
+    for i in range(count):
+        caption = " ".join(rng.choice(WORDS) for _ in range(12)) + f" ref{i}"
+        # Skewed tag popularity: a few common tags, a long tail
+        tags = {rng.choice(TAGS[-4:]) if rng.random() < 0.1 else rng.choice(TAGS) for _ in range(3)}
+        batch.append((rng.choice(profiles), "text", None, caption, " ".join("#" + t for t in tags),
+                      start + timedelta(minutes=rng.randrange(2 * 365 * 24 * 60)), "pending"))
+        if len(batch) == 50000:
+            store.add_posts(batch)
+            batch = []
+    store.add_posts(batch)
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ScheduleStore(os.path.join(tmp, "bench.db"))
+        search = PostSearch(store)
+        t0 = time.perf_counter()
+        populate(store, args.posts)
+        print(f"{args.posts} posts indexed in {time.perf_counter() - t0:.1f}s "
+              f"(triggers on every insert)")
+
+        quarter = (datetime(2026, 10, 1), datetime(2027, 1, 1))
+        # The scan the search replaces: LIKE over both columns, date ordered
+        like_sql = ("SELECT " + POST_COLUMNS + " " + POST_FROM +
+                    "WHERE ({}) AND p.schedule_date >= ? AND p.schedule_date < ? "
+                    "ORDER BY p.schedule_date LIMIT 50")
+        text = "(' ' || p.caption || ' ' || p.hashtags || ' ') LIKE '%{}%'"
+        cases = [
+            ("#launch next quarter", dict(text="#launch", start=quarter[0], end=quarter[1]),
+             text.format(" #launch ")),
+            ("#tag1234 (rare tag)", dict(text="#tag1234"), text.format(" #tag1234 ")),
+            ("ref123456 (rare word)", dict(text="ref123456", prefix=False), text.format(" ref123456 ")),
+            ("webin (prefix)", dict(text="webin"), text.format(" webin")),
+            ("we (short prefix)", dict(text="we"), text.format(" we")),
+            ("#sale webin", dict(text="#sale webin"),
+             text.format(" #sale ") + " AND " + text.format(" webin")),
+            ("#tag1234 recap", dict(text="#tag1234 recap"),
+             text.format(" #tag1234 ") + " AND " + text.format(" recap")),
+        ]
+        print(f"{'query':<24} {'search ms':>10} {'like ms':>9} {'rows':>6}")
+        for label, kwargs, where in cases:
+            search_ms, rows = timed(lambda: search.search(limit=50, **kwargs), args.repeat)
+            start, end = kwargs.get("start"), kwargs.get("end")
+            params = (format_datetime(start) if start else "", format_datetime(end) if end else "~")
+            like_ms, _ = timed(lambda: store.conn.execute(like_sql.format(where), params).fetchall(), 1)
+            print(f"{label:<24} {search_ms:10.2f} {like_ms:9.1f} {len(rows):>6}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
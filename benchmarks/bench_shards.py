@@ -0,0 +1,154 @@
+"""Benchmark sharded dispatch: throughput by worker process count, and crash recovery.
+
+Each worker is its own process publishing over HTTP to the local stub
+platform API, which runs in this process so it can count requests:
+
+    python benchmarks/bench_shards.py --posts 4000 --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.dispatch import Dispatcher  # noqa: E402
+from socialsync.publisher import AsyncPublisher  # noqa: E402
+from socialsync.sharding import Membership  # noqa: E402
+from socialsync.store import PLATFORMS, ScheduleStore  # noqa: E402
+from socialsync.stub_server import StubServer  # noqa: E402
+
+
+def start_stub(delay):
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(StubServer(delay=delay).start(), loop).result()
+
+
+def populate(path, posts, profiles):
+    # Everything is already due, spread over many profiles
+    rng = random.Random(0)
+    store = ScheduleStore(path)
+    profile_ids = [store.get_or_create_profile(PLATFORMS[i % len(PLATFORMS)], f"client{i}")
+                   for i in range(profiles)]
+    start = datetime.now() - timedelta(minutes=5)
+    store.add_posts(
+        (rng.choice(profile_ids), "text", None, f"post {i}", "",
+         start + timedelta(seconds=rng.randrange(240)), "pending")
+        for i in range(posts)
+    )
+    store.close()
+
+
+def run_worker(path, base_url, worker_id, args, ready, results):
+    store = ScheduleStore(path)
+    membership = Membership(store, worker_id, ttl=args.worker_ttl)
+    membership.heartbeat()
+    publisher = AsyncPublisher(base_url, concurrency=args.concurrency)
+    dispatcher = Dispatcher(
+        store, publisher,
+        workers=args.threads,
+        membership=membership,
+        lease=args.lease,
+        heartbeat_interval=args.heartbeat,
+        refresh_interval=0.5
+    )
+    signal.signal(signal.SIGTERM, lambda *_: dispatcher.stop())
+    ready.wait()  # every worker has registered: the first ring is the full one
+    dispatcher.run()
+    publisher.close()
+    results.put((worker_id, dispatcher.stats["posted"], dispatcher.stats["reclaimed"]))
+    store.close()
+
+
+def unfinished(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM scheduled_posts WHERE status IN ('pending', 'running')"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def run(args, stub, workers, kill_after=None):
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        populate(path, args.posts, args.profiles)
+        ready, results = ctx.Barrier(workers + 1), ctx.Queue()
+        processes = [
+            ctx.Process(target=run_worker, args=(path, stub.base_url, f"w{i}", args, ready, results))
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        requests_before, duplicates_before = stub.requests, stub.duplicates
+        ready.wait()
+        t0 = time.perf_counter()
+        killed = False
+        while unfinished(path):
+            if kill_after is not None and not killed and time.perf_counter() - t0 >= kill_after:
+                processes[0].kill()  # no cleanup: its leases have to expire
+                killed = True
+            time.sleep(0.02)
+        elapsed = time.perf_counter() - t0
+        for process in processes[killed:]:
+            process.terminate()
+        per_worker = sorted(results.get() for _ in range(workers - killed))
+        for process in processes:
+            process.join()
+        return (elapsed, stub.requests - requests_before, stub.duplicates - duplicates_before,
+                per_worker)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=4000)
+    parser.add_argument("--profiles", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--delay", type=float, default=0.05, help="stub API response time")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests per platform per worker")
+    parser.add_argument("--threads", type=int, default=16, help="publish threads per worker")
+    parser.add_argument("--lease", type=float, default=3.0)
+    parser.add_argument("--heartbeat", type=float, default=0.5)
+    parser.add_argument("--worker-ttl", type=float, default=2.0)
+    parser.add_argument("--kill-after", type=float, default=1.0,
+                        help="seconds into the crash run to kill a worker")
+    args = parser.parse_args()
+
+    stub = start_stub(args.delay)
+    print(f"{args.posts} due posts over {args.profiles} profiles, stub delay {args.delay * 1000:.0f} ms")
+    baseline = None
+    for workers in args.workers:
+        elapsed, requests, _, per_worker = run(args, stub, workers)
+        rate = args.posts / elapsed
+        baseline = baseline or rate / workers
+        print(f"{workers} workers: {elapsed:6.2f}s  {rate:7.0f} posts/s  "
+              f"({rate / baseline / workers:.0%} of linear)  "
+              f"split {'/'.join(str(posted) for _, posted, _ in per_worker)}  "
+              f"duplicates {requests - args.posts}")
+
+    workers = max(args.workers)
+    if workers > 1:
+        elapsed, requests, duplicates, per_worker = run(
+            args, stub, workers, kill_after=args.kill_after
+        )
+        reclaimed = sum(count for _, _, count in per_worker)
+        print(f"crash: killed 1 of {workers} workers after {args.kill_after:.1f}s; "
+              f"all posted after {elapsed:.2f}s, {reclaimed} leases reclaimed, "
+              f"{requests - args.posts} sent again ({duplicates} caught by idempotency key), "
+              f"{requests - args.posts - duplicates} published twice")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Benchmark near-duplicate caption checks: accuracy and latency.
+
+Builds a history of generated captions over several years, fingerprints
+it, then checks edited copies of random past captions (each should find
+its source) and fresh captions (each should find nothing):
+
+    python benchmarks/bench_similarity.py --posts 1000000
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.similarity import DAYS, DISTANCE, CaptionIndex, distance, fingerprint  # noqa: E402
+from socialsync.store import PLATFORMS, ScheduleStore  # noqa: E402
+
+# The most frequent words, as in English text; the rest are made up
+COMMON = ("the and to a of in for is on our you with this it at we your be are new from now "
+          "all get today by more out just up").split()
+OPENERS = ["New on the blog:", "Big news!", "Don't miss it:", "Today only:", "Hey everyone,",
+           "Reminder:", "Just in:", "Weekend vibes:"]
+
+
+class Captions:
+    def __init__(self, rng, vocabulary=20000):
+        self.rng = rng
+        self.words = COMMON + [f"word{i}" for i in range(vocabulary - len(COMMON))]
+        # Zipf-like: a few words are everywhere, most are rare
+        self.cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(vocabulary)))
+
+    def caption(self):
+        rng = self.rng
+        words = rng.choices(self.words, cum_weights=self.cum_weights, k=rng.randrange(8, 30))
+        tags = [f"#tag{rng.randrange(500)}" for _ in range(rng.randrange(0, 4))]
+        return " ".join([rng.choice(OPENERS)] + words + tags)
+
+    def edit(self, caption, kind):
+        rng = self.rng
+        words = caption.split()
+        if kind == "identical":
+            return caption
+        if kind == "case+punctuation":
+            return caption.upper() + "!!"
+        if kind == "add hashtag":
+            return caption + f" #tag{rng.randrange(500)}"
+        if kind == "drop word":
+            del words[rng.randrange(1, len(words))]
+        elif kind == "swap words":
+            i = rng.randrange(1, len(words) - 1)
+            words[i], words[i + 1] = words[i + 1], words[i]
+        elif kind == "1 word changed":
+            words[rng.randrange(1, len(words))] = rng.choice(self.words)
+        elif kind == "2 words changed":
+            for i in rng.sample(range(1, len(words)), 2):
+                words[i] = rng.choice(self.words)
+        return " ".join(words)
+
+
+EDITS = ["identical", "case+punctuation", "add hashtag", "swap words", "drop word",
+         "1 word changed", "2 words changed"]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def populate(store, captions, posts, years, profiles, now, rng):
+    start = now - timedelta(days=365 * years)
+    span = int((now - start).total_seconds())
+    batch = []
+    for _ in range(posts):
+        batch.append((rng.choice(profiles), "text", None, captions.caption(), "",
+                      start + timedelta(seconds=rng.randrange(span)), "posted"))
+        if len(batch) >= 50000:
+            store.add_posts(batch)
+            batch = []
+    store.add_posts(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=200000)
+    parser.add_argument("--years", type=float, default=3.0)
+    parser.add_argument("--profiles", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=300, help="per edit kind")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    captions = Captions(rng)
+    now = datetime(2025, 6, 15, 9, 0, 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        store = ScheduleStore(path)
+        profiles = [store.get_or_create_profile(PLATFORMS[i % len(PLATFORMS)], f"account{i}")
+                    for i in range(args.profiles)]
+        index = CaptionIndex(store)
+        t0 = time.perf_counter()
+        populate(store, captions, args.posts, args.years, profiles, now, rng)
+        print(f"{args.posts} captions over {args.years:g} years inserted in "
+              f"{time.perf_counter() - t0:.1f}s")
+        pages = store.conn.execute("PRAGMA page_count").fetchone()[0]
+        t0 = time.perf_counter()
+        done = index.refresh()
+        elapsed = time.perf_counter() - t0
+        added = store.conn.execute("PRAGMA page_count").fetchone()[0] - pages
+        page_size = store.conn.execute("PRAGMA page_size").fetchone()[0]
+        print(f"fingerprinted {done} in {elapsed:.1f}s ({done / elapsed:.0f}/s), "
+              f"index {added * page_size / 2 ** 20:.0f} MB")
+
+        # Incremental: one new post, then the refresh a save would run
+        latencies = []
+        for _ in range(200):
+            profile_id = rng.choice(profiles)
+            t0 = time.perf_counter()
+            store.add_post(profile_id, now + timedelta(days=1), caption=captions.caption())
+            index.refresh()
+            latencies.append(time.perf_counter() - t0)
+        print(f"insert + refresh ms: p50 {percentile(latencies, 50) * 1000:.2f}  "
+              f"p99 {percentile(latencies, 99) * 1000:.2f}")
+
+        ids = [row[0] for row in store.conn.execute("SELECT id FROM scheduled_posts")]
+        checks = []
+        print(f"{'edit':18} {'found':>7} {'within ' + str(DISTANCE) + ' bits':>15} "
+              f"{'median bits':>12}")
+        for kind in EDITS:
+            found = close = 0
+            bits = []
+            for _ in range(args.queries):
+                source = store.get_post(rng.choice(ids))
+                text = captions.edit(source["caption"], kind)
+                # Scheduled within the window of its source, on the same profile
+                when = source["schedule_at"] + rng.randrange(-DAYS * 86400, DAYS * 86400)
+                t0 = time.perf_counter()
+                matches = index.check(text, source["profile_id"], when)
+                checks.append(time.perf_counter() - t0)
+                found += any(post["id"] == source["id"] for _, post in matches)
+                bits.append(distance(fingerprint(text), fingerprint(source["caption"])))
+                close += bits[-1] <= DISTANCE
+            print(f"{kind:18} {found / args.queries:7.1%} {close / args.queries:15.1%} "
+                  f"{percentile(bits, 50):12}")
+
+        false_hits = 0
+        for _ in range(args.queries):
+            when = int(now.timestamp()) - rng.randrange(int(args.years * 365 * 86400))
+            t0 = time.perf_counter()
+            false_hits += bool(index.check(captions.caption(), rng.choice(profiles), when))
+            checks.append(time.perf_counter() - t0)
+        print(f"fresh captions flagged: {false_hits / args.queries:.1%}")
+        print(f"check ms ({DAYS}-day window, platform scope): "
+              f"p50 {percentile(checks, 50) * 1000:.2f}  p99 {percentile(checks, 99) * 1000:.2f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark GUI cold start: time to first idle frame and widget count.
+
+Needs a display; on a headless machine run it under Xvfb:
+
+    xvfb-run -a python benchmarks/bench_startup.py --runs 10
+
+Every run is a fresh interpreter. Pass --app to time another copy of the
+GUI script, e.g. one exported from an older revision with git show.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def child(app_path, db_path):
+    # Runs in the fresh interpreter; prints one JSON line of timings
+    t0 = time.perf_counter()
+    import importlib.util
+    import tkinter as tk
+    sys.path.insert(0, ROOT)
+    from socialsync.store import ScheduleStore
+
+    spec = importlib.util.spec_from_file_location("hootsuit_alt", app_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.ScheduleStore = lambda *args, **kwargs: ScheduleStore(db_path)
+    imported = time.perf_counter()
+
+    root = tk.Tk()
+    root.geometry("1200x800")
+    app = module.PostingInterface(root)
+    built = time.perf_counter()
+    root.update()
+    first_idle = time.perf_counter()
+    widgets = count_widgets(root)
+
+    timings = {}
+    for name, action in (
+        ("schedules_ms", app.show_schedule_content),
+        ("post_ms", app.show_post_content),
+        ("algorithms_ms", lambda: app.show_info_window("Platform Algorithms")),
+        ("algorithms_again_ms", lambda: app.show_info_window("Platform Algorithms")),
+    ):
+        start = time.perf_counter()
+        try:
+            action()
+            root.update()
+        except tk.TclError:
+            # Older revisions fail to reopen the algorithms window
+            timings[name] = None
+            continue
+        timings[name] = (time.perf_counter() - start) * 1000
+    root.destroy()
+
+    print(json.dumps(dict(
+        import_ms=(imported - t0) * 1000,
+        build_ms=(built - imported) * 1000,
+        first_idle_ms=(first_idle - t0) * 1000,
+        widgets=widgets,
+        **timings
+    )))
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--app", default=os.path.join(ROOT, "Hootsuit-alt.py"))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.app, args.db)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child",
+                 "--app", args.app, "--db", db_path],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            result["process_ms"] = (time.perf_counter() - start) * 1000
+            results.append(result)
+
+    print(f"{args.runs} cold starts of {os.path.basename(args.app)} (medians)")
+    for key in ("import_ms", "build_ms", "first_idle_ms", "process_ms",
+                "schedules_ms", "post_ms", "algorithms_ms", "algorithms_again_ms"):
+        values = [r[key] for r in results if r[key] is not None]
+        if values:
+            print(f"  {key[:-3]:<18} {median(values):8.1f} ms")
+        else:
+            print(f"  {key[:-3]:<18} {'failed':>8}")
+    print(f"  {'widgets':<18} {median([r['widgets'] for r in results]):8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark ScheduleStore due-post and month queries at several table sizes.
+
+    python benchmarks/bench_store.py --sizes 10000 100000 500000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socialsync.store import ScheduleStore, SQL_DUE_IDS, SQL_MONTH_POSTS_PROFILE  # noqa: E402
+
+PLATFORMS = ["Facebook", "Twitter", "Instagram", "LinkedIn", "TikTok"]
+STATUSES = ["pending"] * 6 + ["posted"] * 3 + ["failed"]
+
+
+def populate(store, size, profiles, now, rng):
+    span = 2 * 365 * 24 * 3600
+    start = now - timedelta(days=365)
+    batch = []
+    for _ in range(size):
+        when = start + timedelta(seconds=rng.randrange(span))
+        batch.append((
+            rng.choice(profiles), "text", None, "caption", "#tag",
+            when, rng.choice(STATUSES)
+        ))
+        if len(batch) >= 50000:
+            store.add_posts(batch)
+            batch = []
+    store.add_posts(batch)
+    store.conn.execute("ANALYZE")
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def run(size, repeat):
+    rng = random.Random(size)
+    now = datetime(2025, 6, 15, 9, 0, 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ScheduleStore(os.path.join(tmp, "bench.db"))
+        profiles = [
+            store.get_or_create_profile(p, f"account{i}")
+            for p in PLATFORMS for i in range(20)
+        ]
+        t0 = time.perf_counter()
+        populate(store, size, profiles, now, rng)
+        load = time.perf_counter() - t0
+
+        # Only look ahead from the cutoff so overdue rows do not dominate.
+        store.conn.execute(
+            "UPDATE scheduled_posts SET status = 'posted' "
+            "WHERE status = 'pending' AND schedule_at < ?",
+            ((now - timedelta(minutes=5)).timestamp(),)
+        )
+        store.conn.commit()
+
+        results = {
+            "due 60s": timeit(lambda: store.due_posts(60, now=now), repeat),
+            "due 1h": timeit(lambda: store.due_posts(3600, now=now), repeat),
+            "due ids 1h": timeit(lambda: store.due_post_ids(3600, now=now), repeat),
+            "month": timeit(lambda: store.posts_in_month(2025, 7), repeat),
+            "month/profile": timeit(
+                lambda: store.posts_in_month(2025, 7, profile_id=profiles[0]), repeat
+            ),
+        }
+        plans = {
+            "due ids": store.explain(SQL_DUE_IDS, ("pending", (now + timedelta(hours=1)).timestamp(), 1000)),
+            "month/profile": store.explain(
+                SQL_MONTH_POSTS_PROFILE, (profiles[0], *store.month_range(2025, 7))
+            ),
+        }
+        store.close()
+
+    print(f"\n{size:,} rows (loaded in {load:.2f}s)")
+    for name, ms in results.items():
+        print(f"  {name:<14} {ms:8.3f} ms")
+    for name, plan in plans.items():
+        print(f"  plan {name}: {' | '.join(plan)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
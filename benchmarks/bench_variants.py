@@ -0,0 +1,78 @@
+"""Benchmark per-platform variant rendering over a generated image corpus.
+
+    python benchmarks/bench_variants.py --images 24 --workers 1 4 0
+
+A worker count of 0 means one per core. Each run starts from an empty
+cache, then repeats once warm to show cache hits.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from socialsync.variants import PLATFORM_SPECS, MediaPreparer, VariantCache  # noqa: E402
+
+SIZES = [(6000, 4000), (4032, 3024), (3024, 4032), (1920, 1080), (1080, 1920), (800, 800)]
+
+
+def make_corpus(directory, count):
+    rng = random.Random(0)
+    paths = []
+    for i in range(count):
+        width, height = SIZES[i % len(SIZES)]
+        img = Image.radial_gradient("L").resize((width, height)).convert("RGB")
+        draw = ImageDraw.Draw(img)
+        for _ in range(40):
+            x, y = rng.randrange(width), rng.randrange(height)
+            r = rng.randrange(20, max(21, width // 6))
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+        ext = "png" if i % 5 == 4 else "jpg"
+        path = os.path.join(directory, f"img{i:03d}.{ext}")
+        img.save(path, quality=92)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=24)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 0])
+    args = parser.parse_args()
+
+    platforms = list(PLATFORM_SPECS)
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = os.path.join(tmp, "corpus")
+        os.makedirs(corpus_dir)
+        corpus = make_corpus(corpus_dir, args.images)
+        unique = len({spec.key("image") for spec in PLATFORM_SPECS.values()})
+        print(f"{len(corpus)} images x {len(platforms)} platforms "
+              f"({unique} distinct specs), {os.cpu_count()} cores")
+        for workers in args.workers:
+            cache_dir = os.path.join(tmp, f"cache{workers}")
+            preparer = MediaPreparer(VariantCache(cache_dir), workers=workers or None)
+            items = [(path, platforms) for path in corpus]
+
+            t0 = time.perf_counter()
+            results = preparer.prepare_many(items)
+            cold = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            preparer.prepare_many(items)
+            warm = time.perf_counter() - t0
+            preparer.shutdown()
+
+            outputs = len(set(results.values()))
+            print(f"workers {preparer.workers:>2}: cold {cold:6.2f}s "
+                  f"({len(corpus) / cold:5.1f} images/s), warm {warm * 1000:6.1f} ms, "
+                  f"{outputs} files for {len(results)} variants")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,8 @@ import sys
 def install_requirements():
     requirements = [
         'pillow',
-        'tkcalendar',
-        'python-dateutil'
+        'python-dateutil',
+        'numpy'
     ]
 
     print("Installing required packages...")
@@ -0,0 +1,5 @@
+"""SocialSync backend: persistence and publishing services used by the GUI."""
+
+from socialsync.store import ScheduleStore, DEFAULT_DB_PATH
+
+__all__ = ["ScheduleStore", "DEFAULT_DB_PATH"]
@@ -0,0 +1,287 @@
+"""Moving finished posts out of scheduled_posts into monthly archives.
+
+Due-post scans and calendar queries all run on scheduled_posts, which
+would otherwise keep every post ever published. ``PostArchive`` moves
+posted and failed posts older than ``after_days`` into one table per UTC
+month of schedule_at (``scheduled_posts_archive_YYYY_MM``), registered in
+``post_archives`` with the time and id range each one holds. The hot
+table then only holds what is pending plus the recent past, however long
+the scheduler has been running.
+
+ScheduleStore unions the archives back in where a read reaches into the
+past: posts_in_month and day_platform_counts add the tables whose range
+overlaps the month, and get_post falls back to the tables whose id range
+covers the post. The current month never touches an archive.
+
+Archived posts are final:
+- They leave full-text and hashtag search (the search triggers see a
+  delete) and their outbox rows are dropped with them.
+- Engagement snapshots already recorded keep their post ids, but new
+  ones can not be recorded for an archived post and are not folded into
+  the heatmaps. Keep ``after_days`` above how long engagement is polled.
+
+Work is done in short slices so the dispatcher can run it between
+heartbeats. Each batch moves up to ``batch`` rows in one BEGIN IMMEDIATE
+transaction; under a time budget it moves only as many as the measured
+cost per row says will fit. The space it frees is handed back with
+``PRAGMA incremental_vacuum`` a few pages at a time, sized the same way. That needs
+auto_vacuum=INCREMENTAL, which ScheduleStore sets on new databases and
+``convert`` (one full VACUUM) sets on existing ones; elsewhere the freed
+pages are reused for new rows instead.
+"""
+
+import argparse
+import logging
+import time
+
+from socialsync.store import DEFAULT_DB_PATH, ScheduleStore
+from socialsync.timezones import epoch_seconds
+
+log = logging.getLogger("socialsync.archive")
+
+ARCHIVE_AFTER_DAYS = 90
+BATCH = 200
+VACUUM_PAGES = 64
+# Seconds of archiving and vacuuming per dispatcher heartbeat
+SLICE = 0.05
+# Under a budget, batches are sized from the measured cost of a row (or
+# page) to end within FILL of it; the rest absorbs the occasional commit
+# that stalls on I/O. The first ones, before anything is measured, are
+# this small.
+FILL = 0.5
+PROBE_BATCH = 10
+PROBE_PAGES = 8
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Finished posts past the cutoff, from idx_scheduled_posts_status_at. The
+# newest row always stays: scheduled_posts has no AUTOINCREMENT, so
+# deleting it would let the next post reuse an archived id.
+SQL_ARCHIVABLE = (
+    "SELECT id, schedule_at FROM scheduled_posts "
+    "WHERE status IN ('posted', 'failed') AND schedule_at < ? "
+    "AND id < (SELECT MAX(id) FROM scheduled_posts) LIMIT ?"
+)
+SQL_REGISTER = (
+    "INSERT INTO post_archives (month, table_name, rows, min_at, max_at, min_id, max_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (month) DO UPDATE SET rows = rows + excluded.rows, "
+    "min_at = min(min_at, excluded.min_at), max_at = max(max_at, excluded.max_at), "
+    "min_id = min(min_id, excluded.min_id), max_id = max(max_id, excluded.max_id)"
+)
+SQL_ARCHIVES = (
+    "SELECT month, table_name, rows, min_at, max_at FROM post_archives ORDER BY month"
+)
+SQL_TABLES = "SELECT name FROM sqlite_master WHERE type = 'table'"
+
+
+def archive_table(month):
+    # "2025-07" -> scheduled_posts_archive_2025_07
+    return "scheduled_posts_archive_" + month.replace("-", "_")
+
+
+def fitting(deadline, unit_seconds, most, probe):
+    # How many units to do now so the work ends by deadline; 0 when
+    # fewer than a probe's worth fit, as a batch has fixed costs too
+    left = deadline - time.monotonic()
+    if left <= 0:
+        return 0
+    if unit_seconds is None:
+        return probe
+    count = min(most, int(left / unit_seconds))
+    return count if count >= probe else 0
+
+
+def measured(unit_seconds, started, units):
+    # Cost of one unit: a slower batch counts at once, faster ones only
+    # bring it down halfway each
+    cost = (time.monotonic() - started) / units
+    return cost if unit_seconds is None else max(cost, (unit_seconds + cost) / 2)
+
+
+class PostArchive:
+    """Archives finished posts of a store in time-sliced batches."""
+
+    def __init__(self, store, after_days=ARCHIVE_AFTER_DAYS, batch=BATCH,
+                 vacuum_pages=VACUUM_PAGES):
+        self.store = store
+        self.after_days = after_days
+        self.batch = batch
+        self.vacuum_pages = vacuum_pages
+        self.tables = set(store.archive_tables())
+        # Measured seconds per archived row and per released page
+        self.row_seconds = None
+        self.page_seconds = None
+
+    def columns(self):
+        return self.store.conn.execute("PRAGMA table_info(scheduled_posts)").fetchall()
+
+    def cascades(self):
+        # Tables whose rows go with their post. Foreign keys are off while
+        # rows move (post_engagement must keep pointing at archived ids),
+        # so ON DELETE CASCADE is done by hand.
+        conn = self.store.conn
+        return [
+            (table, fk["from"])
+            for (table,) in conn.execute(SQL_TABLES).fetchall()
+            for fk in conn.execute(f"PRAGMA foreign_key_list({table})").fetchall()
+            if fk["table"] == "scheduled_posts" and fk["on_delete"] == "CASCADE"
+        ]
+
+    def create_table(self, table, columns):
+        # Plain DDL statements: executescript would commit the batch so far
+        conn = self.store.conn
+        definitions = ", ".join(
+            f"{col['name']} {col['type']}" + (" PRIMARY KEY" if col["pk"] else "")
+            for col in columns
+        )
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({definitions})")
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_at ON {table} (schedule_at, profile_id)"
+        )
+        self.tables.add(table)
+
+    def run(self, budget=None, now=None):
+        """Archive finished posts older than after_days.
+
+        Stops within ``budget`` seconds or when nothing is left: each
+        batch is sized to end in time. Returns the number of posts
+        archived.
+        """
+        cutoff = epoch_seconds(now or time.time()) - int(self.after_days * 86400)
+        deadline = None if budget is None else time.monotonic() + budget * FILL
+        conn = self.store.conn
+        columns = self.columns()
+        cascades = self.cascades()
+        archived = 0
+        conn.execute("PRAGMA foreign_keys=OFF")
+        try:
+            while True:
+                size = self.batch
+                if deadline is not None:
+                    size = fitting(deadline, self.row_seconds, self.batch, PROBE_BATCH)
+                    if not size:
+                        break
+                started = time.monotonic()
+                moved = self.archive_batch(cutoff, columns, cascades, size)
+                if moved:
+                    self.row_seconds = measured(self.row_seconds, started, moved)
+                archived += moved
+                if moved < size:
+                    break
+        finally:
+            conn.execute("PRAGMA foreign_keys=ON")
+        if archived:
+            log.info("archived %d posts", archived)
+        return archived
+
+    def archive_batch(self, cutoff, columns, cascades, size):
+        conn = self.store.conn
+        names = ", ".join(col["name"] for col in columns)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(SQL_ARCHIVABLE, (cutoff, size)).fetchall()
+            months = {}
+            for post_id, at in rows:
+                months.setdefault(time.strftime("%Y-%m", time.gmtime(at)), []).append((post_id, at))
+            for month, posts in months.items():
+                table = archive_table(month)
+                if table not in self.tables:
+                    self.create_table(table, columns)
+                ids = [post_id for post_id, _ in posts]
+                marks = ", ".join("?" * len(ids))
+                conn.execute(
+                    f"INSERT INTO {table} ({names}) "
+                    f"SELECT {names} FROM scheduled_posts WHERE id IN ({marks})", ids
+                )
+                times = [at for _, at in posts]
+                conn.execute(SQL_REGISTER, (
+                    month, table, len(ids), min(times), max(times), min(ids), max(ids)
+                ))
+            ids = [row[0] for row in rows]
+            if ids:
+                marks = ", ".join("?" * len(ids))
+                for table, column in cascades:
+                    conn.execute(f"DELETE FROM {table} WHERE {column} IN ({marks})", ids)
+                conn.execute(f"DELETE FROM scheduled_posts WHERE id IN ({marks})", ids)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return len(rows)
+
+    def vacuum_step(self, budget=SLICE):
+        """Return free pages to the file system for up to ``budget`` seconds.
+
+        Returns the number of pages released; always 0 unless the
+        database uses auto_vacuum=INCREMENTAL.
+        """
+        conn = self.store.conn
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            return 0
+        deadline = time.monotonic() + budget * FILL
+        first = free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free:
+            pages = fitting(deadline, self.page_seconds, self.vacuum_pages, PROBE_PAGES)
+            if not pages:
+                break
+            started = time.monotonic()
+            # The pragma frees one page per step and execute() steps once
+            # for a statement without columns; executescript runs it out
+            conn.executescript(f"PRAGMA incremental_vacuum({pages})")
+            left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if left < free:
+                self.page_seconds = measured(self.page_seconds, started, free - left)
+            free = left
+        return first - free
+
+    def step(self, budget=SLICE, now=None):
+        """One slice of archiving, then vacuuming with the time left.
+
+        Returns (posts archived, pages released).
+        """
+        started = time.monotonic()
+        archived = self.run(budget, now)
+        left = budget - (time.monotonic() - started)
+        return archived, self.vacuum_step(left) if left > 0 else 0
+
+    def archives(self):
+        return self.store.conn.execute(SQL_ARCHIVES).fetchall()
+
+    def convert(self):
+        # One full rewrite of the file so later steps can vacuum
+        # incrementally; takes as long as VACUUM takes
+        conn = self.store.conn
+        conn.execute(f"PRAGMA auto_vacuum={AUTO_VACUUM_INCREMENTAL}")
+        conn.execute("VACUUM")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive finished SocialSync posts.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite database path")
+    parser.add_argument("--after", type=float, default=ARCHIVE_AFTER_DAYS,
+                        help="archive posted/failed posts older than this many days")
+    parser.add_argument("--budget", type=float,
+                        help="stop after this many seconds (default: archive everything)")
+    parser.add_argument("--convert", action="store_true",
+                        help="switch the database to incremental vacuum (one full VACUUM)")
+    parser.add_argument("--list", action="store_true", help="show the archive tables")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    store = ScheduleStore(args.db)
+    archive = PostArchive(store, after_days=args.after)
+    if args.convert:
+        archive.convert()
+    started = time.monotonic()
+    archived = archive.run(args.budget)
+    released = archive.vacuum_step(float("inf") if args.budget is None else args.budget)
+    print(f"archived {archived} posts and released {released} pages "
+          f"in {time.monotonic() - started:.1f}s")
+    if args.list:
+        for month, table, rows, _, _ in archive.archives():
+            print(f"{month}  {table}  {rows} posts")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""Posting cadence per (platform, profile) and automatic slot placement.
+
+A cadence caps posts per day, keeps a minimum gap between two posts of
+the same profile and limits posting to daily time windows. Profiles use
+their platform's default unless ``cadence_rules`` holds an override.
+Days, gaps and windows are on the wall clock of the profile's time zone.
+
+``CadenceScheduler.check`` validates one time at save time with an
+indexed range lookup on (profile_id, schedule_at) around that day plus
+the profile's recurring occurrences. ``place`` assigns a batch of drafts
+to legal slots. For each draft it picks the least loaded day that still
+has room, then the free slot there scoring best on engagement history
+plus distance from the profile's other posts.
+"""
+
+import bisect
+import heapq
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+from socialsync.store import CLAIM_CHUNK, chunked
+from socialsync.timezones import epoch_seconds, zone_table
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cadence_rules (
+    profile_id INTEGER PRIMARY KEY,
+    max_per_day INTEGER,
+    min_gap INTEGER,
+    windows TEXT,
+    FOREIGN KEY (profile_id) REFERENCES profiles (id)
+);
+"""
+
+SQL_GET_CADENCE = "SELECT max_per_day, min_gap, windows FROM cadence_rules WHERE profile_id = ?"
+SQL_SET_CADENCE = (
+    "INSERT OR REPLACE INTO cadence_rules (profile_id, max_per_day, min_gap, windows) "
+    "VALUES (?, ?, ?, ?)"
+)
+SQL_PROFILE_TIMES = (
+    "SELECT schedule_date, rule_id, occurrence FROM scheduled_posts "
+    "WHERE profile_id = ? AND schedule_at >= ? AND schedule_at < ?"
+)
+SQL_DRAFTS = "SELECT id, profile_id FROM scheduled_posts WHERE status = 'draft' ORDER BY id"
+SQL_PLACE_DRAFT = (
+    "UPDATE scheduled_posts SET schedule_date = ?, schedule_at = ?, status = 'pending' "
+    "WHERE id = ? AND status = 'draft'"
+)
+
+# Candidate start times for auto-placement, in minutes
+SLOT_MINUTES = 15
+# Score for being this far (minutes, capped) from the nearest post, on top
+# of the 0..1 engagement score of the slot
+SPREAD_WEIGHT = 0.5
+SPREAD_HORIZON = 240
+
+
+def parse_windows(text):
+    # "08:00-12:00, 18:00-22:00" -> [(480, 720), (1080, 1320)] (minutes)
+    windows = []
+    for part in (text or "").replace(";", ",").split(","):
+        if not part.strip():
+            continue
+        start, sep, end = part.strip().partition("-")
+        try:
+            start = datetime.strptime(start.strip(), "%H:%M")
+            end = datetime.strptime(end.strip(), "%H:%M")
+        except ValueError:
+            raise ValueError(f"Invalid posting window {part.strip()!r}, expected HH:MM-HH:MM") from None
+        end_minute = end.hour * 60 + end.minute or 24 * 60
+        if not sep or end_minute <= start.hour * 60 + start.minute:
+            raise ValueError(f"Invalid posting window {part.strip()!r}, expected HH:MM-HH:MM")
+        windows.append((start.hour * 60 + start.minute, end_minute))
+    return sorted(windows)
+
+
+def format_windows(windows):
+    return ", ".join(
+        f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}" for start, end in windows
+    )
+
+
+def format_gap(minutes):
+    hours, minutes = divmod(minutes, 60)
+    if not hours:
+        return f"{minutes} min"
+    return f"{hours} h {minutes:02d} min" if minutes else f"{hours} h"
+
+
+def minute_of_day(when):
+    return when.hour * 60 + when.minute
+
+
+class Cadence:
+    def __init__(self, max_per_day=None, min_gap=timedelta(0), windows=""):
+        self.max_per_day = max_per_day
+        self.min_gap = min_gap
+        self.windows = parse_windows(windows) if isinstance(windows, str) else list(windows)
+        # Two posts of one profile never share a minute
+        self.gap_minutes = max(1, int(min_gap.total_seconds() // 60))
+
+    def in_window(self, minute):
+        return not self.windows or any(start <= minute < end for start, end in self.windows)
+
+    def slots(self):
+        # Candidate minutes of the day, in order
+        minutes = np.arange(0, 24 * 60, SLOT_MINUTES)
+        if not self.windows:
+            return minutes
+        return minutes[[self.in_window(int(minute)) for minute in minutes]]
+
+    def __repr__(self):
+        return (f"<Cadence max_per_day={self.max_per_day} min_gap={self.min_gap} "
+                f"windows={format_windows(self.windows)!r}>")
+
+
+# From the platform guides; anything else gets FALLBACK_CADENCE
+DEFAULT_CADENCE = {
+    "TikTok": Cadence(4, timedelta(hours=2), "06:00-23:00"),
+    "Instagram": Cadence(2, timedelta(hours=4), "07:00-22:00"),
+    "Twitter": Cadence(15, timedelta(minutes=30), "06:00-23:00"),
+    "LinkedIn": Cadence(2, timedelta(hours=4), "07:00-19:00"),
+    "Facebook": Cadence(3, timedelta(hours=3), "07:00-22:00"),
+}
+FALLBACK_CADENCE = Cadence(None, timedelta(minutes=30), "07:00-22:00")
+
+
+class Timeline:
+    """One profile's scheduled minutes, bucketed by day.
+
+    Each post blocks [t - gap, t + gap); with the day's minutes sorted a
+    conflict is a bisect in the day and its neighbours.
+    """
+
+    def __init__(self, cadence):
+        self.cadence = cadence
+        self.days = {}
+
+    def add(self, when):
+        bisect.insort(self.days.setdefault(when.date().toordinal(), []), minute_of_day(when))
+
+    def count(self, day):
+        return len(self.days.get(day, ()))
+
+    def nearest(self, day, minute):
+        # (distance, minute) of the closest post on this day or either
+        # neighbouring day, or None
+        best = None
+        for offset in (-1, 0, 1):
+            minutes = self.days.get(day + offset)
+            if not minutes:
+                continue
+            shifted = minute - offset * 24 * 60
+            i = bisect.bisect_left(minutes, shifted)
+            for j in (i - 1, i):
+                if 0 <= j < len(minutes):
+                    distance = abs(minutes[j] - shifted)
+                    if best is None or distance < best[0]:
+                        best = (distance, minutes[j])
+        return best
+
+    def neighbours(self, day):
+        # The minutes of day - 1, day and day + 1 on one axis
+        parts = [
+            np.asarray(self.days.get(day + offset, ()), dtype=np.int64) + offset * 24 * 60
+            for offset in (-1, 0, 1)
+        ]
+        return np.concatenate(parts)
+
+    def problems(self, when):
+        day, minute = when.date().toordinal(), minute_of_day(when)
+        cadence = self.cadence
+        problems = []
+        if cadence.max_per_day is not None and self.count(day) >= cadence.max_per_day:
+            problems.append(f"already {self.count(day)} posts on {when:%a %b %d} "
+                            f"(limit {cadence.max_per_day} per day)")
+        nearest = self.nearest(day, minute)
+        if nearest is not None and nearest[0] < cadence.gap_minutes:
+            other = time(*divmod(nearest[1], 60))
+            problems.append(f"a post at {other:%I:%M %p} is closer than {format_gap(cadence.gap_minutes)}")
+        if not cadence.in_window(minute):
+            problems.append(f"{when:%I:%M %p} is outside the posting windows "
+                            f"({format_windows(cadence.windows)})")
+        return problems
+
+
+class CadenceScheduler:
+    def __init__(self, store, rules=None, engagement=None):
+        self.store = store
+        self.conn = store.conn
+        self.rules = rules
+        self.engagement = engagement
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    # Cadence settings
+
+    def cadence_for(self, profile_id, platform=None):
+        # profile_id None is a profile not created yet on ``platform``
+        if profile_id is not None:
+            row = self.conn.execute(SQL_GET_CADENCE, (profile_id,)).fetchone()
+            if row is not None:
+                return Cadence(row[0], timedelta(minutes=row[1] or 0), row[2] or "")
+            platform = self.store.platform_for_profile(profile_id)
+        return DEFAULT_CADENCE.get(platform, FALLBACK_CADENCE)
+
+    def set_cadence(self, profile_id, cadence):
+        with self.conn:
+            self.conn.execute(SQL_SET_CADENCE, (
+                profile_id, cadence.max_per_day, cadence.gap_minutes,
+                format_windows(cadence.windows)
+            ))
+
+    # Timelines
+
+    def timelines(self, profile_ids, start, end):
+        """Timelines of the given profiles from start - 1 day to end + 1 day.
+
+        start and end are wall times in each profile's zone.
+        """
+        lo = datetime.combine(start.date(), time()) - timedelta(days=1)
+        hi = datetime.combine(end.date(), time()) + timedelta(days=2)
+        timelines = {}
+        materialized = set()
+        for profile_id in profile_ids:
+            timeline = timelines[profile_id] = Timeline(self.cadence_for(profile_id))
+            zone = self.store.zone_for(profile_id)
+            for row in self.conn.execute(SQL_PROFILE_TIMES, (
+                profile_id, zone.to_epoch(lo)[0], zone.to_epoch(hi)[0]
+            )):
+                timeline.add(datetime.fromisoformat(row[0]))
+                if row[1] is not None:
+                    materialized.add((row[1], row[2]))
+        if self.rules is not None:
+            # One expansion for all profiles; a single profile only needs its own rules
+            only = next(iter(timelines)) if len(timelines) == 1 else None
+            for post in self.rules.occurrences_between(lo, hi, only):
+                timeline = timelines.get(post["profile_id"])
+                if timeline is not None and (post["rule_id"], post["occurrence"]) not in materialized:
+                    timeline.add(post["when"])
+        return timelines
+
+    def timeline(self, profile_id, start, end):
+        return self.timelines([profile_id], start, end)[profile_id]
+
+    def check(self, profile_id, when, platform=None):
+        """Why ``when`` (the profile's wall time) breaks its cadence; empty if it does not.
+
+        A profile_id of None stands for a profile not created yet on
+        ``platform``: nothing scheduled and the platform's default cadence.
+        """
+        if profile_id is None:
+            return Timeline(self.cadence_for(None, platform)).problems(when)
+        return self.timeline(profile_id, when, when).problems(when)
+
+    # Auto-placement
+
+    def slot_scores(self, profile_id, cadence):
+        # 0..1 engagement score of every candidate slot, per weekday
+        slots = cadence.slots()
+        heat = None
+        if self.engagement is not None:
+            heat = self.engagement.heatmap(profile_ids={profile_id})
+        if heat is None:
+            return slots, np.zeros((7, len(slots)))
+        cells = slots * heat.shape[1] // (24 * 60)
+        scores = heat[:, cells]
+        spread = scores.max() - scores.min()
+        return slots, (scores - scores.min()) / spread if spread > 0 else np.zeros_like(scores)
+
+    def place(self, drafts, start, end):
+        """Assign (key, profile_id) drafts to legal times in [start, end).
+
+        start and end are instants (naive datetimes are system time).
+        Returns {key: datetime} in each profile's wall time; drafts with no
+        legal slot left are missing. Slots are scored on the engagement
+        grids as loaded; fold new rows with EngagementModel.refresh first.
+        """
+        by_profile = {}
+        for key, profile_id in drafts:
+            by_profile.setdefault(profile_id, []).append(key)
+        bounds = {}
+        for profile_id in by_profile:
+            zone = self.store.zone_for(profile_id)
+            bounds[profile_id] = zone.to_local(epoch_seconds(start)), zone.to_local(epoch_seconds(end))
+        # One timeline load for all profiles, over the widest wall range
+        timelines = self.timelines(
+            by_profile, min(lo for lo, _ in bounds.values()), max(hi for _, hi in bounds.values())
+        ) if bounds else {}
+        placed = {}
+        for profile_id, keys in by_profile.items():
+            lo, hi = bounds[profile_id]
+            timeline = timelines[profile_id]
+            for key, when in zip(keys, self.place_profile(profile_id, len(keys), timeline, lo, hi)):
+                placed[key] = when
+        return placed
+
+    def place_profile(self, profile_id, count, timeline, start, end):
+        cadence = timeline.cadence
+        slots, scores = self.slot_scores(profile_id, cadence)
+        if not len(slots):
+            return []
+        first, last = start.date().toordinal(), (end - timedelta(microseconds=1)).date().toordinal()
+        # Least loaded day first, earliest on ties
+        days = [(timeline.count(day), day) for day in range(first, last + 1)]
+        heapq.heapify(days)
+        placed = []
+        while days and len(placed) < count:
+            load, day = days[0]
+            if cadence.max_per_day is not None and load >= cadence.max_per_day:
+                heapq.heappop(days)
+                continue
+            minute = self.best_slot(timeline, day, slots, scores, start, end)
+            if minute is None:
+                # Placing more posts never frees a slot, so the day is done
+                heapq.heappop(days)
+                continue
+            when = datetime.fromordinal(day) + timedelta(minutes=minute)
+            timeline.add(when)
+            placed.append(when)
+            heapq.heapreplace(days, (load + 1, day))
+        return placed
+
+    def best_slot(self, timeline, day, slots, scores, start, end):
+        cadence = timeline.cadence
+        legal = np.ones(len(slots), dtype=bool)
+        day_start = datetime.fromordinal(day)
+        if day == start.date().toordinal():
+            legal &= slots >= (start - day_start).total_seconds() / 60
+        if day == (end - timedelta(microseconds=1)).date().toordinal():
+            legal &= slots < (end - day_start).total_seconds() / 60
+        taken = timeline.neighbours(day)
+        if len(taken):
+            # Distance from every candidate to its nearest post
+            i = np.searchsorted(taken, slots)
+            before = np.abs(slots - taken[np.clip(i - 1, 0, len(taken) - 1)])
+            after = np.abs(taken[np.clip(i, 0, len(taken) - 1)] - slots)
+            distance = np.minimum(before, after)
+            legal &= distance >= cadence.gap_minutes
+        else:
+            distance = np.full(len(slots), SPREAD_HORIZON)
+        if not legal.any():
+            return None
+        weekday = datetime.fromordinal(day).weekday()
+        score = scores[weekday] + SPREAD_WEIGHT * np.minimum(distance, SPREAD_HORIZON) / SPREAD_HORIZON
+        score[~legal] = -np.inf
+        return int(slots[int(np.argmax(score))])
+
+    def place_new(self, platform, start, end):
+        """Best time in [start, end) for a profile not created yet on ``platform``.
+
+        Such a profile has nothing scheduled, the platform's default cadence
+        and the system zone. Returns its wall time, or None without a legal slot.
+        """
+        zone = zone_table(None)
+        lo, hi = zone.to_local(epoch_seconds(start)), zone.to_local(epoch_seconds(end))
+        placed = self.place_profile(None, 1, Timeline(self.cadence_for(None, platform)), lo, hi)
+        return placed[0] if placed else None
+
+    def place_drafts(self, start, end):
+        """Schedule every 'draft' post; returns (placed, left unplaced)."""
+        drafts = self.conn.execute(SQL_DRAFTS).fetchall()
+        profiles = {row[0]: row[1] for row in drafts}
+        placed = self.place(profiles.items(), start, end)
+        with self.conn:
+            for chunk in chunked(placed.items(), CLAIM_CHUNK):
+                self.conn.executemany(SQL_PLACE_DRAFT, (
+                    self.store.resolve(profiles[post_id], when) + (post_id,)
+                    for post_id, when in chunk
+                ))
+        return len(placed), len(drafts) - len(placed)
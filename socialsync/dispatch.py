@@ -0,0 +1,490 @@
+"""Headless dispatcher that publishes due posts from scheduled_posts.
+
+Run it next to (or instead of) the GUI:
+
+    python -m socialsync.dispatch --db social_media_scheduler.db
+
+Start it several times against the same database to spread publishing
+over processes (see socialsync.sharding).
+"""
+
+import argparse
+import heapq
+import logging
+import queue
+import random
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from socialsync.archive import ARCHIVE_AFTER_DAYS, PostArchive
+from socialsync.outbox import Outbox
+from socialsync.ratelimit import (
+    RateLimited, RateLimiter, SharedRateLimiter, DEFAULT_LIMITS, parse_limit
+)
+from socialsync.recurrence import RecurrenceRules
+from socialsync.sharding import WORKER_TTL, Membership
+from socialsync.store import DEFAULT_DB_PATH, LEASE_SECONDS, ScheduleStore
+
+log = logging.getLogger("socialsync.dispatch")
+
+# Lateness of the most recent publishes kept in stats; the daemon runs
+# indefinitely, so older samples are dropped
+LATENESS_SAMPLES = 10000
+
+
+class FakePublisher:
+    """Offline backend that pretends to publish and remembers what it saw."""
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.published = []
+        self.keys = set()
+        self.duplicates = 0
+        self.lock = threading.Lock()
+
+    def publish(self, post):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            failed = self.random.random() < self.failure_rate
+            key = post.get("idempotency_key")
+            if not failed and key is not None and key in self.keys:
+                self.duplicates += 1  # a platform honoring the key posts nothing new
+            elif not failed:
+                if key is not None:
+                    self.keys.add(key)
+                self.published.append((post["id"], post["platform"], time.time()))
+        if failed:
+            raise RuntimeError("fake publish failure")
+        return True
+
+
+class Dispatcher:
+    """Publishes pending posts when their schedule_at instant arrives.
+
+    Pending rows due within ``lookahead`` seconds are kept in a heap ordered
+    by due time. The loop sleeps until the earliest deadline (or the next
+    refresh of the lookahead window), claims the due rows pending -> running
+    in one UPDATE, hands them to the publisher pool and records
+    posted/failed together with last_run.
+
+    With a rate limiter, posts whose (platform, profile) bucket is empty or
+    backing off are pushed back in the heap until the bucket refills, so
+    other profiles keep flowing.
+
+    Claimed posts are leased to this worker for ``lease`` seconds. Every
+    ``heartbeat_interval`` the dispatcher renews its membership and its
+    leases, and reclaims posts whose lease expired. Only posts of profiles
+    that membership assigns to this worker are queued.
+
+    A claimed post is published through its outbox deliveries (see
+    socialsync.outbox): failed attempts are retried with backoff while the
+    post stays leased, and the post is finished with its last delivery.
+    On a clean stop, unfinished posts are handed back as pending.
+
+    With an ``archiver`` (socialsync.archive.PostArchive), each heartbeat
+    also spends a short slice moving old finished posts out of the hot
+    table and vacuuming the pages they leave.
+    """
+
+    def __init__(self, store, publisher, lookahead=60.0, refresh_interval=5.0,
+                 workers=8, batch_size=500, limiter=None, preparer=None, rules=None,
+                 membership=None, lease=LEASE_SECONDS, heartbeat_interval=10.0,
+                 outbox=None, archiver=None):
+        self.store = store
+        self.archiver = archiver
+        self.outbox = outbox or Outbox(store)
+        self.next_send = None
+        self.membership = membership or Membership(store)
+        self.worker_id = self.membership.worker_id
+        self.lease = lease
+        self.heartbeat_interval = heartbeat_interval
+        self.next_heartbeat = 0.0
+        self.rules = rules
+        self.publisher = publisher
+        self.limiter = limiter
+        self.preparer = preparer
+        self.platforms = {}
+        self.backing_off = set()
+        self.lookahead = lookahead
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.heap = []
+        self.queued = set()
+        self.due_at = {}
+        self.results = queue.Queue()
+        self.in_flight = 0
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="publish")
+        self.next_refresh = 0.0
+        self.stats = {
+            "posted": 0, "failed": 0, "throttled": 0, "deferred": 0, "reclaimed": 0,
+            "errors": 0, "archived": 0,
+            "lateness": deque(maxlen=LATENESS_SAMPLES)
+        }
+
+    # Heap maintenance
+
+    def refresh(self, now=None):
+        now = now or time.time()
+        if self.rules is not None:
+            # Recurring rules only ever have their next occurrence written out
+            created = self.rules.materialize(now + self.lookahead, now=now)
+            if created:
+                log.debug("materialized %d recurring posts", created)
+        rows = self.store.due_post_ids(self.lookahead, now=now, limit=1000000)
+        added = 0
+        owns = self.membership.owns
+        for row in rows:
+            if row["id"] in self.queued or not owns(row["profile_id"]):
+                continue
+            due = row["schedule_at"]
+            heapq.heappush(self.heap, (due, row["id"], row["profile_id"], due))
+            self.queued.add(row["id"])
+            added += 1
+        self.next_refresh = now + min(self.refresh_interval, self.lookahead)
+        self.wake_sender(self.outbox.next_due(self.worker_id))
+        if added:
+            log.debug("queued %d posts (%d in heap)", added, len(self.heap))
+        return added
+
+    def heartbeat(self, now=None):
+        now = now or time.time()
+        if self.membership.heartbeat(now):
+            # Profiles moved: drop what is no longer ours, pick up the rest
+            # on an immediate refresh
+            self.heap = [entry for entry in self.heap if self.membership.owns(entry[2])]
+            heapq.heapify(self.heap)
+            self.queued = {entry[1] for entry in self.heap}
+            self.next_refresh = now
+            log.info("workers now %s", ", ".join(self.membership.ring.members))
+        self.store.renew_leases(self.worker_id, now + self.lease)
+        reclaimed = self.store.reclaim_expired(now)
+        if reclaimed:
+            self.stats["reclaimed"] += len(reclaimed)
+            self.next_refresh = now
+            log.warning("reclaimed %d posts with expired leases", len(reclaimed))
+        if self.archiver is not None:
+            archived, released = self.archiver.step()
+            self.stats["archived"] += archived
+            if archived or released:
+                log.debug("archived %d posts, released %d pages", archived, released)
+        self.next_heartbeat = now + self.heartbeat_interval
+
+    def pop_due(self, now):
+        due = []
+        while self.heap and self.heap[0][0] <= now and len(due) < self.batch_size:
+            entry = heapq.heappop(self.heap)
+            self.queued.discard(entry[1])
+            due.append(entry)
+        return due
+
+    def platform_of(self, profile_id):
+        if profile_id not in self.platforms:
+            self.platforms[profile_id] = self.store.platform_for_profile(profile_id)
+        return self.platforms[profile_id]
+
+    def pace(self, due, now):
+        # Split due entries into ready ones and ones deferred by the limiter.
+        if self.limiter is None:
+            return due
+        ready = []
+        waits = {}
+        for entry in due:
+            _, post_id, profile_id, due_at = entry
+            wait = waits.get(profile_id)
+            if wait is None:
+                wait = self.limiter.acquire(self.platform_of(profile_id), profile_id, now)
+                if wait > 0:
+                    waits[profile_id] = wait
+            if wait > 0:
+                heapq.heappush(self.heap, (now + wait, post_id, profile_id, due_at))
+                self.queued.add(post_id)
+                self.stats["deferred"] += 1
+            else:
+                ready.append(entry)
+        return ready
+
+    # Publishing
+
+    def dispatch(self, due, now):
+        due = self.pace(due, now)
+        if not due:
+            return 0
+        claimed = set(self.store.claim_posts(
+            [entry[1] for entry in due], now=datetime.fromtimestamp(now),
+            owner=self.worker_id, lease=self.lease
+        ))
+        if not claimed:
+            return 0
+        self.due_at.update((entry[1], entry[3]) for entry in due if entry[1] in claimed)
+        # Deliveries sent before an earlier claim was lost finish at once
+        self.finished(self.outbox.enqueue(claimed, self.worker_id, now))
+        self.wake_sender(now)
+        return len(claimed)
+
+    def wake_sender(self, at):
+        if at is not None and (self.next_send is None or at < self.next_send):
+            self.next_send = at
+
+    def send(self, now):
+        # Start the deliveries that are due, first attempts and retries alike
+        if self.next_send is None or self.next_send > now:
+            return 0
+        deliveries = self.outbox.take(self.worker_id, now, self.batch_size)
+        self.next_send = now if len(deliveries) == self.batch_size else None
+        if not deliveries:
+            return 0
+        posts = {post["id"]: post for post in self.store.get_posts(
+            {delivery["post_id"] for delivery in deliveries}
+        )}
+        for delivery in deliveries:
+            post = posts.get(delivery["post_id"])
+            if post is None:
+                continue  # deleted since; its deliveries went with it
+            post = dict(post)
+            post["platform"] = delivery["platform"]
+            post["idempotency_key"] = delivery["idempotency_key"]
+            self.in_flight += 1
+            future = self.pool.submit(
+                self.publish_one, post, delivery, self.due_at.get(post["id"])
+            )
+            future.add_done_callback(lambda f: self.wakeup.set())
+        return len(deliveries)
+
+    def publish_one(self, post, delivery, due_at):
+        started = time.time()
+        try:
+            if self.preparer is not None and post["media_path"]:
+                # Cached when the GUI already rendered it at scheduling time
+                post["media_path"] = self.preparer.prepare(
+                    post["media_path"], [post["platform"]]
+                )[post["platform"]]
+            self.publisher.publish(post)
+            status, error = "posted", None
+        except RateLimited as e:
+            status, error = "throttled", e
+        except Exception as e:
+            status, error = "failed", e
+        lateness = started - due_at if due_at is not None else None
+        self.results.put((post, delivery, status, lateness, error))
+
+    def record_results(self):
+        outcomes = []
+        while True:
+            try:
+                post, delivery, status, lateness, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            retry_after = None
+            if status == "throttled":
+                # Retried once the limiter lets the profile post again
+                self.stats["throttled"] += 1
+                retry_after = self.report(post, False, error.retry_after)
+                if retry_after is None:
+                    retry_after = error.retry_after
+            else:
+                self.report(post, True)
+            if status == "posted" and lateness is not None:
+                self.stats["lateness"].append(lateness)
+            elif status == "failed":
+                self.stats["errors"] += 1
+                log.warning("post %s to %s failed (attempt %d): %s", post["id"],
+                            delivery["platform"], delivery["attempts"] + 1, error)
+            outcomes.append((delivery, status, error, retry_after))
+        if outcomes:
+            finished, next_retry = self.outbox.record(outcomes, self.worker_id)
+            self.in_flight -= len(outcomes)
+            self.finished(finished)
+            self.wake_sender(next_retry)
+        return len(outcomes)
+
+    def finished(self, posts):
+        for post_id, status in posts:
+            self.stats[status] += 1
+            self.due_at.pop(post_id, None)
+
+    def report(self, post, ok, retry_after=None):
+        if self.limiter is None:
+            return
+        key = (post["platform"], post["profile_id"])
+        if ok and key not in self.backing_off:
+            return
+        if ok:
+            self.backing_off.discard(key)
+        else:
+            self.backing_off.add(key)
+        delay = self.limiter.report(key[0], key[1], ok, retry_after=retry_after)
+        if not ok:
+            log.info("%s profile %s throttled, backing off %.1fs", key[0], key[1], delay)
+            return delay
+
+    # Main loop
+
+    def step(self):
+        now = time.time()
+        if now >= self.next_heartbeat:
+            self.heartbeat(now)
+        if now >= self.next_refresh:
+            self.refresh(now)
+        due = self.pop_due(now)
+        if due:
+            self.dispatch(due, now)
+        self.record_results()
+        self.send(now)
+
+    def seconds_until_next(self):
+        now = time.time()
+        deadline = min(self.next_refresh, self.next_heartbeat)
+        if self.heap:
+            deadline = min(deadline, self.heap[0][0])
+        if self.next_send is not None:
+            deadline = min(deadline, self.next_send)
+        return max(0.0, deadline - now)
+
+    def recover(self):
+        # Restarted under the same worker id: the posts still leased to it
+        # carry on where they stopped, without waiting for the leases to lapse
+        now = time.time()
+        if self.store.renew_leases(self.worker_id, now + self.lease):
+            self.finished(self.outbox.adopt(self.worker_id, now))
+            self.wake_sender(now)
+
+    def run(self, once=False):
+        log.info("dispatcher started (lookahead %.0fs)", self.lookahead)
+        try:
+            self.recover()
+            while not self.stopping:
+                self.step()
+                if once and not self.heap_has_due() and not self.in_flight and not self.send_due():
+                    break
+                self.wakeup.wait(self.seconds_until_next())
+                self.wakeup.clear()
+        finally:
+            self.pool.shutdown(wait=True)
+            self.record_results()
+            released = self.store.release_leases(self.worker_id)
+            if released:
+                log.info("handed back %d unfinished posts", released)
+            self.membership.leave()
+            log.info(
+                "dispatcher stopped: %d posted, %d failed",
+                self.stats["posted"], self.stats["failed"]
+            )
+
+    def heap_has_due(self):
+        return bool(self.heap) and self.heap[0][0] <= time.time()
+
+    def send_due(self):
+        return self.next_send is not None and self.next_send <= time.time()
+
+    def stop(self):
+        self.stopping = True
+        self.wakeup.set()
+
+
+def build_publisher(args):
+    if args.backend == "http":
+        from socialsync.publisher import AsyncPublisher
+        return AsyncPublisher(args.endpoint, concurrency=args.concurrency)
+    return FakePublisher(latency=args.fake_latency, failure_rate=args.fake_failure_rate)
+
+
+def build_limiter(args):
+    if args.no_rate_limit:
+        return None
+    limits = dict(DEFAULT_LIMITS)
+    limits.update(parse_limit(spec) for spec in args.rate_limit)
+    if args.shared_limits:
+        return SharedRateLimiter(args.db, limits)
+    return RateLimiter(limits)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish due SocialSync posts.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite database path")
+    parser.add_argument("--backend", choices=["fake", "http"], default="fake")
+    parser.add_argument("--endpoint", default="http://127.0.0.1:8765",
+                        help="platform API base URL for the http backend")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="in-flight requests per platform (http backend)")
+    parser.add_argument("--lookahead", type=float, default=60.0,
+                        help="seconds of upcoming posts kept in memory")
+    parser.add_argument("--refresh", type=float, default=5.0,
+                        help="seconds between database refreshes")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--worker-id", help="name in the worker ring (default host:pid)")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                        help="seconds a claimed post stays leased without a heartbeat")
+    parser.add_argument("--heartbeat", type=float, default=10.0,
+                        help="seconds between heartbeats (membership and lease renewal)")
+    parser.add_argument("--worker-ttl", type=float, default=WORKER_TTL,
+                        help="seconds without a heartbeat before a worker counts as dead")
+    parser.add_argument("--once", action="store_true",
+                        help="publish everything currently due, then exit")
+    parser.add_argument("--rate-limit", action="append", default=[],
+                        metavar="PLATFORM=POSTS/SECONDS",
+                        help="override a platform's posting budget (repeatable)")
+    parser.add_argument("--shared-limits", action="store_true",
+                        help="keep rate-limit buckets in the database so "
+                             "several dispatchers share one budget")
+    parser.add_argument("--no-rate-limit", action="store_true")
+    parser.add_argument("--archive-after", type=float, default=ARCHIVE_AFTER_DAYS,
+                        help="days after which posted/failed posts move to the archive")
+    parser.add_argument("--no-archive", action="store_true",
+                        help="keep every finished post in the hot table")
+    parser.add_argument("--prepare-media", action="store_true",
+                        help="publish per-platform media variants instead of the original file")
+    parser.add_argument("--fake-latency", type=float, default=0.0)
+    parser.add_argument("--fake-failure-rate", type=float, default=0.0)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s"
+    )
+
+    store = ScheduleStore(args.db)
+    rules = RecurrenceRules(store)
+    publisher = build_publisher(args)
+    limiter = build_limiter(args)
+    preparer = None
+    if args.prepare_media:
+        from socialsync.variants import MediaPreparer
+        preparer = MediaPreparer()
+    dispatcher = Dispatcher(
+        store,
+        publisher,
+        lookahead=args.lookahead,
+        refresh_interval=args.refresh,
+        workers=args.workers,
+        limiter=limiter,
+        preparer=preparer,
+        rules=rules,
+        membership=Membership(store, args.worker_id, ttl=args.worker_ttl),
+        lease=args.lease,
+        heartbeat_interval=args.heartbeat,
+        archiver=None if args.no_archive else PostArchive(store, after_days=args.archive_after)
+    )
+    signal.signal(signal.SIGTERM, lambda *_: dispatcher.stop())
+    signal.signal(signal.SIGINT, lambda *_: dispatcher.stop())
+    dispatcher.run(once=args.once)
+    if hasattr(publisher, "close"):
+        publisher.close()
+    if hasattr(limiter, "close"):
+        limiter.close()
+    if preparer is not None:
+        preparer.shutdown()
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
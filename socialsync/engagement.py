@@ -0,0 +1,312 @@
+"""Engagement history and best-time-to-post heatmaps.
+
+Collectors append snapshots of a post's engagement to ``post_engagement``
+(one row per poll; counts are cumulative, so the newest snapshot of a post
+is its current value). ``EngagementModel`` folds those rows into one
+weekday x time-of-day grid per profile with NumPy:
+
+- each post adds its score to the cell of its scheduled weekday and time,
+  weighted by ``0.5 ** (age / half_life)`` so recent weeks count more;
+- a later snapshot of the same post adds only the difference from the
+  previous one, so every row is folded exactly once;
+- the folded grids and the last folded row id are saved in the database,
+  so a restart (or another process) folds only rows added since.
+"""
+
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from socialsync.store import format_datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS post_engagement (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER,
+    collected_at DATETIME,
+    impressions INTEGER DEFAULT 0,
+    likes INTEGER DEFAULT 0,
+    comments INTEGER DEFAULT 0,
+    shares INTEGER DEFAULT 0,
+    FOREIGN KEY (post_id) REFERENCES scheduled_posts (id)
+);
+CREATE INDEX IF NOT EXISTS idx_post_engagement_post
+    ON post_engagement (post_id, id);
+CREATE TABLE IF NOT EXISTS engagement_heatmaps (
+    profile_id INTEGER PRIMARY KEY,
+    sums BLOB,
+    weights BLOB
+);
+CREATE TABLE IF NOT EXISTS engagement_fold (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_id INTEGER,
+    as_of REAL,
+    slots_per_hour INTEGER,
+    half_life REAL
+);
+"""
+
+# Comments and shares say more about a slot than likes do
+ENGAGEMENT = "(e.likes + 2 * e.comments + 3 * e.shares)"
+PREVIOUS_ENGAGEMENT = (
+    "(SELECT o.likes + 2 * o.comments + 3 * o.shares FROM post_engagement o "
+    "WHERE o.post_id = e.post_id AND o.id < e.id ORDER BY o.id DESC LIMIT 1)"
+)
+
+SQL_INSERT_ENGAGEMENT = (
+    "INSERT INTO post_engagement (post_id, collected_at, impressions, likes, "
+    "comments, shares) VALUES (?, ?, ?, ?, ?, ?)"
+)
+SQL_LAST_ENGAGEMENT = "SELECT MAX(id) FROM post_engagement"
+# Rows added since the last fold, each with its post's previous snapshot
+# (-1 for a post's first one)
+SQL_NEW_ENGAGEMENT = (
+    "SELECT s.profile_id, CAST(strftime('%s', s.schedule_date) AS INTEGER), "
+    + ENGAGEMENT + ", COALESCE(" + PREVIOUS_ENGAGEMENT + ", -1) "
+    "FROM post_engagement e JOIN scheduled_posts s ON s.id = e.post_id "
+    "WHERE e.id > ? AND e.id <= ? AND s.profile_id IS NOT NULL AND s.schedule_date IS NOT NULL"
+)
+# First fold: only the newest snapshot of every post matters
+SQL_ALL_ENGAGEMENT = (
+    "SELECT s.profile_id, CAST(strftime('%s', s.schedule_date) AS INTEGER), "
+    + ENGAGEMENT + ", -1 "
+    "FROM (SELECT MAX(id) AS id FROM post_engagement WHERE id <= ? GROUP BY post_id) n "
+    "JOIN post_engagement e ON e.id = n.id "
+    "JOIN scheduled_posts s ON s.id = e.post_id "
+    "WHERE s.profile_id IS NOT NULL AND s.schedule_date IS NOT NULL"
+)
+SQL_PROFILE_PLATFORMS = (
+    "SELECT pr.id, pl.name FROM profiles pr JOIN platforms pl ON pl.id = pr.platform_id"
+)
+SQL_LOAD_FOLD = "SELECT last_id, as_of, slots_per_hour, half_life FROM engagement_fold"
+SQL_LOAD_HEATMAPS = "SELECT profile_id, sums, weights FROM engagement_heatmaps"
+SQL_CLAIM_FOLD = (
+    "UPDATE engagement_fold SET last_id = ?, as_of = ? WHERE id = 1 AND last_id = ?"
+)
+SQL_SAVE_HEATMAP = (
+    "INSERT OR REPLACE INTO engagement_heatmaps (profile_id, sums, weights) VALUES (?, ?, ?)"
+)
+
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+HALF_LIFE = timedelta(weeks=4)
+# Cells with little history lean towards the profile's average, as if
+# this many posts at the average score had landed there
+PRIOR_POSTS = 2.0
+FOLD_CHUNK = 200000
+EPOCH = datetime(1970, 1, 1)
+
+
+def weekday_slots(epoch_seconds, slots_per_hour):
+    # 1970-01-01 was a Thursday; weekday 0 is Monday like datetime.weekday()
+    days = epoch_seconds // 86400
+    weekday = (days + 3) % 7
+    slot = (epoch_seconds % 86400) // (3600 // slots_per_hour)
+    return weekday, slot
+
+
+def slot_time(slot, slots_per_hour):
+    minutes = slot * 60 // slots_per_hour
+    return divmod(minutes, 60)
+
+
+class EngagementModel:
+    """Decayed 7 x (24 * slots_per_hour) engagement grids per profile.
+
+    ``sums`` holds the decayed score per cell and ``weights`` the decayed
+    number of posts, both scaled as of ``as_of`` (epoch seconds); moving
+    ``as_of`` forward multiplies both by the same factor. A cell's heat is
+    the smoothed average ``(sums + k * mean) / (weights + k)``.
+    """
+
+    def __init__(self, store, slots_per_hour=1, half_life=HALF_LIFE):
+        if 60 % slots_per_hour:
+            raise ValueError("slots_per_hour must divide an hour")
+        self.store = store
+        self.conn = store.conn
+        self.slots_per_hour = slots_per_hour
+        self.half_life = half_life.total_seconds()
+        self.shape = (7, 24 * slots_per_hour)
+        self.profiles = {}
+        self.platforms = {}
+        self.last_id = 0
+        self.as_of = 0.0
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+        self.load()
+
+    def load(self):
+        # Saved grids are only reused if they were built with the same grid
+        # and half-life; otherwise everything is folded again
+        row = self.conn.execute(SQL_LOAD_FOLD).fetchone()
+        self.profiles = {}
+        if row and (row[2], row[3]) == (self.slots_per_hour, self.half_life):
+            self.last_id, self.as_of = row[0], row[1]
+            for profile_id, sums, weights in self.conn.execute(SQL_LOAD_HEATMAPS):
+                self.profiles[profile_id] = (
+                    np.frombuffer(sums, dtype=np.float64).reshape(self.shape).copy(),
+                    np.frombuffer(weights, dtype=np.float64).reshape(self.shape).copy(),
+                )
+            return
+        self.last_id, self.as_of = 0, 0.0
+        with self.conn:
+            self.conn.execute("DELETE FROM engagement_heatmaps")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO engagement_fold VALUES (1, 0, 0, ?, ?)",
+                (self.slots_per_hour, self.half_life)
+            )
+
+    # Ingest
+
+    def record(self, post_id, likes=0, comments=0, shares=0, impressions=0, collected_at=None):
+        self.record_many([(post_id, likes, comments, shares, impressions, collected_at)])
+
+    def record_many(self, rows):
+        # rows: iterables of (post_id, likes, comments, shares, impressions, collected_at)
+        now = format_datetime(datetime.now())
+        with self.conn:
+            self.conn.executemany(SQL_INSERT_ENGAGEMENT, (
+                (r[0], format_datetime(r[5]) if r[5] else now, r[4], r[1], r[2], r[3])
+                for r in rows
+            ))
+
+    # Aggregation
+
+    def refresh(self, now=None):
+        """Fold engagement rows added since the last call; returns how many."""
+        top = self.conn.execute(SQL_LAST_ENGAGEMENT).fetchone()[0] or 0
+        if top <= self.last_id:
+            return 0
+        # Same clock as strftime('%s') on the naive local schedule dates
+        now = ((now or datetime.now()) - EPOCH).total_seconds()
+        previous_id = self.last_id
+        sql = SQL_NEW_ENGAGEMENT if previous_id else SQL_ALL_ENGAGEMENT
+        params = (previous_id, top) if previous_id else (top,)
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(sql, params)
+        folded = 0
+        while True:
+            rows = cursor.fetchmany(FOLD_CHUNK)
+            if not rows:
+                break
+            self.fold(np.array(rows, dtype=np.float64), now)
+            folded += len(rows)
+        with self.conn:
+            claimed = self.conn.execute(
+                SQL_CLAIM_FOLD, (top, self.as_of, previous_id)
+            ).rowcount
+            if claimed:
+                self.conn.executemany(SQL_SAVE_HEATMAP, (
+                    (profile_id, sums.tobytes(), weights.tobytes())
+                    for profile_id, (sums, weights) in self.profiles.items()
+                ))
+        if not claimed:
+            # Another process folded the same rows first; use its grids
+            self.load()
+            return self.refresh()
+        self.last_id = top
+        return folded
+
+    def fold(self, rows, now):
+        # rows: (profile_id, epoch seconds, engagement, previous or -1)
+        profile_ids = rows[:, 0].astype(np.int64)
+        seconds = rows[:, 1]
+        previous = rows[:, 3]
+        first = previous < 0
+        # log1p keeps one viral post from owning its slot
+        delta = np.log1p(rows[:, 2]) - np.log1p(np.maximum(previous, 0))
+
+        as_of = max(self.as_of, now, float(seconds.max()))
+        if as_of > self.as_of:
+            decay = 0.5 ** ((as_of - self.as_of) / self.half_life)
+            for sums, weights in self.profiles.values():
+                sums *= decay
+                weights *= decay
+            self.as_of = as_of
+        weight = 0.5 ** ((as_of - seconds) / self.half_life)
+        weekday, slot = weekday_slots(rows[:, 1].astype(np.int64), self.slots_per_hour)
+
+        # One bincount over (profile, weekday, slot) for the whole chunk
+        unique, dense = np.unique(profile_ids, return_inverse=True)
+        cells = self.shape[0] * self.shape[1]
+        index = dense * cells + weekday * self.shape[1] + slot
+        size = len(unique) * cells
+        shape = (len(unique),) + self.shape
+        sums_added = np.bincount(index, weight * delta, size).reshape(shape)
+        weights_added = np.bincount(index, weight * first, size).reshape(shape)
+        for i, profile_id in enumerate(unique.tolist()):
+            if profile_id not in self.profiles:
+                self.profiles[profile_id] = (np.zeros(self.shape), np.zeros(self.shape))
+            sums, weights = self.profiles[profile_id]
+            sums += sums_added[i]
+            weights += weights_added[i]
+
+    # Queries
+
+    def profile_platforms(self):
+        if len(self.platforms) < len(self.profiles):
+            self.platforms = dict(self.conn.execute(SQL_PROFILE_PLATFORMS).fetchall())
+        return self.platforms
+
+    def totals(self, profile_ids=None, platforms=None):
+        # Summed (sums, weights) over the chosen profiles/platforms
+        platform_of = self.profile_platforms() if platforms else {}
+        sums, weights = np.zeros(self.shape), np.zeros(self.shape)
+        for profile_id, (profile_sums, profile_weights) in self.profiles.items():
+            if profile_ids is not None and profile_id not in profile_ids:
+                continue
+            if platforms and platform_of.get(profile_id) not in platforms:
+                continue
+            sums += profile_sums
+            weights += profile_weights
+        return sums, weights
+
+    def heatmap(self, profile_ids=None, platforms=None):
+        """Smoothed average score per (weekday, slot), or None without history."""
+        sums, weights = self.totals(profile_ids, platforms)
+        return self.smoothed(sums, weights)
+
+    def smoothed(self, sums, weights):
+        total = weights.sum()
+        if total <= 0:
+            return None
+        mean = sums.sum() / total
+        return (sums + PRIOR_POSTS * mean) / (weights + PRIOR_POSTS)
+
+    def best_slots(self, count=3, weekday=None, profile_ids=None, platforms=None):
+        """Top (weekday, hour, minute, heat) cells with history, best first.
+
+        ``weekday`` (0 = Monday) limits the suggestions to one day.
+        """
+        sums, weights = self.totals(profile_ids, platforms)
+        heat = self.smoothed(sums, weights)
+        if heat is None:
+            return []
+        # Never suggest a time nobody has posted at
+        heat = np.where(weights > 0, heat, -np.inf)
+        if weekday is not None:
+            heat[np.arange(7) != weekday] = -np.inf
+        flat = heat.ravel()
+        count = min(count, int(np.isfinite(flat).sum()))
+        if count <= 0:
+            return []
+        top = np.argpartition(-flat, count - 1)[:count]
+        top = top[np.argsort(-flat[top], kind="stable")]
+        slots = []
+        for index in top.tolist():
+            day, slot = divmod(index, self.shape[1])
+            hour, minute = slot_time(slot, self.slots_per_hour)
+            slots.append((day, hour, minute, float(flat[index])))
+        return slots
+
+    def weekday_strength(self, profile_ids=None, platforms=None):
+        """Each weekday's best cell scaled to 0..1 across the week, or None."""
+        heat = self.heatmap(profile_ids, platforms)
+        if heat is None:
+            return None
+        best = heat.max(axis=1)
+        spread = best.max() - best.min()
+        if spread <= 0 or math.isnan(spread):
+            return np.zeros(7)
+        return (best - best.min()) / spread
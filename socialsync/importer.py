@@ -0,0 +1,241 @@
+"""Bulk schedule import from CSV or JSONL.
+
+    python -m socialsync.importer posts.csv
+
+Each row has profile, platform, datetime, caption, hashtags and
+media_path (plus an optional id to update an existing post). Rows with
+an empty datetime become drafts for cadence auto-placement. A datetime
+with a UTC offset is that exact instant; without one it is wall time in
+the profile's time zone. Rows are
+streamed, validated and written with executemany in chunked
+transactions; bad rows are reported without aborting the import.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+from socialsync.media import media_kind
+from socialsync.store import (
+    DEFAULT_DB_PATH, DEFAULT_PROFILE, PLATFORMS, SQL_INSERT_PLATFORM, SQL_INSERT_POST,
+    SQL_INSERT_PROFILE, SQL_SELECT_PLATFORM, SQL_SELECT_PROFILE, SQL_UPSERT_POST,
+    ScheduleStore, format_datetime
+)
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+CAPTION_LIMIT = 5000
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []  # (line, message), capped at MAX_REPORTED_ERRORS
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def __repr__(self):
+        return (f"<ImportReport rows={self.rows} inserted={self.inserted} "
+                f"updated={self.updated} errors={self.error_count}>")
+
+
+def read_rows(path):
+    # Yields (line number, dict) without loading the file into memory
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_no, e
+                    continue
+                yield line_no, row if isinstance(row, dict) else ValueError("not an object")
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            while True:
+                # A malformed row (NUL byte, oversized field) is consumed
+                # before csv.Error is raised, so reading can go on
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    break
+                except csv.Error as e:
+                    # line_num is not advanced for the failed record
+                    yield reader.line_num + 1, e
+                    continue
+                yield reader.line_num, row
+
+
+def parse_when(value):
+    value = str(value or "").strip()
+    if not value:
+        raise ValueError("missing datetime")
+    try:
+        when = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            when = datetime.strptime(value, "%Y-%m-%d %I:%M %p")
+        except ValueError:
+            raise ValueError(f"invalid datetime {value!r}") from None
+    return when
+
+
+def validate(row, check_media=False):
+    platform = (row.get("platform") or "").strip()
+    if platform not in PLATFORMS:
+        raise ValueError(f"unknown platform {platform!r}")
+    profile = (row.get("profile") or "").strip() or DEFAULT_PROFILE
+    when = row.get("datetime") or row.get("schedule_date")
+    if str(when or "").strip():
+        schedule_date, status = parse_when(when), "pending"
+    else:
+        # No time yet: a draft for socialsync.cadence to place
+        schedule_date, status = None, "draft"
+    caption = row.get("caption") or ""
+    if len(caption) > CAPTION_LIMIT:
+        raise ValueError(f"caption longer than {CAPTION_LIMIT} characters")
+    hashtags = row.get("hashtags") or ""
+    if isinstance(hashtags, list):
+        hashtags = " ".join(hashtags)
+    media_path = (row.get("media_path") or "").strip() or None
+    content_type = "text"
+    if media_path:
+        content_type = media_kind(media_path)
+        if content_type is None:
+            raise ValueError(f"unsupported media type {media_path!r}")
+        if check_media and not os.path.isfile(media_path):
+            raise ValueError(f"media file not found {media_path!r}")
+    post_id = row.get("id")
+    post_id = int(post_id) if post_id not in (None, "") else None
+    return post_id, platform, profile, (
+        content_type, media_path, caption, hashtags, schedule_date, status
+    )
+
+
+class Importer:
+    def __init__(self, store, chunk_size=CHUNK_SIZE, check_media=False):
+        self.store = store
+        self.conn = store.conn
+        self.chunk_size = chunk_size
+        self.check_media = check_media
+        self.platform_ids = {}
+        self.profile_ids = {}
+
+    def profile_id(self, platform, profile):
+        # Cached lookup; missing platforms/profiles are created inside the
+        # current chunk's transaction.
+        key = (platform, profile)
+        if key in self.profile_ids:
+            return self.profile_ids[key]
+        platform_id = self.platform_ids.get(platform)
+        if platform_id is None:
+            row = self.conn.execute(SQL_SELECT_PLATFORM, (platform,)).fetchone()
+            platform_id = row[0] if row else self.conn.execute(
+                SQL_INSERT_PLATFORM, (platform, format_datetime(datetime.now()))
+            ).lastrowid
+            self.platform_ids[platform] = platform_id
+        row = self.conn.execute(SQL_SELECT_PROFILE, (platform_id, profile)).fetchone()
+        profile_id = row[0] if row else self.conn.execute(
+            SQL_INSERT_PROFILE, (platform_id, profile, format_datetime(datetime.now()))
+        ).lastrowid
+        self.profile_ids[key] = profile_id
+        return profile_id
+
+    def run(self, rows):
+        report = ImportReport()
+        chunk = []
+        for line_no, row in rows:
+            report.rows += 1
+            if isinstance(row, Exception):
+                report.error(line_no, f"invalid row: {row}")
+                continue
+            try:
+                chunk.append((line_no, validate(row, self.check_media)))
+            except (ValueError, TypeError) as e:
+                report.error(line_no, str(e))
+                continue
+            if len(chunk) >= self.chunk_size:
+                self.write(chunk, report)
+                chunk = []
+        if chunk:
+            self.write(chunk, report)
+        return report
+
+    def write(self, chunk, report):
+        try:
+            with self.conn:
+                inserts, upserts = self.split(chunk)
+                self.conn.executemany(SQL_INSERT_POST, [values for _, values in inserts])
+                self.conn.executemany(SQL_UPSERT_POST, [values for _, values in upserts])
+            report.inserted += len(inserts)
+            report.updated += len(upserts)
+        except sqlite3.Error:
+            # Rolled back; redo row by row so one bad row only costs itself
+            self.profile_ids.clear()
+            self.platform_ids.clear()
+            for line_no, item in chunk:
+                try:
+                    with self.conn:
+                        inserts, upserts = self.split([(line_no, item)])
+                        for _, values in inserts:
+                            self.conn.execute(SQL_INSERT_POST, values)
+                        for _, values in upserts:
+                            self.conn.execute(SQL_UPSERT_POST, values)
+                    report.inserted += len(inserts)
+                    report.updated += len(upserts)
+                except sqlite3.Error as e:
+                    self.profile_ids.clear()
+                    self.platform_ids.clear()
+                    report.error(line_no, f"database error: {e}")
+
+    def split(self, chunk):
+        inserts, upserts = [], []
+        for line_no, (post_id, platform, profile, values) in chunk:
+            profile_id = self.profile_id(platform, profile)
+            # (..., schedule_date, status) -> (..., schedule_date, status, schedule_at)
+            values = values[:4] + self.store.post_times(profile_id, values[4], values[5])
+            if post_id is None:
+                inserts.append((line_no, (profile_id,) + values))
+            else:
+                upserts.append((line_no, (post_id, profile_id) + values))
+        return inserts, upserts
+
+
+def import_file(store, path, chunk_size=CHUNK_SIZE, check_media=False):
+    return Importer(store, chunk_size, check_media).run(read_rows(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import scheduled posts from CSV or JSONL.")
+    parser.add_argument("path")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--check-media", action="store_true",
+                        help="reject rows whose media file does not exist")
+    args = parser.parse_args(argv)
+
+    store = ScheduleStore(args.db)
+    report = import_file(store, args.path, args.chunk_size, args.check_media)
+    store.close()
+    print(f"{report.rows} rows: {report.inserted} inserted, {report.updated} updated, "
+          f"{report.error_count} errors")
+    for line_no, message in report.errors:
+        print(f"  line {line_no}: {message}", file=sys.stderr)
+    return 1 if report.error_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""Media ingestion off the Tk thread: validation, probing and thumbnails.
+
+Work runs on a thread pool; finished results are queued and handed back to
+Tk from the main loop with ``after()``, never from a worker thread.
+"""
+
+import hashlib
+import io
+import json
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Pillow is imported inside the functions that need it: it is slow to load
+# and the GUI should not pay for it until media is actually picked.
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".m4v"}
+MAX_FILE_SIZE = 4 * 1024 ** 3
+THUMBNAIL_SIZE = (256, 256)
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "socialsync", "thumbnails")
+
+# Files above this size are hashed from sampled chunks instead of in full
+FULL_HASH_LIMIT = 64 * 1024 ** 2
+HASH_CHUNK = 1024 ** 2
+
+
+class MediaError(Exception):
+    pass
+
+
+def media_kind(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        return "image"
+    if ext in VIDEO_EXTENSIONS:
+        return "video"
+    return None
+
+
+def content_hash(path):
+    # Full BLAKE2 digest for normal files; for very large videos, the size
+    # plus head, middle and tail chunks, which is enough to key a thumbnail.
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode())
+    with open(path, "rb") as f:
+        if size <= FULL_HASH_LIMIT:
+            for block in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(block)
+        else:
+            for offset in (0, size // 2, size - HASH_CHUNK):
+                f.seek(offset)
+                digest.update(f.read(HASH_CHUNK))
+    return digest.hexdigest()
+
+
+# Probing
+
+def probe(path):
+    if not os.path.isfile(path):
+        raise MediaError(f"File not found: {path}")
+    kind = media_kind(path)
+    if kind is None:
+        raise MediaError(f"Unsupported file type: {os.path.basename(path)}")
+    size = os.path.getsize(path)
+    if size == 0:
+        raise MediaError("File is empty")
+    if size > MAX_FILE_SIZE:
+        raise MediaError(f"File is larger than {MAX_FILE_SIZE // 1024 ** 3} GB")
+
+    info = {"path": path, "kind": kind, "size": size, "width": None,
+            "height": None, "duration": None, "codec": None}
+    if kind == "image":
+        info.update(probe_image(path))
+    else:
+        info.update(probe_video(path))
+    return info
+
+
+def probe_image(path):
+    # Image.open only parses the header; pixels are not decoded here.
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            return {
+                "width": img.width,
+                "height": img.height,
+                "codec": img.format,
+                "frames": getattr(img, "n_frames", 1),
+            }
+    except (OSError, SyntaxError) as e:
+        raise MediaError(f"Not a valid image: {e}") from e
+
+
+def probe_video(path):
+    if shutil.which("ffprobe"):
+        return probe_ffprobe(path)
+    if os.path.splitext(path)[1].lower() in (".mp4", ".mov", ".m4v"):
+        return probe_mp4(path)
+    return {}
+
+
+def probe_ffprobe(path):
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-print_format", "json",
+             "-show_format", "-show_streams", path],
+            capture_output=True, check=True, timeout=30
+        ).stdout
+    except (subprocess.SubprocessError, OSError) as e:
+        raise MediaError(f"Could not probe video: {e}") from e
+    data = json.loads(out)
+    video = next((s for s in data.get("streams", []) if s.get("codec_type") == "video"), {})
+    duration = data.get("format", {}).get("duration")
+    return {
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "codec": video.get("codec_name"),
+        "duration": float(duration) if duration else None,
+    }
+
+
+def iter_boxes(f, start, end):
+    # Yields (type, payload_start, box_end) for ISO-BMFF boxes in [start, end)
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header)
+        offset = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            offset = 16
+        elif size == 0:
+            size = end - pos
+        if size < offset:
+            return
+        yield box_type.decode("latin-1"), pos + offset, pos + size
+        pos += size
+
+
+def probe_mp4(path):
+    # Reads only the moov box headers: mvhd for duration, tkhd for display
+    # size and stsd for the codec fourcc.
+    info = {}
+    with open(path, "rb") as f:
+        end = os.path.getsize(path)
+        for box, start, stop in iter_boxes(f, 0, end):
+            if box != "moov":
+                continue
+            for child, cstart, cstop in iter_boxes(f, start, stop):
+                if child == "mvhd":
+                    f.seek(cstart)
+                    version = f.read(1)[0]
+                    if version == 1:
+                        f.seek(cstart + 20)
+                        timescale, duration = struct.unpack(">IQ", f.read(12))
+                    else:
+                        f.seek(cstart + 12)
+                        timescale, duration = struct.unpack(">II", f.read(8))
+                    if timescale:
+                        info["duration"] = duration / timescale
+                elif child == "trak" and "codec" not in info:
+                    info.update(probe_mp4_track(f, cstart, cstop))
+            break
+    return info
+
+
+def probe_mp4_track(f, start, stop):
+    track = {}
+    for box, bstart, bstop in iter_boxes(f, start, stop):
+        if box == "tkhd":
+            # Width and height are the last two 16.16 fixed-point fields
+            f.seek(bstop - 8)
+            width, height = struct.unpack(">II", f.read(8))
+            if width and height:
+                track["width"], track["height"] = width >> 16, height >> 16
+        elif box == "mdia":
+            for mbox, mstart, mstop in iter_boxes(f, bstart, bstop):
+                if mbox == "hdlr":
+                    f.seek(mstart + 8)
+                    if f.read(4) != b"vide":
+                        return {}
+                elif mbox == "minf":
+                    codec = find_stsd_codec(f, mstart, mstop)
+                    if codec:
+                        track["codec"] = codec
+    return track
+
+
+def find_stsd_codec(f, start, stop):
+    for box, bstart, bstop in iter_boxes(f, start, stop):
+        if box == "stbl":
+            for sbox, sstart, _ in iter_boxes(f, bstart, bstop):
+                if sbox == "stsd":
+                    f.seek(sstart + 12)
+                    return f.read(4).decode("latin-1").strip()
+    return None
+
+
+# Thumbnails
+
+def make_thumbnail(path, size=THUMBNAIL_SIZE):
+    from PIL import Image
+    with Image.open(path) as img:
+        # For JPEGs, draft() lets the decoder scale by 1/2..1/8 while
+        # decoding, so large photos never decode at full resolution.
+        img.draft("RGB", (size[0] * 2, size[1] * 2))
+        img.thumbnail(size, reducing_gap=2.0)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        img.load()
+        return img.copy()
+
+
+def make_video_thumbnail(path, size=THUMBNAIL_SIZE):
+    if not shutil.which("ffmpeg"):
+        return None
+    try:
+        data = subprocess.run(
+            ["ffmpeg", "-v", "error", "-ss", "1", "-i", path, "-frames:v", "1",
+             "-vf", f"scale={size[0]}:{size[1]}:force_original_aspect_ratio=decrease",
+             "-f", "image2pipe", "-vcodec", "png", "-"],
+            capture_output=True, check=True, timeout=60
+        ).stdout
+    except (subprocess.SubprocessError, OSError):
+        return None
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        return img.copy()
+
+
+class ThumbnailCache:
+    """Content-hash keyed thumbnails: an LRU in memory over PNG files on disk."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, memory_items=128):
+        self.directory = directory
+        self.memory_items = memory_items
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def disk_path(self, key, size):
+        return os.path.join(self.directory, f"{key}_{size[0]}x{size[1]}.png")
+
+    def get(self, key, size=THUMBNAIL_SIZE):
+        with self.lock:
+            img = self.memory.get((key, size))
+            if img is not None:
+                self.memory.move_to_end((key, size))
+                return img
+        path = self.disk_path(key, size)
+        if os.path.exists(path):
+            from PIL import Image
+            with Image.open(path) as img:
+                img.load()
+                img = img.copy()
+            self.remember(key, size, img)
+            return img
+        return None
+
+    def put(self, key, img, size=THUMBNAIL_SIZE):
+        path = self.disk_path(key, size)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        img.save(tmp, "PNG")
+        os.replace(tmp, path)
+        self.remember(key, size, img)
+
+    def remember(self, key, size, img):
+        with self.lock:
+            self.memory[(key, size)] = img
+            self.memory.move_to_end((key, size))
+            while len(self.memory) > self.memory_items:
+                self.memory.popitem(last=False)
+
+
+def ingest(path, cache, size=THUMBNAIL_SIZE):
+    info = probe(path)
+    info["hash"] = key = content_hash(path)
+    thumbnail = cache.get(key, size)
+    if thumbnail is None:
+        if info["kind"] == "image":
+            thumbnail = make_thumbnail(path, size)
+        else:
+            thumbnail = make_video_thumbnail(path, size)
+        if thumbnail is not None:
+            cache.put(key, thumbnail, size)
+    info["thumbnail"] = thumbnail
+    return info
+
+
+class MediaIngestor:
+    """Runs ``ingest`` on worker threads and delivers results on the Tk thread.
+
+    ``callback(path, info, error)`` is called from the Tk main loop; exactly
+    one of ``info`` and ``error`` is None.
+    """
+
+    def __init__(self, root, cache=None, workers=2, poll_ms=50):
+        self.root = root
+        self.cache = cache or ThumbnailCache()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="media")
+        self.done = queue.Queue()
+        self.pending = 0
+        self.poll_ms = poll_ms
+
+    def submit(self, path, callback, size=THUMBNAIL_SIZE):
+        future = self.pool.submit(ingest, path, self.cache, size)
+        future.add_done_callback(lambda f: self.done.put((path, f, callback)))
+        self.pending += 1
+        if self.pending == 1:
+            self.root.after(self.poll_ms, self.poll)
+        return future
+
+    def poll(self):
+        while True:
+            try:
+                path, future, callback = self.done.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            error = future.exception()
+            callback(path, None if error else future.result(), error)
+        if self.pending:
+            self.root.after(self.poll_ms, self.poll)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,380 @@
+"""Time series of engagement counters for published posts.
+
+Pollers append cumulative (likes, comments, shares, views) samples for
+live posts. Samples collect in NumPy columns in memory. ``flush()`` writes
+them to ``metric_segments`` as one columnar batch row per block, holding
+the last sample of every minute for every post.
+
+Every level keeps at most one point per bucket (the last sample in it):
+
+    level     bucket   block     kept for
+    60        1 min    1 hour    RETENTION[60]
+    3600      1 hour   1 day     RETENTION[3600]
+    86400     1 day    32 days   RETENTION[86400]
+
+``compact()`` splits the batches of every block that has ended into one
+row per post, and writes their last point per coarser bucket as a batch
+one level up. It then deletes blocks past their level's retention. The
+database therefore holds minute data only for recent days, and after
+that grows by one small row per post per 32 days.
+
+Pollers call ``compact()`` after each round; it does nothing until a block
+ends.
+
+Points keep their original sample time. A query at a given resolution
+reads the coarsest level not finer than it. Finer levels fill in the part
+not yet rolled up, and coarser levels fill in what retention has dropped.
+The result is downsampled with the same "last sample per bucket" rule the
+rollups use.
+
+``post_engagement`` (socialsync.engagement) keeps the occasional per-post
+snapshots behind the best-time model. ``latest()`` gives a poller the
+values to record there.
+"""
+
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from socialsync.store import CLAIM_CHUNK, chunked
+
+METRICS = ("likes", "comments", "shares", "views")
+LEVELS = (60, 3600, 86400)
+BLOCK_SPAN = {60: 3600, 3600: 86400, 86400: 86400 * 32}
+RETENTION = {60: timedelta(days=2), 3600: timedelta(days=180), 86400: None}
+# Samples buffered before append() flushes on its own
+FLUSH_SAMPLES = 100000
+# Points a query returns at most when it picks the resolution itself
+MAX_POINTS = 2000
+# Blob rows: post_id, ts, then one per metric
+ROWS = 2 + len(METRICS)
+
+# post_id is NULL for batch rows (several posts, block still open to
+# compaction) and set for per-post rows written by compact().
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metric_segments (
+    id INTEGER PRIMARY KEY,
+    level INTEGER,
+    post_id INTEGER,
+    profile_id INTEGER,
+    block_start INTEGER,
+    points BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_metric_segments_post
+    ON metric_segments (level, post_id, block_start);
+CREATE INDEX IF NOT EXISTS idx_metric_segments_profile
+    ON metric_segments (level, profile_id, block_start);
+CREATE INDEX IF NOT EXISTS idx_metric_segments_block
+    ON metric_segments (level, block_start);
+"""
+
+SQL_INSERT_SEGMENT = (
+    "INSERT INTO metric_segments (level, post_id, profile_id, block_start, points) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+SQL_ENDED_BATCHES = (
+    "SELECT id, block_start, points FROM metric_segments "
+    "WHERE level = ? AND post_id IS NULL AND block_start < ? ORDER BY block_start, id"
+)
+SQL_DELETE_SEGMENT = "DELETE FROM metric_segments WHERE id = ?"
+SQL_EXPIRE = "DELETE FROM metric_segments WHERE level = ? AND block_start < ?"
+SQL_POST_POINTS = (
+    "SELECT points FROM metric_segments "
+    "WHERE level = ? AND post_id = ? AND block_start > ? AND block_start < ? ORDER BY id"
+)
+SQL_PROFILE_POINTS = (
+    "SELECT points FROM metric_segments "
+    "WHERE level = ? AND profile_id = ? AND block_start > ? AND block_start < ? ORDER BY id"
+)
+SQL_BATCH_POINTS = (
+    "SELECT points FROM metric_segments "
+    "WHERE level = ? AND post_id IS NULL AND block_start > ? AND block_start < ? ORDER BY id"
+)
+SQL_OPEN_FROM = (
+    "SELECT MIN(block_start) FROM metric_segments WHERE level = ? AND post_id IS NULL"
+)
+SQL_STORED_FROM = "SELECT MIN(block_start) FROM metric_segments WHERE level = ?"
+SQL_PROFILE_POSTS = "SELECT id FROM scheduled_posts WHERE profile_id = ?"
+
+
+def epoch(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def pack(points):
+    # Delta-encoded along time, then zlib: counters and sorted ids mostly
+    # differ by small amounts from one point to the next
+    deltas = np.diff(points, axis=1, prepend=np.zeros((ROWS, 1), dtype=np.int64))
+    return zlib.compress(deltas.astype("<i8").tobytes(), 1)
+
+
+def unpack(blob):
+    deltas = np.frombuffer(zlib.decompress(blob), dtype="<i8").reshape(ROWS, -1)
+    return np.cumsum(deltas, axis=1)
+
+
+def empty_points():
+    return np.empty((ROWS, 0), dtype=np.int64)
+
+
+def sort_points(points):
+    # Stable, so of two samples at the same second the later write wins
+    return points[:, np.lexsort((points[1], points[0]))]
+
+
+def last_per_bucket(points, resolution):
+    """Keep the last sample of each (post, bucket) of sorted ``points``."""
+    if not points.shape[1]:
+        return points
+    post, bucket = points[0], points[1] // resolution
+    last = np.ones(len(bucket), dtype=bool)
+    last[:-1] = (post[1:] != post[:-1]) | (bucket[1:] != bucket[:-1])
+    return points[:, last]
+
+
+def split_runs(keys):
+    # (start, end) of each run of equal values in ``keys``
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return zip(starts.tolist(), np.r_[starts[1:], len(keys)].tolist())
+
+
+class SampleBuffer:
+    """Growable columns of (post_id, ts, likes, comments, shares, views)."""
+
+    def __init__(self, capacity=1024):
+        self.data = np.empty((ROWS, capacity), dtype=np.int64)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, post_ids, timestamps, values):
+        count = len(post_ids)
+        if self.size + count > self.data.shape[1]:
+            grown = np.empty((ROWS, max(2 * self.data.shape[1], self.size + count)), dtype=np.int64)
+            grown[:, :self.size] = self.data[:, :self.size]
+            self.data = grown
+        end = self.size + count
+        self.data[0, self.size:end] = post_ids
+        self.data[1, self.size:end] = timestamps
+        self.data[2:, self.size:end] = np.asarray(values, dtype=np.int64).T
+        self.size = end
+
+    def view(self):
+        return self.data[:, :self.size]
+
+    def take(self):
+        points = self.view().copy()
+        self.size = 0
+        return points
+
+
+class MetricsStore:
+    """Buffered engagement time series with 1-min/1-hour/1-day rollups.
+
+    Not thread-safe: one MetricsStore per connection, like ScheduleStore.
+    """
+
+    def __init__(self, store, flush_samples=FLUSH_SAMPLES, retention=None):
+        self.store = store
+        self.conn = store.conn
+        self.flush_samples = flush_samples
+        self.retention = {**RETENTION, **(retention or {})}
+        self.buffer = SampleBuffer()
+        self.profiles = {}
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    # Ingest
+
+    def record(self, post_id, timestamp=None, likes=0, comments=0, shares=0, views=0):
+        self.append([post_id], [timestamp if timestamp is not None else time.time()],
+                    [[likes, comments, shares, views]])
+
+    def append(self, post_ids, timestamps, values):
+        """Buffer one sample per post; ``values`` is (n, 4) in METRICS order."""
+        if not isinstance(timestamps, np.ndarray):
+            timestamps = [epoch(t) for t in timestamps]
+        self.buffer.append(post_ids, timestamps, values)
+        if len(self.buffer) >= self.flush_samples:
+            self.flush()
+
+    def flush(self):
+        """Write buffered samples as 1-minute batches; returns the points written."""
+        if not len(self.buffer):
+            return 0
+        points = last_per_bucket(sort_points(self.buffer.take()), LEVELS[0])
+        with self.conn:
+            self.write_batches(LEVELS[0], points)
+        return points.shape[1]
+
+    def write_batches(self, level, points):
+        # One batch row per block the points fall in, each still sorted
+        span = BLOCK_SPAN[level]
+        blocks = points[1] // span
+        for block in np.unique(blocks).tolist():
+            self.conn.execute(SQL_INSERT_SEGMENT, (
+                level, None, None, block * span, pack(points[:, blocks == block])
+            ))
+
+    def profile_ids(self, post_ids):
+        missing = [post_id for post_id in post_ids if post_id not in self.profiles]
+        for chunk in chunked(missing, CLAIM_CHUNK):
+            self.profiles.update(self.conn.execute(
+                "SELECT id, profile_id FROM scheduled_posts WHERE id IN ({})".format(
+                    ", ".join("?" * len(chunk))
+                ), chunk
+            ).fetchall())
+        return self.profiles
+
+    # Rollups and retention
+
+    def compact(self, now=None):
+        """Split ended batches per post, roll them up and drop expired data.
+
+        Returns the number of per-post rows written.
+        """
+        self.flush()
+        now = epoch(now if now is not None else time.time())
+        written = 0
+        for level, coarser in zip(LEVELS, LEVELS[1:] + (None,)):
+            span = BLOCK_SPAN[level]
+            # Blocks that started before this are over
+            ended = (now // span) * span
+            rows = self.conn.execute(SQL_ENDED_BATCHES, (level, ended)).fetchall()
+            with self.conn:
+                for block_start in sorted({row[1] for row in rows}):
+                    parts = [unpack(row[2]) for row in rows if row[1] == block_start]
+                    points = last_per_bucket(sort_points(np.concatenate(parts, axis=1)), level)
+                    written += self.write_posts(level, block_start, points)
+                    if coarser:
+                        self.write_batches(coarser, last_per_bucket(points, coarser))
+                self.conn.executemany(SQL_DELETE_SEGMENT, ((row[0],) for row in rows))
+                keep = self.retention.get(level)
+                if keep is not None:
+                    self.conn.execute(SQL_EXPIRE, (level, now - int(keep.total_seconds()) - span))
+        return written
+
+    def write_posts(self, level, block_start, points):
+        profiles = self.profile_ids(np.unique(points[0]).tolist())
+        runs = list(split_runs(points[0]))
+        self.conn.executemany(SQL_INSERT_SEGMENT, (
+            (level, post_id, profiles.get(post_id), block_start, pack(points[:, a:b]))
+            for post_id, (a, b) in zip(points[0, [a for a, _ in runs]].tolist(), runs)
+        ))
+        return len(runs)
+
+    # Queries
+
+    def level_ranges(self, start, end, resolution):
+        """Which part of [start, end) to read from each level.
+
+        The base level is the coarsest one not finer than ``resolution``.
+        Finer levels fill in only after its data ends (their oldest open
+        batch, i.e. what compact() has not rolled up yet). Coarser levels
+        fill in only before its oldest stored block, i.e. what retention
+        already dropped.
+        """
+        base = max([level for level in LEVELS if level <= resolution] or LEVELS[:1])
+        ranges = {base: (start, end)}
+        for level in LEVELS:
+            if level < base:
+                row = self.conn.execute(SQL_OPEN_FROM, (level,)).fetchone()
+                begin = max(start, row[0] if row[0] is not None else end)
+                if begin < end:
+                    ranges[level] = (begin, end)
+        finer = base
+        for level in LEVELS:
+            if level > base:
+                row = self.conn.execute(SQL_STORED_FROM, (finer,)).fetchone()
+                stop = min(end, row[0] if row[0] is not None else end)
+                if start < stop:
+                    ranges[level] = (start, stop)
+                finer = level
+        return ranges
+
+    def points(self, start, end, resolution, post_id=None, profile_id=None):
+        # Stored and buffered points of one post or profile in [start, end),
+        # sorted by (post, ts)
+        if post_id is not None:
+            sql, key = SQL_POST_POINTS, post_id
+            wanted = lambda ids: ids == post_id  # noqa: E731
+        else:
+            sql, key = SQL_PROFILE_POINTS, profile_id
+            posts = np.array([row[0] for row in self.conn.execute(SQL_PROFILE_POSTS, (profile_id,))])
+            wanted = lambda ids: np.isin(ids, posts)  # noqa: E731
+        parts = []
+        for level, (begin, stop) in self.level_ranges(start, end, resolution).items():
+            bounds = (begin - BLOCK_SPAN[level], stop)
+            level_parts = [unpack(row[0]) for row in self.conn.execute(sql, (level, key) + bounds)]
+            for row in self.conn.execute(SQL_BATCH_POINTS, (level,) + bounds):
+                batch = unpack(row[0])
+                level_parts.append(batch[:, wanted(batch[0])])
+            if level_parts:
+                points = np.concatenate(level_parts, axis=1)
+                parts.append(points[:, (points[1] >= begin) & (points[1] < stop)])
+        buffered = self.buffer.view()
+        parts.append(buffered[:, wanted(buffered[0])])
+        points = np.concatenate(parts, axis=1)
+        return sort_points(points[:, (points[1] >= start) & (points[1] < end)])
+
+    def resolution_for(self, start, end, resolution, max_points):
+        if resolution is not None:
+            return resolution
+        for level in LEVELS:
+            if (end - start) / level <= max_points:
+                return level
+        return LEVELS[-1]
+
+    def series(self, post_id, start, end, resolution=None, max_points=MAX_POINTS):
+        """(bucket starts, values) for one post over [start, end).
+
+        ``values`` is an (n, 4) int64 array in METRICS order holding each
+        bucket's last sample; buckets without samples are left out.
+        """
+        start, end = epoch(start), epoch(end)
+        resolution = self.resolution_for(start, end, resolution, max_points)
+        points = last_per_bucket(self.points(start, end, resolution, post_id=post_id), resolution)
+        return points[1] // resolution * resolution, points[2:].T.copy()
+
+    def profile_series(self, profile_id, start, end, resolution=None, max_points=MAX_POINTS):
+        """(bucket starts, totals) summed over a profile's posts.
+
+        Every bucket in [start, end) is returned. Each post contributes its
+        latest value so far, so a post polled less often than the
+        resolution does not make the totals dip between its samples.
+        """
+        start, end = epoch(start), epoch(end)
+        resolution = self.resolution_for(start, end, resolution, max_points)
+        points = last_per_bucket(
+            self.points(start, end, resolution, profile_id=profile_id), resolution
+        )
+        first = start // resolution
+        buckets = np.arange(first, (end - 1) // resolution + 1)
+        if not points.shape[1]:
+            return buckets * resolution, np.zeros((len(buckets), len(METRICS)), dtype=np.int64)
+        posts, row = np.unique(points[0], return_inverse=True)
+        column = points[1] // resolution - first
+        grid = np.zeros((len(posts), len(buckets), len(METRICS)), dtype=np.int64)
+        grid[row, column] = points[2:].T
+        # Carry each post's last known value forward through empty buckets
+        seen = np.zeros((len(posts), len(buckets)), dtype=np.int64)
+        seen[row, column] = column + 1
+        carried = np.maximum.accumulate(seen, axis=1)
+        filled = grid[np.arange(len(posts))[:, None], np.maximum(carried - 1, 0)]
+        filled[carried == 0] = 0
+        return buckets * resolution, filled.sum(axis=0)
+
+    def latest(self, post_id, within=timedelta(days=2)):
+        """Most recent sample of a post as a METRICS-ordered array, or None."""
+        now = time.time()
+        points = self.points(
+            epoch(now - within.total_seconds()), epoch(now) + 1, LEVELS[0], post_id=post_id
+        )
+        if not points.shape[1]:
+            return None
+        return points[2:, -1].copy()
@@ -0,0 +1,433 @@
+"""MonoLink: short links for captions, and the service that redirects them.
+
+    python -m socialsync.monolink --db social_media_scheduler.db --port 8780
+
+Links live in the ``links`` table and are edited through LinkStore, which
+the GUI's MonoLink view uses. The service answers ``GET /<code>`` with a
+302 to the link's target. Responses are built once per link and kept in a
+dict keyed by code, so a redirect never touches the database:
+
+- Every write to a link gives it the next ``rev``. The service polls
+  PRAGMA data_version, which changes only when another connection
+  commits, and then loads just the rows with a newer rev. Edits are live
+  within ``reload_interval``.
+- Clicks are counted in a dict that only the worker's event loop touches,
+  so counting takes no lock. Every ``flush_interval`` the dict is swapped
+  for an empty one and added to ``links.clicks`` in one transaction on
+  the worker's database thread. A crash loses at most one interval of
+  clicks.
+
+``--workers N`` runs N processes on the same port (SO_REUSEPORT), each
+with its own index and counters.
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import re
+import secrets
+import signal
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+from socialsync.store import DEFAULT_DB_PATH, ScheduleStore
+
+log = logging.getLogger("socialsync.monolink")
+
+DEFAULT_PORT = 8780
+DEFAULT_BASE_URL = f"http://127.0.0.1:{DEFAULT_PORT}"
+CODE_ALPHABET = string.ascii_letters + string.digits
+CODE_LENGTH = 6
+CODE_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}\Z")
+EDITABLE_FIELDS = ("code", "target", "title")
+# Characters left as they are when a target goes into a Location header
+URL_SAFE = ":/?#[]@!$&'()*+,;=%~"
+MAX_HEADER = 16384
+EMPTY_BODY = re.compile(rb"(?im)^content-length:[ \t]*0+[ \t]*\r?$")
+# Header names at the start of a line: Accept-Encoding is not a body
+CONTENT_LENGTH = re.compile(rb"(?im)^content-length:")
+TRANSFER_ENCODING = re.compile(rb"(?im)^transfer-encoding:")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE,
+    target TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    created REAL,
+    clicks INTEGER NOT NULL DEFAULT 0,
+    last_click REAL,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    rev INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_links_rev ON links (rev);
+CREATE TABLE IF NOT EXISTS link_revision (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    rev INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO link_revision (id, rev) SELECT 1, COALESCE(MAX(rev), 0) FROM links;
+"""
+
+# Revs come from a counter rather than MAX(links.rev): reusing a deleted
+# code drops its row, which may hold the highest rev a service has seen
+SQL_BUMP_REV = "UPDATE link_revision SET rev = rev + 1"
+NEXT_REV = "(SELECT rev FROM link_revision)"
+SQL_CREATE_LINK = (
+    "INSERT INTO links (code, target, title, created, rev) "
+    "VALUES (?, ?, ?, ?, " + NEXT_REV + ") RETURNING id"
+)
+# Deleted rows stay until their code is reused, so running services see
+# the deletion as a change
+SQL_DELETE_LINK = "UPDATE links SET deleted = 1, rev = " + NEXT_REV + " WHERE id = ?"
+SQL_PURGE_CODE = "DELETE FROM links WHERE code = ? AND deleted"
+SQL_LINKS = (
+    "SELECT id, code, target, title, created, clicks, last_click FROM links "
+    "WHERE NOT deleted ORDER BY created DESC"
+)
+SQL_LINK = (
+    "SELECT id, code, target, title, created, clicks, last_click FROM links "
+    "WHERE id = ? AND NOT deleted"
+)
+SQL_CHANGES = "SELECT id, code, target, deleted, rev FROM links WHERE rev > ? ORDER BY rev"
+SQL_ADD_CLICKS = "UPDATE links SET clicks = clicks + ?, last_click = ? WHERE id = ?"
+
+
+def short_url(code, base_url=DEFAULT_BASE_URL):
+    return f"{base_url.rstrip('/')}/{code}"
+
+
+def check_code(code):
+    if not CODE_PATTERN.match(code or ""):
+        raise ValueError("Short codes are 1-64 letters, digits, '-' or '_'")
+    return code
+
+
+def check_target(target):
+    target = (target or "").strip()
+    parts = urlsplit(target)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        raise ValueError("Links must point to an http:// or https:// address")
+    if any(ord(c) <= 32 or ord(c) == 127 for c in target):
+        raise ValueError("Link targets cannot contain spaces or control characters")
+    return target
+
+
+def redirect_response(target):
+    location = quote(target, safe=URL_SAFE).encode("ascii")
+    return (
+        b"HTTP/1.1 302 Found\r\nLocation: " + location +
+        b"\r\nCache-Control: no-store\r\nContent-Length: 0\r\n\r\n"
+    )
+
+
+NOT_FOUND = b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n"
+NOT_ALLOWED = b"HTTP/1.1 405 Method Not Allowed\r\nAllow: GET, HEAD\r\nContent-Length: 0\r\n\r\n"
+BAD_REQUEST = b"HTTP/1.1 400 Bad Request\r\nConnection: close\r\nContent-Length: 0\r\n\r\n"
+
+
+class LinkStore:
+    """Short links in the scheduler database."""
+
+    def __init__(self, store):
+        self.store = store
+        with store.conn:
+            store.conn.executescript(SCHEMA)
+
+    def create(self, target, code=None, title=""):
+        """Add a link and return its id; a random code is picked if none is given."""
+        target = check_target(target)
+        conn = self.store.conn
+        for _ in range(10):
+            candidate = check_code(code) if code else "".join(
+                secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH)
+            )
+            try:
+                with conn:
+                    conn.execute(SQL_BUMP_REV)
+                    conn.execute(SQL_PURGE_CODE, (candidate,))
+                    return conn.execute(
+                        SQL_CREATE_LINK, (candidate, target, title or "", time.time())
+                    ).fetchone()[0]
+            except conn.IntegrityError:
+                if code:
+                    raise ValueError(f"The short code {code!r} is already taken") from None
+        raise ValueError("Could not find a free short code")
+
+    def update(self, link_id, **fields):
+        unknown = set(fields) - set(EDITABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown link fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+        if "code" in fields:
+            check_code(fields["code"])
+        if "target" in fields:
+            fields["target"] = check_target(fields["target"])
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        conn = self.store.conn
+        try:
+            with conn:
+                conn.execute(SQL_BUMP_REV)
+                if "code" in fields:
+                    conn.execute(SQL_PURGE_CODE, (fields["code"],))
+                conn.execute(
+                    f"UPDATE links SET {columns}, rev = {NEXT_REV} WHERE id = ? AND NOT deleted",
+                    list(fields.values()) + [link_id]
+                )
+        except conn.IntegrityError:
+            raise ValueError(f"The short code {fields['code']!r} is already taken") from None
+
+    def delete(self, link_id):
+        with self.store.conn:
+            self.store.conn.execute(SQL_BUMP_REV)
+            self.store.conn.execute(SQL_DELETE_LINK, (link_id,))
+
+    def links(self):
+        return self.store.conn.execute(SQL_LINKS).fetchall()
+
+    def get(self, link_id):
+        return self.store.conn.execute(SQL_LINK, (link_id,)).fetchone()
+
+    def changes_since(self, rev):
+        """(id, code, target, deleted, rev) of links written after ``rev``."""
+        return self.store.conn.execute(SQL_CHANGES, (rev,)).fetchall()
+
+    def add_clicks(self, counts, at=None):
+        # counts: {link_id: clicks}
+        at = at or time.time()
+        with self.store.conn:
+            self.store.conn.executemany(
+                SQL_ADD_CLICKS, ((clicks, at, link_id) for link_id, clicks in counts.items())
+            )
+
+
+class RedirectProtocol(asyncio.Protocol):
+    """One keep-alive HTTP/1.1 connection; pipelined requests are answered in one write."""
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buffer = b""
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        buffer = self.buffer + data if self.buffer else data
+        respond = self.server.respond
+        out = []
+        close = False
+        while True:
+            end = buffer.find(b"\r\n\r\n")
+            if end < 0:
+                break
+            head = buffer[:end]
+            buffer = buffer[end + 4:]
+            line_end = head.find(b"\r\n")
+            parts = (head if line_end < 0 else head[:line_end]).split(b" ")
+            # Redirects take no request body
+            if len(parts) != 3 or (
+                b"ncoding:" in head and TRANSFER_ENCODING.search(head)
+            ) or (
+                b"ength:" in head and CONTENT_LENGTH.search(head) and not EMPTY_BODY.search(head)
+            ):
+                out.append(BAD_REQUEST)
+                close = True
+                break
+            method, path, version = parts
+            out.append(respond(method, path))
+            if b"lose" in head or version == b"HTTP/1.0":
+                headers = head.lower()
+                if b"connection: close" in headers or (
+                    version == b"HTTP/1.0" and b"connection: keep-alive" not in headers
+                ):
+                    close = True
+                    break
+        if not close and len(buffer) > MAX_HEADER:
+            out.append(BAD_REQUEST)
+            close = True
+        self.buffer = b"" if close else buffer
+        if out:
+            self.transport.write(b"".join(out) if len(out) > 1 else out[0])
+        if close:
+            self.transport.close()
+
+
+class RedirectServer:
+    """Redirects short codes from memory and counts the clicks."""
+
+    def __init__(self, path=DEFAULT_DB_PATH, host="127.0.0.1", port=DEFAULT_PORT,
+                 reload_interval=1.0, flush_interval=1.0, reuse_port=False):
+        self.path = path
+        self.host = host
+        self.port = port
+        self.reload_interval = reload_interval
+        self.flush_interval = flush_interval
+        self.reuse_port = reuse_port
+        self.index = {}   # code (bytes) -> (link_id, response)
+        self.codes = {}   # link_id -> code (bytes)
+        self.counts = {}  # link_id -> clicks not yet flushed
+        self.rev = 0
+        self.data_version = None
+        self.stats = {"redirects": 0, "not_found": 0, "flushed": 0, "reloads": 0}
+        # The database is only used from this thread, off the event loop
+        self.db = ThreadPoolExecutor(max_workers=1, thread_name_prefix="monolink-db")
+        self.store = None
+        self.links = None
+        self.server = None
+        self.tasks = []
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def respond(self, method, path):
+        if method != b"GET" and method != b"HEAD":
+            return NOT_ALLOWED
+        entry = self.index.get(path[1:].split(b"?", 1)[0])
+        if entry is None:
+            self.stats["not_found"] += 1
+            return NOT_FOUND
+        link_id, response = entry
+        counts = self.counts
+        counts[link_id] = counts.get(link_id, 0) + 1
+        return response
+
+    # Database thread
+
+    def open_store(self):
+        self.store = ScheduleStore(self.path)
+        self.links = LinkStore(self.store)
+
+    def close_store(self):
+        self.store.close()
+
+    def load_changes(self):
+        version = self.store.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return []
+        self.data_version = version
+        return self.links.changes_since(self.rev)
+
+    # Event loop
+
+    def apply(self, rows):
+        index, codes = self.index, self.codes
+        for link_id, code, target, deleted, rev in rows:
+            old = codes.pop(link_id, None)
+            if old is not None and index.get(old, (None,))[0] == link_id:
+                del index[old]
+            if not deleted:
+                code = code.encode("ascii")
+                index[code] = (link_id, redirect_response(target))
+                codes[link_id] = code
+            self.rev = max(self.rev, rev)
+
+    async def reload(self):
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(self.db, self.load_changes)
+        if rows:
+            self.apply(rows)
+            self.stats["reloads"] += 1
+            log.debug("loaded %d link changes (%d links)", len(rows), len(self.index))
+
+    async def flush(self):
+        counts, self.counts = self.counts, {}
+        if counts:
+            await asyncio.get_running_loop().run_in_executor(self.db, self.links.add_clicks, counts)
+            clicks = sum(counts.values())
+            self.stats["redirects"] += clicks
+            self.stats["flushed"] += clicks
+
+    async def every(self, interval, job):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await job()
+            except Exception:
+                log.exception("%s failed", job.__name__)
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.db, self.open_store)
+        await self.reload()
+        self.server = await loop.create_server(
+            lambda: RedirectProtocol(self), self.host, self.port, reuse_port=self.reuse_port
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.tasks = [
+            asyncio.create_task(self.every(self.reload_interval, self.reload)),
+            asyncio.create_task(self.every(self.flush_interval, self.flush)),
+        ]
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self.flush()
+        await asyncio.get_running_loop().run_in_executor(self.db, self.close_store)
+        self.db.shutdown()
+
+
+async def serve(args, reuse_port=False):
+    server = await RedirectServer(
+        args.db, args.host, args.port,
+        reload_interval=args.reload, flush_interval=args.flush, reuse_port=reuse_port
+    ).start()
+    log.info("MonoLink serving %d links on %s", len(server.index), server.base_url)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopped.set)
+    await stopped.wait()
+    await server.close()
+    log.info("MonoLink stopped: %d redirects, %d not found",
+             server.stats["redirects"], server.stats["not_found"])
+
+
+def run_worker(args, reuse_port):
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s"
+    )
+    asyncio.run(serve(args, reuse_port))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve MonoLink short-link redirects.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite database path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes sharing the port, each with its own counters")
+    parser.add_argument("--reload", type=float, default=1.0,
+                        help="seconds between checks for edited links")
+    parser.add_argument("--flush", type=float, default=1.0,
+                        help="seconds between click count writes")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.workers <= 1:
+        run_worker(args, reuse_port=False)
+        return
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=run_worker, args=(args, True)) for _ in range(args.workers - 1)]
+    for worker in workers:
+        worker.start()
+    # Ctrl+C reaches every worker; on SIGTERM this one stops the others
+    try:
+        run_worker(args, reuse_port=True)
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.join()
+
+
+if __name__ == "__main__":
+    main()
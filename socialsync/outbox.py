@@ -0,0 +1,223 @@
+"""Durable per-platform delivery state for claimed posts.
+
+Claiming a post writes one ``outbox`` row per (post, platform) with a
+random idempotency key. The dispatcher sends deliveries, not posts. A
+delivery is pending until it is taken (sending), and then sent, retried
+with backoff, or failed once it runs out of attempts. The post is
+finished once none of its deliveries are left to send.
+
+Because the rows outlive the process, a crash mid-fan-out loses nothing:
+- A sent delivery is never sent again.
+- A delivery that was in flight goes back to pending when its post is
+  claimed or adopted again. It is resent with the same idempotency key,
+  so a platform that honors the key answers with the post it already
+  has.
+
+Due rows are found through a partial index over pending rows only, and
+results of many deliveries are written in one transaction.
+
+The rows are kept once a post is finished, so setting a posted post back
+to pending does not publish it again on the platforms it reached; delete
+its outbox rows for that.
+"""
+
+import time
+from datetime import datetime
+
+from socialsync.ratelimit import Backoff
+from socialsync.store import chunked
+
+MAX_ATTEMPTS = 5
+RETRY_BASE = 5.0  # seconds before the first retry; doubles per attempt
+CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL REFERENCES scheduled_posts (id) ON DELETE CASCADE,
+    platform TEXT NOT NULL,
+    owner TEXT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL,
+    last_error TEXT,
+    sent_at REAL,
+    UNIQUE (post_id, platform)
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due
+    ON outbox (owner, next_attempt_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_outbox_sending
+    ON outbox (owner) WHERE status = 'sending';
+"""
+
+# One delivery per post and platform, owned by the worker that claimed
+# the post. A delivery that failed for good starts over when its post is
+# queued again; sent ones are kept.
+SQL_ENQUEUE = (
+    "INSERT INTO outbox (post_id, platform, owner, idempotency_key, next_attempt_at) "
+    "SELECT p.id, pl.name, p.lease_owner, lower(hex(randomblob(16))), ? "
+    "FROM scheduled_posts p "
+    "JOIN profiles pr ON pr.id = p.profile_id "
+    "JOIN platforms pl ON pl.id = pr.platform_id "
+    "WHERE {} "
+    "ON CONFLICT (post_id, platform) DO UPDATE SET owner = excluded.owner, "
+    "status = iif(outbox.status = 'failed', 'pending', outbox.status), "
+    "attempts = iif(outbox.status = 'failed', 0, outbox.attempts), "
+    "next_attempt_at = iif(outbox.status = 'failed', excluded.next_attempt_at, "
+    "outbox.next_attempt_at)"
+)
+SQL_RESET_SENDING = "UPDATE outbox SET status = 'pending' WHERE status = 'sending' AND {}"
+OWNED_POSTS = "p.status = 'running' AND p.lease_owner = ?"
+# Due rows are read in order from idx_outbox_due and the scan stops at
+# LIMIT. CROSS JOIN keeps it that way round; the join only checks that
+# the post is still leased to the owner.
+SQL_TAKE = (
+    "UPDATE outbox SET status = 'sending' WHERE id IN ("
+    "SELECT o.id FROM outbox o CROSS JOIN scheduled_posts p ON p.id = o.post_id "
+    "WHERE o.status = 'pending' AND o.owner IS ? AND o.next_attempt_at <= ? "
+    "AND p.status = 'running' AND p.lease_owner IS ? "
+    "ORDER BY o.next_attempt_at LIMIT ?"
+    ") RETURNING id, post_id, platform, idempotency_key, attempts"
+)
+SQL_SENT = (
+    "UPDATE outbox SET status = 'sent', attempts = attempts + 1, sent_at = ?, "
+    "last_error = NULL WHERE id = ?"
+)
+SQL_RETRY = (
+    "UPDATE outbox SET status = 'pending', attempts = attempts + ?, next_attempt_at = ?, "
+    "last_error = ? WHERE id = ?"
+)
+SQL_GIVE_UP = (
+    "UPDATE outbox SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE id = ?"
+)
+# Posts with nothing left pending or in flight, and how their deliveries
+# ended
+SQL_SETTLE = (
+    "SELECT p.id, "
+    "EXISTS (SELECT 1 FROM outbox o WHERE o.post_id = p.id AND o.status = 'failed'), "
+    "EXISTS (SELECT 1 FROM outbox o WHERE o.post_id = p.id) "
+    "FROM scheduled_posts p WHERE {} AND NOT EXISTS ("
+    "SELECT 1 FROM outbox o WHERE o.post_id = p.id AND o.status IN ('pending', 'sending'))"
+)
+SQL_NEXT_DUE = (
+    "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending' AND owner IS ?"
+)
+SQL_DELIVERIES = (
+    "SELECT id, platform, idempotency_key, status, attempts, next_attempt_at, "
+    "last_error, sent_at FROM outbox WHERE post_id = ? ORDER BY platform"
+)
+
+
+class Outbox:
+    """Deliveries of the posts a dispatcher has claimed."""
+
+    def __init__(self, store, max_attempts=MAX_ATTEMPTS, backoff=None):
+        self.store = store
+        self.max_attempts = max_attempts
+        self.backoff = backoff or Backoff(base=RETRY_BASE)
+        with store.conn:
+            store.conn.executescript(SCHEMA)
+
+    def enqueue(self, post_ids, owner=None, now=None):
+        """Create the deliveries of freshly claimed posts.
+
+        Deliveries left from an earlier claim are kept: sent ones stay
+        sent and in-flight ones are sent again. Posts with nothing left
+        to send are finished at once. Returns the finished posts as
+        (post_id, status) pairs.
+        """
+        now = now or time.time()
+        conn = self.store.conn
+        with conn:
+            for chunk in chunked(post_ids, CHUNK):
+                where = "p.id IN ({})".format(", ".join("?" * len(chunk)))
+                conn.execute(SQL_ENQUEUE.format(where), [now] + list(chunk))
+                where = "post_id IN ({})".format(", ".join("?" * len(chunk)))
+                conn.execute(SQL_RESET_SENDING.format(where), chunk)
+            return self.settle(post_ids, owner)
+
+    def adopt(self, owner, now=None):
+        """Take back the deliveries of posts ``owner`` still holds.
+
+        For a dispatcher restarting under the same worker id: whatever
+        was in flight when it stopped is due again. Returns the finished
+        posts, like enqueue.
+        """
+        now = now or time.time()
+        conn = self.store.conn
+        with conn:
+            conn.execute(SQL_ENQUEUE.format(
+                OWNED_POSTS + " AND NOT EXISTS (SELECT 1 FROM outbox o WHERE o.post_id = p.id)"
+            ), (now, owner))
+            conn.execute(SQL_RESET_SENDING.format("owner = ?"), (owner,))
+            return self.finish(conn.execute(SQL_SETTLE.format(OWNED_POSTS), (owner,)), owner)
+
+    def take(self, owner=None, now=None, limit=CHUNK):
+        """Mark up to ``limit`` due deliveries of owner's posts as sending."""
+        with self.store.conn:
+            return self.store.conn.execute(
+                SQL_TAKE, (owner, now or time.time(), owner, limit)
+            ).fetchall()
+
+    def record(self, outcomes, owner=None, now=None):
+        """Write delivery results in one transaction.
+
+        outcomes are (delivery, status, error, retry_after), with delivery
+        a row from take and status "posted", "failed" or "throttled". A
+        failure is retried after a backoff until max_attempts is reached.
+        A throttled attempt is retried after retry_after and does not
+        count. Returns (finished posts, earliest retry time or None).
+        """
+        now = now or time.time()
+        sent, retries, failed = [], [], []
+        next_retry = None
+        for delivery, status, error, retry_after in outcomes:
+            if status == "posted":
+                sent.append((now, delivery["id"]))
+                continue
+            error = str(error) if error is not None else None
+            if status == "throttled":
+                counted, wait = 0, retry_after or self.backoff.delay(1)
+            elif delivery["attempts"] + 1 >= self.max_attempts:
+                failed.append((error, delivery["id"]))
+                continue
+            else:
+                counted, wait = 1, self.backoff.delay(delivery["attempts"] + 1, retry_after)
+            retries.append((counted, now + wait, error, delivery["id"]))
+            next_retry = now + wait if next_retry is None else min(next_retry, now + wait)
+        conn = self.store.conn
+        with conn:
+            conn.executemany(SQL_SENT, sent)
+            conn.executemany(SQL_RETRY, retries)
+            conn.executemany(SQL_GIVE_UP, failed)
+            finished = self.settle({delivery["post_id"] for delivery, *_ in outcomes}, owner)
+        return finished, next_retry
+
+    def settle(self, post_ids, owner=None):
+        rows = []
+        for chunk in chunked(list(post_ids), CHUNK):
+            where = "p.id IN ({})".format(", ".join("?" * len(chunk)))
+            rows.extend(self.store.conn.execute(SQL_SETTLE.format(where), chunk))
+        return self.finish(rows, owner)
+
+    def finish(self, rows, owner):
+        # Posted when every delivery went out, failed otherwise. Runs in
+        # the caller's transaction, with the delivery writes it settles.
+        finished = [
+            (post_id, "failed" if failed or not delivered else "posted")
+            for post_id, failed, delivered in rows
+        ]
+        if finished:
+            finished_at = datetime.now()
+            self.store.mark_finished(
+                ((post_id, status, finished_at) for post_id, status in finished), owner=owner
+            )
+        return finished
+
+    def next_due(self, owner=None):
+        """When the earliest pending delivery of owner's posts is due, or None."""
+        return self.store.conn.execute(SQL_NEXT_DUE, (owner,)).fetchone()[0]
+
+    def deliveries(self, post_id):
+        return self.store.conn.execute(SQL_DELIVERIES, (post_id,)).fetchall()
@@ -0,0 +1,224 @@
+"""In-memory directory of profiles for the sidebar, with prefix and trigram search.
+
+An agency can have thousands of profiles, so the sidebar never makes a
+widget per profile and never reads them while the window starts.
+``ProfileIndex.from_store`` loads (id, platform, name) for every profile
+in one query (the sidebar runs it on a worker thread with its own
+connection) and keeps the profiles in display order: grouped by platform
+in ``PLATFORMS`` order (other platforms after, by name), then by name.
+
+Search is by word. Each word of the query must match the profile name,
+normalized the way search.normalize does it:
+- Words of one or two letters match the start of a word of the name
+  ("ac" finds "Acme Shoes" but not "Peace"). Every one- and two-letter
+  word prefix has its own list of profiles.
+- Longer words match anywhere in the name ("sho" finds "acme_shoes").
+  They are looked up in a trigram index: only the profiles holding the
+  word's rarest trigram are checked with a substring test.
+
+While the user types, a query that only narrows the previous one (a
+longer word, or one more word) starts from the previous matches when
+they are fewer than the index would hand out.
+
+Pending post counts are not part of the index; ``pending_counts`` reads
+them for the profiles on screen, from idx_scheduled_posts_profile_at.
+"""
+
+import bisect
+import json
+import re
+from collections import defaultdict
+
+from socialsync.search import normalize
+from socialsync.store import PLATFORMS
+
+TOKEN = re.compile(r"[^\W_]+")
+# Query words shorter than this match word prefixes, longer ones substrings
+TRIGRAM = 3
+
+SQL_PROFILES = (
+    "SELECT pr.id, pl.name, pr.profile_name FROM profiles pr "
+    "JOIN platforms pl ON pl.id = pr.platform_id"
+)
+SQL_MAX_PROFILE = "SELECT MAX(id) FROM profiles"
+SQL_PENDING_COUNTS = (
+    "SELECT profile_id, COUNT(*) FROM scheduled_posts "
+    "WHERE profile_id IN (SELECT value FROM json_each(?)) AND status = 'pending' "
+    "GROUP BY profile_id"
+)
+
+
+def platform_order(platform):
+    # Known platforms in sidebar order, then the rest alphabetically
+    try:
+        return (PLATFORMS.index(platform), "")
+    except ValueError:
+        return (len(PLATFORMS), platform or "")
+
+
+def trigrams(text):
+    return {text[i:i + TRIGRAM] for i in range(len(text) - TRIGRAM + 1)}
+
+
+def narrows(old, new):
+    # True when every name matching the words ``new`` also matches ``old``
+    if not old or len(new) < len(old):
+        return False
+    for before, after in zip(old, new):
+        if not after.startswith(before):
+            return False
+        # A short word is a word prefix, a long one a substring: a prefix
+        # growing into a substring matches names the prefix did not
+        if after != before and len(before) < TRIGRAM <= len(after):
+            return False
+    return True
+
+
+def max_profile_id(store):
+    return store.conn.execute(SQL_MAX_PROFILE).fetchone()[0] or 0
+
+
+def pending_counts(store, profile_ids):
+    """{profile_id: pending posts} for the given profiles, 0 included."""
+    counts = dict.fromkeys(profile_ids, 0)
+    if counts:
+        counts.update(store.conn.execute(SQL_PENDING_COUNTS, (json.dumps(list(counts)),)))
+    return counts
+
+
+class GroupedRows:
+    """The sidebar rows for sorted positions, computed on access.
+
+    Row i is (platform, None) for a platform header or (platform,
+    position) for a profile. Only the start of each platform's run is
+    stored, so grouping 100 000 matches costs one bisect per platform.
+    """
+
+    def __init__(self, positions, segments):
+        self.positions = positions
+        self.segments = segments  # (first row, platform, first match, end of matches)
+        self.starts = [segment[0] for segment in segments]
+        self.total = segments[-1][0] + 1 + segments[-1][3] - segments[-1][2] if segments else 0
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(self.total))]
+        if not 0 <= row < self.total:
+            raise IndexError(row)
+        first, platform, lo, _ = self.segments[bisect.bisect_right(self.starts, row) - 1]
+        if row == first:
+            return (platform, None)
+        return (platform, self.positions[lo + row - first - 1])
+
+
+class ProfileIndex:
+    """Profiles in sidebar order, searchable by word prefix and substring.
+
+    Entries are addressed by position: ``ids[i]``, ``platforms[i]`` and
+    ``names[i]`` describe the i-th profile in display order, and search
+    results are sorted positions.
+    """
+
+    def __init__(self, profiles):
+        entries = sorted(
+            (platform_order(platform), normalize(name or ""), profile_id, platform, name or "")
+            for profile_id, platform, name in profiles
+        )
+        self.keys = [entry[1] for entry in entries]
+        self.ids = [entry[2] for entry in entries]
+        self.platforms = [entry[3] for entry in entries]
+        self.names = [entry[4] for entry in entries]
+        # " acme shoes uk": a word prefix is a substring after a space
+        self.spaced = [" " + " ".join(TOKEN.findall(key)) for key in self.keys]
+        self.max_id = max(self.ids, default=0)
+        self.everyone = range(len(self.ids))
+
+        # Each platform's profiles are one run of positions
+        self.runs = []  # (platform, first position)
+        for position, platform in enumerate(self.platforms):
+            if not self.runs or self.runs[-1][0] != platform:
+                self.runs.append((platform, position))
+
+        self.prefixes = defaultdict(list)  # 1-2 letter word prefix -> positions in order
+        self.postings = defaultdict(list)  # trigram -> positions in order
+        for position, (key, spaced) in enumerate(zip(self.keys, self.spaced)):
+            for prefix in {token[:size] for token in spaced.split() for size in range(1, TRIGRAM)}:
+                self.prefixes[prefix].append(position)
+            for gram in trigrams(key):
+                self.postings[gram].append(position)
+        self.last = ((), self.everyone)
+
+    @classmethod
+    def from_store(cls, store):
+        return cls(store.conn.execute(SQL_PROFILES).fetchall())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def candidates(self, word):
+        # Sorted positions that may match word; exact for a short word
+        if len(word) < TRIGRAM:
+            return self.prefixes.get(word, ())
+        return min((self.postings.get(gram, ()) for gram in trigrams(word)), key=len)
+
+    def matches(self, position, words):
+        for word in words:
+            if len(word) >= TRIGRAM:
+                if word not in self.keys[position]:
+                    return False
+            elif " " + word not in self.spaced[position]:
+                return False
+        return True
+
+    def search(self, query):
+        """Sorted positions of the profiles matching every word of query."""
+        words = tuple(TOKEN.findall(normalize(query)))
+        previous, found = self.last
+        if words == previous:
+            return found
+        if not words:
+            found = self.everyone
+        else:
+            # Start from the most selective word, or from the previous
+            # matches when there are fewer, and check the words left
+            pool = min((self.candidates(word) for word in words), key=len)
+            checks = words
+            if narrows(previous, words) and len(found) < len(pool):
+                pool = found
+                # Words the previous query already had are known to match
+                kept = 0
+                while kept < len(previous) and words[kept] == previous[kept]:
+                    kept += 1
+                checks = words[kept:]
+            elif len(words) == 1 and len(words[0]) < TRIGRAM:
+                checks = ()  # the prefix list is the answer
+            if checks:
+                pool = [position for position in pool if self.matches(position, checks)]
+            found = pool
+        self.last = (words, found)
+        return found
+
+    def grouped(self, positions, collapsed=()):
+        """GroupedRows for sorted positions, and the matches of each platform.
+
+        The profiles of platforms in ``collapsed`` are left out; their
+        header stays.
+        """
+        segments = []
+        counts = {}
+        row = 0
+        ends = [position for _, position in self.runs[1:]] + [len(self.ids)]
+        for (platform, start), end in zip(self.runs, ends):
+            lo = bisect.bisect_left(positions, start)
+            hi = bisect.bisect_left(positions, end, lo)
+            if hi == lo:
+                continue
+            counts[platform] = hi - lo
+            if platform in collapsed:
+                hi = lo
+            segments.append((row, platform, lo, hi))
+            row += 1 + hi - lo
+        return GroupedRows(positions, segments), counts
@@ -0,0 +1,330 @@
+"""Asyncio publishing engine with one pluggable adapter per platform.
+
+Each adapter owns a pool of keep-alive HTTP/1.1 connections and a
+semaphore that caps in-flight requests to its platform; the engine fans a
+post out to all of its platforms concurrently.
+"""
+
+import asyncio
+import json
+import ssl
+import threading
+import time
+from urllib.parse import urlsplit
+
+from socialsync.ratelimit import THROTTLE_STATUSES, RateLimited, parse_retry_after
+from socialsync.store import PLATFORMS
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body or b"null")
+
+
+class PublishResult:
+    def __init__(self, platform, ok, latency, status=None, error=None, response=None):
+        self.platform = platform
+        self.ok = ok
+        self.latency = latency
+        self.status = status
+        self.error = error
+        self.response = response
+
+    def __repr__(self):
+        state = "ok" if self.ok else f"failed: {self.error}"
+        return f"<PublishResult {self.platform} {state} {self.latency * 1000:.1f}ms>"
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to a single origin."""
+
+    def __init__(self, base_url, size=4, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self.prefix = parts.path.rstrip("/")
+        self.size = size
+        self.timeout = timeout
+        self.idle = []
+        self.opened = 0
+
+    async def open_connection(self):
+        context = ssl.create_default_context() if self.scheme == "https" else None
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=context),
+            self.timeout
+        )
+        self.opened += 1
+        return reader, writer
+
+    async def request(self, method, path, body=b"", headers=None):
+        # A reused connection may have been closed by the server while idle;
+        # retry once on a fresh connection in that case.
+        for attempt in range(2):
+            reused = bool(self.idle)
+            conn = self.idle.pop() if reused else await self.open_connection()
+            try:
+                response, keep_alive = await asyncio.wait_for(
+                    self.send(conn, method, path, body, headers or {}),
+                    self.timeout
+                )
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                conn[1].close()
+                if reused and attempt == 0:
+                    continue
+                raise HTTPError(str(e) or type(e).__name__) from e
+            except BaseException:
+                conn[1].close()
+                raise
+            if keep_alive and len(self.idle) < self.size:
+                self.idle.append(conn)
+            else:
+                conn[1].close()
+            return response
+
+    async def send(self, conn, method, path, body, headers):
+        reader, writer = conn
+        lines = [
+            f"{method} {self.prefix}{path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            f"Content-Length: {len(body)}",
+            "Connection: keep-alive",
+        ]
+        lines.extend(f"{k}: {v}" for k, v in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+        status_line = await reader.readuntil(b"\r\n")
+        status = int(status_line.split(b" ", 2)[1])
+        response_headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readuntil(b"\r\n")
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b"".join(chunks)
+        else:
+            data = await reader.readexactly(int(response_headers.get("content-length", 0)))
+
+        keep_alive = response_headers.get("connection", "").lower() != "close"
+        return Response(status, response_headers, data), keep_alive
+
+    async def close(self):
+        while self.idle:
+            self.idle.pop()[1].close()
+
+
+class PlatformAdapter:
+    """Base adapter: posts a JSON payload to ``path`` on the platform API."""
+
+    name = None
+    path = "/posts"
+
+    def __init__(self, base_url, concurrency=4, timeout=30.0, token=None):
+        self.base_url = base_url
+        self.token = token
+        self.concurrency = concurrency
+        self.pool = ConnectionPool(base_url, size=concurrency, timeout=timeout)
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    def build_payload(self, post):
+        return {
+            "caption": post.get("caption") or "",
+            "hashtags": post.get("hashtags") or "",
+            "media_path": post.get("media_path"),
+            "profile": post.get("profile_name"),
+        }
+
+    def headers(self):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    def check(self, response):
+        if response.status >= 400:
+            raise HTTPError(f"{self.name} returned HTTP {response.status}")
+
+    async def publish(self, post):
+        body = json.dumps(self.build_payload(post)).encode("utf-8")
+        headers = self.headers()
+        if post.get("idempotency_key"):
+            # Lets the platform recognize a retry of a post it already has
+            headers["Idempotency-Key"] = post["idempotency_key"]
+        async with self.semaphore:
+            started = time.perf_counter()
+            response = None
+            try:
+                response = await self.pool.request("POST", self.path, body, headers)
+                self.check(response)
+            except (HTTPError, OSError, asyncio.TimeoutError) as e:
+                return PublishResult(
+                    self.name, False, time.perf_counter() - started,
+                    status=response.status if response else None,
+                    error=str(e) or type(e).__name__,
+                    response=response
+                )
+            return PublishResult(
+                self.name, True, time.perf_counter() - started,
+                status=response.status, response=response
+            )
+
+    async def close(self):
+        await self.pool.close()
+
+
+class FacebookAdapter(PlatformAdapter):
+    name = "Facebook"
+    path = "/facebook/feed"
+
+
+class TwitterAdapter(PlatformAdapter):
+    name = "Twitter"
+    path = "/twitter/tweets"
+
+    def build_payload(self, post):
+        text = " ".join(filter(None, [post.get("caption"), post.get("hashtags")]))
+        return {"text": text, "media_path": post.get("media_path")}
+
+
+class InstagramAdapter(PlatformAdapter):
+    name = "Instagram"
+    path = "/instagram/media"
+
+
+class LinkedInAdapter(PlatformAdapter):
+    name = "LinkedIn"
+    path = "/linkedin/shares"
+
+
+class TikTokAdapter(PlatformAdapter):
+    name = "TikTok"
+    path = "/tiktok/videos"
+
+
+class YouTubeAdapter(PlatformAdapter):
+    name = "YouTube"
+    path = "/youtube/videos"
+
+
+class PinterestAdapter(PlatformAdapter):
+    name = "Pinterest"
+    path = "/pinterest/pins"
+
+
+class SnapchatAdapter(PlatformAdapter):
+    name = "Snapchat"
+    path = "/snapchat/stories"
+
+
+class RedNoteAdapter(PlatformAdapter):
+    name = "RedNote"
+    path = "/rednote/notes"
+
+
+class Lemon8Adapter(PlatformAdapter):
+    name = "Lemon8"
+    path = "/lemon8/posts"
+
+
+ADAPTERS = {
+    cls.name: cls for cls in (
+        FacebookAdapter, TwitterAdapter, InstagramAdapter, LinkedInAdapter,
+        TikTokAdapter, YouTubeAdapter, PinterestAdapter, SnapchatAdapter,
+        RedNoteAdapter, Lemon8Adapter
+    )
+}
+
+
+def register_adapter(cls):
+    ADAPTERS[cls.name] = cls
+    return cls
+
+
+class PublishEngine:
+    def __init__(self, adapters):
+        self.adapters = {adapter.name: adapter for adapter in adapters}
+
+    @classmethod
+    def from_base_url(cls, base_url, platforms=None, concurrency=4, timeout=30.0):
+        return cls([
+            ADAPTERS[name](base_url, concurrency=concurrency, timeout=timeout)
+            for name in (platforms or PLATFORMS)
+        ])
+
+    async def publish(self, post, platforms=None):
+        # Fan one post out to every target platform at once.
+        platforms = platforms or post.get("platforms") or [post["platform"]]
+        results = await asyncio.gather(*(
+            self.publish_to(name, post) for name in platforms
+        ))
+        return list(results)
+
+    async def publish_to(self, name, post):
+        adapter = self.adapters.get(name)
+        if adapter is None:
+            return PublishResult(name, False, 0.0, error="no adapter for platform")
+        return await adapter.publish(post)
+
+    async def publish_many(self, posts, platforms=None):
+        return await asyncio.gather(*(self.publish(post, platforms) for post in posts))
+
+    async def close(self):
+        for adapter in self.adapters.values():
+            await adapter.close()
+
+
+class AsyncPublisher:
+    """Blocking ``publish(post)`` front end for the dispatcher.
+
+    Runs a PublishEngine on a private event loop thread so the dispatcher's
+    worker threads can share its pools.
+    """
+
+    def __init__(self, base_url, concurrency=4, timeout=30.0):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.engine = self.call(self.make_engine(base_url, concurrency, timeout))
+
+    async def make_engine(self, base_url, concurrency, timeout):
+        return PublishEngine.from_base_url(base_url, concurrency=concurrency, timeout=timeout)
+
+    def call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def publish(self, post):
+        result = self.call(self.engine.publish(post))[0]
+        if result.status in THROTTLE_STATUSES:
+            raise RateLimited(result.error, retry_after=parse_retry_after(
+                result.response.headers.get("retry-after")
+            ))
+        if not result.ok:
+            raise HTTPError(result.error)
+        return result
+
+    def close(self):
+        self.call(self.engine.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
@@ -0,0 +1,207 @@
+"""Per (platform, profile) pacing for the publishing path.
+
+Each key gets a token bucket refilled at the platform's configured rate.
+When a platform pushes back (429/503) the key is blocked for a jittered
+exponential backoff that never undercuts the server's Retry-After.
+SharedRateLimiter keeps the same state in the SQLite file so several
+dispatcher processes spend one budget.
+"""
+
+import random
+import sqlite3
+import time
+from email.utils import parsedate_to_datetime
+
+# (posts, per seconds); the bucket holds at most ``posts`` tokens.
+DEFAULT_LIMITS = {
+    "Twitter": (300, 3 * 3600),
+    "Instagram": (50, 24 * 3600),
+    "Facebook": (200, 3600),
+    "LinkedIn": (150, 24 * 3600),
+    "TikTok": (20, 24 * 3600),
+}
+FALLBACK_LIMIT = (60, 3600)
+
+THROTTLE_STATUSES = (429, 503)
+
+
+class RateLimited(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value, now=None):
+    # Retry-After is either delta-seconds or an HTTP date.
+    if value is None:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (now or time.time()))
+
+
+def parse_limit(spec):
+    # "Twitter=300/10800" -> ("Twitter", (300, 10800))
+    platform, _, rate = spec.partition("=")
+    posts, _, seconds = rate.partition("/")
+    if not platform or not posts or not seconds:
+        raise ValueError(f"Invalid rate limit {spec!r}, expected PLATFORM=POSTS/SECONDS")
+    return platform, (int(posts), float(seconds))
+
+
+class Backoff:
+    def __init__(self, base=1.0, cap=900.0, rng=None):
+        self.base = base
+        self.cap = cap
+        self.random = rng or random.Random()
+
+    def delay(self, failures, retry_after=None):
+        # Full jitter over the exponential window, floored at Retry-After.
+        window = min(self.cap, self.base * (2 ** max(0, failures - 1)))
+        delay = self.random.uniform(window / 2, window)
+        if retry_after is not None:
+            delay = max(delay, retry_after + self.random.uniform(0, self.base))
+        return delay
+
+
+class BucketState:
+    def __init__(self, tokens, updated, blocked_until=0.0, failures=0):
+        self.tokens = tokens
+        self.updated = updated
+        self.blocked_until = blocked_until
+        self.failures = failures
+
+
+class RateLimiter:
+    def __init__(self, limits=None, fallback=FALLBACK_LIMIT, backoff=None):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.fallback = fallback
+        self.backoff = backoff or Backoff()
+        self.buckets = {}
+
+    def limit_for(self, platform):
+        posts, seconds = self.limits.get(platform, self.fallback)
+        return posts / seconds, float(posts)
+
+    # State access; SharedRateLimiter stores these rows in SQLite instead.
+
+    def load(self, platform, profile, now):
+        state = self.buckets.get((platform, profile))
+        if state is None:
+            _, capacity = self.limit_for(platform)
+            state = BucketState(capacity, now)
+        return state
+
+    def save(self, platform, profile, state):
+        self.buckets[(platform, profile)] = state
+
+    def transaction(self):
+        return _NullTransaction()
+
+    # Public API
+
+    def acquire(self, platform, profile, now=None):
+        """Take one token; return 0 on success or the seconds to wait."""
+        now = now or time.time()
+        with self.transaction():
+            state = self.load(platform, profile, now)
+            if state.blocked_until > now:
+                return state.blocked_until - now
+            rate, capacity = self.limit_for(platform)
+            state.tokens = min(capacity, state.tokens + (now - state.updated) * rate)
+            state.updated = now
+            if state.tokens >= 1:
+                state.tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - state.tokens) / rate
+            self.save(platform, profile, state)
+            return wait
+
+    def report(self, platform, profile, ok, retry_after=None, now=None):
+        """Feed back a publish outcome; throttled responses block the key."""
+        now = now or time.time()
+        with self.transaction():
+            state = self.load(platform, profile, now)
+            if ok:
+                state.failures = 0
+                state.blocked_until = 0.0
+            else:
+                state.failures += 1
+                state.blocked_until = now + self.backoff.delay(state.failures, retry_after)
+            self.save(platform, profile, state)
+            return max(0.0, state.blocked_until - now)
+
+
+class _NullTransaction:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class SharedRateLimiter(RateLimiter):
+    """RateLimiter whose buckets live in a ``rate_limits`` table."""
+
+    def __init__(self, path, limits=None, fallback=FALLBACK_LIMIT, backoff=None):
+        super().__init__(limits, fallback, backoff)
+        self.conn = sqlite3.connect(path, isolation_level=None, timeout=30.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                platform TEXT,
+                profile TEXT,
+                tokens REAL,
+                updated REAL,
+                blocked_until REAL,
+                failures INTEGER,
+                PRIMARY KEY (platform, profile)
+            )
+        """)
+
+    def transaction(self):
+        return _ImmediateTransaction(self.conn)
+
+    def load(self, platform, profile, now):
+        row = self.conn.execute(
+            "SELECT tokens, updated, blocked_until, failures FROM rate_limits "
+            "WHERE platform = ? AND profile = ?",
+            (platform, str(profile))
+        ).fetchone()
+        if row is None:
+            _, capacity = self.limit_for(platform)
+            return BucketState(capacity, now)
+        return BucketState(*row)
+
+    def save(self, platform, profile, state):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO rate_limits "
+            "(platform, profile, tokens, updated, blocked_until, failures) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (platform, str(profile), state.tokens, state.updated,
+             state.blocked_until, state.failures)
+        )
+
+    def close(self):
+        self.conn.close()
+
+
+class _ImmediateTransaction:
+    # BEGIN IMMEDIATE takes the write lock up front so two processes can
+    # not both read the same token count and spend it twice.
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
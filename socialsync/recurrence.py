@@ -0,0 +1,360 @@
+"""Recurring schedules stored as RRULEs and expanded lazily.
+
+A rule is stored once in ``recurring_rules``. The calendar expands only
+the occurrences of the month it shows; the dispatcher materializes only
+each rule's next occurrence into scheduled_posts (tracked by the indexed
+``next_run`` column). Single occurrences can be skipped or overridden
+through ``rule_exceptions``.
+
+Rules repeat on the wall clock of their profile's time zone: a daily 9 AM
+post stays at 9 AM across DST changes.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+from dateutil.rrule import DAILY, HOURLY, MONTHLY, WEEKLY, YEARLY, rrulestr
+
+from socialsync.store import format_datetime, month_bounds
+from socialsync.timezones import epoch_seconds
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recurring_rules (
+    id INTEGER PRIMARY KEY,
+    profile_id INTEGER,
+    content_type TEXT,
+    media_path TEXT,
+    caption TEXT,
+    hashtags TEXT,
+    dtstart DATETIME,
+    rrule TEXT,
+    next_run DATETIME,
+    active INTEGER DEFAULT 1,
+    added_date DATETIME,
+    FOREIGN KEY (profile_id) REFERENCES profiles (id)
+);
+CREATE INDEX IF NOT EXISTS idx_recurring_rules_next_run
+    ON recurring_rules (active, next_run);
+CREATE TABLE IF NOT EXISTS rule_exceptions (
+    rule_id INTEGER,
+    occurrence DATETIME,
+    action TEXT,
+    schedule_date DATETIME,
+    caption TEXT,
+    media_path TEXT,
+    PRIMARY KEY (rule_id, occurrence),
+    FOREIGN KEY (rule_id) REFERENCES recurring_rules (id)
+);
+CREATE INDEX IF NOT EXISTS idx_rule_exceptions_date
+    ON rule_exceptions (schedule_date);
+"""
+
+ALLOWED_FREQUENCIES = (YEARLY, MONTHLY, WEEKLY, DAILY, HOURLY)
+
+# Presets offered by the schedule dialog
+PRESETS = {
+    "Does not repeat": None,
+    "Daily": "FREQ=DAILY",
+    "Weekdays": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "Weekly": "FREQ=WEEKLY",
+    "Every Tue/Thu": "FREQ=WEEKLY;BYDAY=TU,TH",
+    "Monthly": "FREQ=MONTHLY",
+}
+
+# Occurrences missed by more than this (e.g. dispatcher was down) are
+# skipped instead of being posted late.
+MISSED_GRACE = timedelta(hours=1)
+
+RULE_COLUMNS = (
+    "r.id, r.profile_id, r.content_type, r.media_path, r.caption, r.hashtags, "
+    "r.dtstart, r.rrule, r.next_run, pr.profile_name, pl.name AS platform"
+)
+RULE_FROM = (
+    "FROM recurring_rules r "
+    "LEFT JOIN profiles pr ON pr.id = r.profile_id "
+    "LEFT JOIN platforms pl ON pl.id = pr.platform_id "
+)
+SQL_INSERT_RULE = (
+    "INSERT INTO recurring_rules (profile_id, content_type, media_path, caption, "
+    "hashtags, dtstart, rrule, next_run, added_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_RULES_IN_RANGE = "SELECT " + RULE_COLUMNS + " " + RULE_FROM + "WHERE r.active = 1 AND r.dtstart < ?"
+SQL_PROFILE_RULES_IN_RANGE = SQL_RULES_IN_RANGE + " AND r.profile_id = ?"
+SQL_RULES_DUE = (
+    "SELECT " + RULE_COLUMNS + " " + RULE_FROM +
+    "WHERE r.active = 1 AND r.next_run <= ? ORDER BY r.next_run"
+)
+SQL_GET_RULE = "SELECT " + RULE_COLUMNS + " " + RULE_FROM + "WHERE r.id = ?"
+SQL_SET_NEXT_RUN = "UPDATE recurring_rules SET next_run = ? WHERE id = ?"
+SQL_EXCEPTIONS_IN_RANGE = (
+    "SELECT rule_id, occurrence, action, schedule_date, caption, media_path "
+    "FROM rule_exceptions WHERE (occurrence >= ? AND occurrence < ?) "
+    "OR (schedule_date >= ? AND schedule_date < ?)"
+)
+SQL_GET_EXCEPTION = (
+    "SELECT action, schedule_date, caption, media_path FROM rule_exceptions "
+    "WHERE rule_id = ? AND occurrence = ?"
+)
+SQL_PUT_EXCEPTION = (
+    "INSERT OR REPLACE INTO rule_exceptions "
+    "(rule_id, occurrence, action, schedule_date, caption, media_path) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+SQL_MATERIALIZE = (
+    "INSERT OR IGNORE INTO scheduled_posts (profile_id, content_type, media_path, "
+    "caption, hashtags, schedule_date, schedule_at, status, rule_id, occurrence) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?)"
+)
+
+
+def parse_rule(rule_text, dtstart):
+    rule_text = rule_text.strip()
+    if not rule_text.upper().startswith("RRULE:"):
+        rule_text = "RRULE:" + rule_text
+    try:
+        rule = rrulestr(rule_text, dtstart=dtstart)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid repeat rule {rule_text[6:]!r}: {e}") from None
+    if rule._freq not in ALLOWED_FREQUENCIES:
+        raise ValueError("Rules may repeat at most hourly")
+    return rule
+
+
+class RuleExpander:
+    """Occurrence queries that do not walk the rule from its dtstart.
+
+    dateutil iterates every occurrence from dtstart, so a daily rule that
+    started years ago would cost thousands of steps per month rendered.
+    When it is safe, queries re-anchor dtstart on the last whole period
+    (``interval`` days, weeks, months...) before the window instead, which
+    yields exactly the same occurrences from that point on. Rules with a
+    COUNT have to be walked from the start, but are bounded by it.
+    """
+
+    def __init__(self, rule_text, dtstart):
+        self.rule = parse_rule(rule_text, dtstart)
+        self.dtstart = dtstart
+        interval = self.rule._interval
+        freq = self.rule._freq
+        self.step = None
+        if self.rule._count is None:
+            if freq == HOURLY:
+                self.step = timedelta(hours=interval)
+            elif freq == DAILY:
+                self.step = timedelta(days=interval)
+            elif freq == WEEKLY:
+                self.step = timedelta(weeks=interval)
+            elif dtstart.day <= 28:
+                # Month lengths vary; days past the 28th would be clamped
+                self.step = relativedelta(months=interval if freq == MONTHLY else 12 * interval)
+
+    def anchored(self, moment):
+        if self.step is None or moment <= self.dtstart:
+            return self.rule
+        if isinstance(self.step, timedelta):
+            periods = (moment - self.dtstart) // self.step
+            start = self.dtstart + periods * self.step
+        else:
+            months = (moment.year - self.dtstart.year) * 12 + moment.month - self.dtstart.month
+            step = self.step.months + 12 * self.step.years
+            start = self.dtstart + relativedelta(months=months // step * step)
+            if start > moment:
+                start -= self.step
+        return self.rule.replace(dtstart=start)
+
+    def between(self, start, end):
+        # Occurrences in [start, end)
+        return [when for when in self.anchored(start).between(start, end, inc=True) if when < end]
+
+    def after(self, moment, inclusive=False):
+        return self.anchored(moment).after(moment, inc=inclusive)
+
+
+class RecurrenceRules:
+    def __init__(self, store):
+        self.store = store
+        self.conn = store.conn
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.expanders = {}
+
+    def expander(self, rule):
+        key = (rule["rrule"], rule["dtstart"])
+        cached = self.expanders.get(rule["id"])
+        if cached is None or cached[0] != key:
+            cached = (key, RuleExpander(rule["rrule"], datetime.fromisoformat(rule["dtstart"])))
+            self.expanders[rule["id"]] = cached
+        return cached[1]
+
+    # Rules
+
+    def add_rule(self, profile_id, dtstart, rule_text, caption="", hashtags="",
+                 media_path=None, content_type="text"):
+        dtstart = dtstart.replace(microsecond=0)
+        first = RuleExpander(rule_text, dtstart).after(dtstart, inclusive=True)
+        with self.conn:
+            cur = self.conn.execute(SQL_INSERT_RULE, (
+                profile_id, content_type, media_path, caption, hashtags,
+                format_datetime(dtstart), rule_text, format_datetime(first),
+                format_datetime(datetime.now())
+            ))
+        return cur.lastrowid
+
+    def get_rule(self, rule_id):
+        return self.conn.execute(SQL_GET_RULE, (rule_id,)).fetchone()
+
+    def delete_rule(self, rule_id):
+        # Also drops occurrences that were materialized but not yet sent
+        with self.conn:
+            self.conn.execute("UPDATE recurring_rules SET active = 0, next_run = NULL WHERE id = ?", (rule_id,))
+            self.conn.execute(
+                "DELETE FROM scheduled_posts WHERE rule_id = ? AND status = 'pending'", (rule_id,)
+            )
+        self.expanders.pop(rule_id, None)
+
+    # Exceptions
+
+    def skip(self, rule_id, occurrence):
+        with self.conn:
+            self.conn.execute(SQL_PUT_EXCEPTION, (
+                rule_id, format_datetime(occurrence), "skip", None, None, None
+            ))
+            self.conn.execute(
+                "DELETE FROM scheduled_posts WHERE rule_id = ? AND occurrence = ? "
+                "AND status = 'pending'", (rule_id, format_datetime(occurrence))
+            )
+
+    def override(self, rule_id, occurrence, schedule_date=None, caption=None, media_path=None):
+        rule = self.get_rule(rule_id)
+        schedule_date, schedule_at = self.store.resolve(rule["profile_id"], schedule_date or occurrence)
+        with self.conn:
+            self.conn.execute(SQL_PUT_EXCEPTION, (
+                rule_id, format_datetime(occurrence), "override",
+                schedule_date, caption, media_path
+            ))
+            self.conn.execute(
+                "UPDATE scheduled_posts SET schedule_date = ?, schedule_at = ?, "
+                "caption = COALESCE(?, caption), media_path = COALESCE(?, media_path) "
+                "WHERE rule_id = ? AND occurrence = ? AND status = 'pending'",
+                (schedule_date, schedule_at, caption, media_path,
+                 rule_id, format_datetime(occurrence))
+            )
+
+    # Calendar expansion
+
+    def occurrences_between(self, start, end, profile_id=None):
+        """Virtual posts for every rule occurrence in [start, end), of one
+        profile's rules if profile_id is given."""
+        bounds = (format_datetime(start), format_datetime(end))
+        exceptions = {}
+        moved_in = []
+        for row in self.conn.execute(SQL_EXCEPTIONS_IN_RANGE, bounds + bounds):
+            occurrence = datetime.fromisoformat(row["occurrence"])
+            exceptions[(row["rule_id"], occurrence)] = row
+            if start > occurrence or occurrence >= end:
+                moved_in.append((row["rule_id"], occurrence))
+
+        posts = []
+        rules = {}
+        if profile_id is None:
+            rule_rows = self.conn.execute(SQL_RULES_IN_RANGE, (bounds[1],))
+        else:
+            rule_rows = self.conn.execute(SQL_PROFILE_RULES_IN_RANGE, (bounds[1], profile_id))
+        for rule in rule_rows:
+            rules[rule["id"]] = rule
+            for occurrence in self.expander(rule).between(start, end):
+                post = self.make_post(rule, occurrence, exceptions.get((rule["id"], occurrence)))
+                if post is not None and start <= post["when"] < end:
+                    posts.append(post)
+        # Overrides that move an occurrence from another month into this one
+        for rule_id, occurrence in moved_in:
+            rule = rules.get(rule_id)
+            if rule is not None:
+                post = self.make_post(rule, occurrence, exceptions[(rule_id, occurrence)])
+                if post is not None:
+                    posts.append(post)
+        return posts
+
+    def occurrences_in_month(self, year, month):
+        return self.occurrences_between(*month_bounds(year, month))
+
+    @staticmethod
+    def make_post(rule, occurrence, exception=None):
+        # isoformat(" ") matches DATE_FORMAT for whole seconds and is much
+        # cheaper than strftime, which matters for busy months.
+        key = occurrence.isoformat(" ")
+        when = occurrence
+        schedule_date = key
+        caption = rule["caption"]
+        media_path = rule["media_path"]
+        if exception is not None:
+            if exception["action"] == "skip":
+                return None
+            schedule_date = exception["schedule_date"]
+            when = datetime.fromisoformat(schedule_date)
+            caption = exception["caption"] if exception["caption"] is not None else caption
+            media_path = exception["media_path"] or media_path
+        return {
+            "id": f"rule{rule['id']}@{key}",
+            "rule_id": rule["id"],
+            "occurrence": key,
+            "profile_id": rule["profile_id"],
+            "profile_name": rule["profile_name"],
+            "platform": rule["platform"],
+            "content_type": rule["content_type"],
+            "media_path": media_path,
+            "caption": caption,
+            "hashtags": rule["hashtags"],
+            "schedule_date": schedule_date,
+            "status": "recurring",
+            "last_run": None,
+            "when": when,
+        }
+
+    # Dispatch
+
+    def materialize(self, horizon, now=None):
+        """Insert the next occurrence of every rule due before ``horizon``.
+
+        ``horizon`` and ``now`` are datetimes (naive means system time) or
+        epoch seconds; each rule compares them in its profile's zone.
+        """
+        horizon_at = epoch_seconds(horizon)
+        now_at = epoch_seconds(now or time.time())
+        created = 0
+        # next_run is a wall time, so first take every rule that could be
+        # due in any zone that is in use
+        latest = max(zone.to_local(horizon_at) for zone in self.store.zones_in_use())
+        rules = self.conn.execute(SQL_RULES_DUE, (format_datetime(latest),)).fetchall()
+        with self.conn:
+            for rule in rules:
+                zone = self.store.zone_for(rule["profile_id"])
+                horizon, now = zone.to_local(horizon_at), zone.to_local(now_at)
+                occurrence = datetime.fromisoformat(rule["next_run"])
+                if occurrence > horizon:
+                    continue
+                expander = self.expander(rule)
+                if occurrence < now - MISSED_GRACE:
+                    # Jump over a long outage instead of stepping through it
+                    occurrence = expander.after(now - MISSED_GRACE, inclusive=True)
+                while occurrence is not None and occurrence <= horizon:
+                    if occurrence >= now - MISSED_GRACE:
+                        created += self.materialize_one(rule, occurrence)
+                    occurrence = expander.after(occurrence)
+                self.conn.execute(SQL_SET_NEXT_RUN, (format_datetime(occurrence), rule["id"]))
+        return created
+
+    def materialize_one(self, rule, occurrence):
+        exception = self.conn.execute(
+            SQL_GET_EXCEPTION, (rule["id"], format_datetime(occurrence))
+        ).fetchone()
+        post = self.make_post(rule, occurrence, exception)
+        if post is None:
+            return 0
+        schedule_date, schedule_at = self.store.resolve(rule["profile_id"], post["when"])
+        cur = self.conn.execute(SQL_MATERIALIZE, (
+            rule["profile_id"], rule["content_type"], post["media_path"], post["caption"],
+            rule["hashtags"], schedule_date, schedule_at, rule["id"], post["occurrence"]
+        ))
+        return cur.rowcount
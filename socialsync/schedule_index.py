@@ -0,0 +1,231 @@
+"""In-memory schedule index bucketed by (year, month).
+
+Months are loaded from the store the first time they are looked at and
+then kept current incrementally as posts are added, edited and deleted.
+A month loads as per-day, per-platform counts (store.day_platform_counts),
+which is all the calendar cells show; the posts of a day are read only
+when they are asked for. Recurring rules are expanded per month as it
+loads, so a rule shows up on every visible occurrence without its future
+posts ever being written out.
+
+Days and times are in the store's display zone: a post's ``when`` comes
+from its schedule_at instant, not from the profile's wall time.
+"""
+
+from datetime import date, datetime, timedelta
+
+from socialsync.store import month_bounds
+
+# Profile zones are within this of the display zone, so expanding rules
+# this much beyond the month catches every occurrence that lands in it
+ZONE_MARGIN = timedelta(days=2)
+
+
+def to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class MonthBucket:
+    def __init__(self, year, month):
+        self.year = year
+        self.month = month
+        self.posts = {}            # date -> {post_id: post}, for loaded days only
+        self.day_counts = {}       # date -> int
+        self.platform_counts = {}  # date -> {platform: int}
+        self.occurrences = {}      # date -> rule occurrences without a post row
+        self.sorted = {}           # date -> posts in time order, built on demand
+
+    def count(self, day, platform, delta):
+        counts = self.platform_counts.setdefault(day, {})
+        counts[platform] = counts.get(platform, 0) + delta
+        self.day_counts[day] = self.day_counts.get(day, 0) + delta
+        if not counts[platform]:
+            del counts[platform]
+        if not self.day_counts[day]:
+            del self.day_counts[day]
+            del self.platform_counts[day]
+
+    def add(self, post):
+        day = post["when"].date()
+        self.count(day, post["platform"], 1)
+        day_posts = self.posts.get(day)
+        if day_posts is not None:
+            day_posts[post["id"]] = post
+            self.sorted.pop(day, None)
+
+    def remove(self, post):
+        day = post["when"].date()
+        day_posts = self.posts.get(day)
+        if day_posts is not None:
+            if day_posts.pop(post["id"], None) is None:
+                return
+            self.sorted.pop(day, None)
+        self.count(day, post["platform"], -1)
+
+
+class ScheduleIndex:
+    """Schedule lookups by ``date`` backed by a ScheduleStore."""
+
+    def __init__(self, store, rules=None):
+        self.store = store
+        self.rules = rules
+        self.buckets = {}   # (year, month) -> MonthBucket
+        self.locations = {}  # post_id -> post, for loaded months only
+
+    def make_post(self, row):
+        post = dict(row)
+        if post["schedule_at"] is not None:
+            post["when"] = self.store.display_zone.to_local(post["schedule_at"])
+        else:
+            post["when"] = to_datetime(post["schedule_date"])
+        return post
+
+    def display_time(self, post):
+        # Rule occurrences are wall times of their profile's zone
+        zone = self.store.zone_for(post["profile_id"])
+        if zone is self.store.display_zone:
+            return post["when"]
+        return self.store.display_zone.to_local(zone.to_epoch(post["when"])[0])
+
+    # Lookups
+
+    def month(self, year, month):
+        bucket = self.buckets.get((year, month))
+        if bucket is None:
+            bucket = self.load_month(year, month)
+        return bucket
+
+    def load_month(self, year, month):
+        bucket = MonthBucket(year, month)
+        for day, platform, count in self.store.day_platform_counts(year, month):
+            bucket.count(date.fromisoformat(day), platform, count)
+        if self.rules is not None:
+            start, end = month_bounds(year, month)
+            margin = ZONE_MARGIN if len(self.store.zones_in_use()) > 1 else timedelta(0)
+            occurrences = self.rules.occurrences_between(start - margin, end + margin)
+            first, last = self.store.month_range(year, month)
+            materialized = self.store.materialized_occurrences(
+                [(post["rule_id"], post["occurrence"]) for post in occurrences],
+                first - margin.total_seconds(), last + margin.total_seconds()
+            )
+            for post in occurrences:
+                if (post["rule_id"], post["occurrence"]) in materialized:
+                    continue
+                post["when"] = self.display_time(post)
+                if start <= post["when"] < end:
+                    bucket.occurrences.setdefault(post["when"].date(), []).append(post)
+                    bucket.add(post)
+        self.buckets[(year, month)] = bucket
+        return bucket
+
+    def load_day(self, bucket, day):
+        day_posts = {}
+        if day in bucket.day_counts:
+            for row in self.store.posts_on_day(day):
+                post = self.make_post(row)
+                day_posts[post["id"]] = post
+                self.locations[post["id"]] = post
+            for post in bucket.occurrences.get(day, ()):
+                day_posts[post["id"]] = post
+        bucket.posts[day] = day_posts
+        return day_posts
+
+    def posts_on(self, day):
+        """The day's posts by time. The list is shared until the day changes:
+        callers must not modify it, and can compare it by identity."""
+        bucket = self.month(day.year, day.month)
+        posts = bucket.sorted.get(day)
+        if posts is None:
+            day_posts = bucket.posts.get(day)
+            if day_posts is None:
+                day_posts = self.load_day(bucket, day)
+            posts = bucket.sorted[day] = sorted(
+                day_posts.values(), key=lambda post: (post["when"], str(post["id"]))
+            )
+        return posts
+
+    def count(self, day):
+        return self.month(day.year, day.month).day_counts.get(day, 0)
+
+    def platform_counts(self, day):
+        return self.month(day.year, day.month).platform_counts.get(day, {})
+
+    # Incremental updates; writes go to the store first
+
+    def add_post(self, profile_id, schedule_date, **fields):
+        post_id = self.store.add_post(profile_id, schedule_date, **fields)
+        self.track(post_id)
+        return post_id
+
+    def update_post(self, post_id, **fields):
+        post = self.locate(post_id)
+        self.store.update_post(post_id, **fields)
+        self.untrack(post)
+        self.track(post_id)
+
+    def delete_post(self, post_id):
+        post = self.locate(post_id)
+        self.store.delete_post(post_id)
+        self.untrack(post)
+
+    # Recurring rules touch many months, so loaded months are simply
+    # reloaded on next access.
+
+    def add_rule(self, profile_id, dtstart, rule_text, **fields):
+        rule_id = self.rules.add_rule(profile_id, dtstart, rule_text, **fields)
+        self.invalidate()
+        return rule_id
+
+    def delete_rule(self, rule_id):
+        self.rules.delete_rule(rule_id)
+        self.invalidate()
+
+    def skip_occurrence(self, rule_id, occurrence):
+        self.rules.skip(rule_id, occurrence)
+        self.invalidate()
+
+    def override_occurrence(self, rule_id, occurrence, **fields):
+        self.rules.override(rule_id, occurrence, **fields)
+        self.invalidate()
+
+    def locate(self, post_id):
+        # The post as it is counted, read from the store if its day is not loaded
+        post = self.locations.get(post_id)
+        if post is None:
+            row = self.store.get_post(post_id)
+            if row is not None:
+                post = self.make_post(row)
+        return post
+
+    def track(self, post_id):
+        row = self.store.get_post(post_id)
+        if row is None:
+            return
+        post = self.make_post(row)
+        bucket = self.buckets.get((post["when"].year, post["when"].month))
+        if bucket is not None:
+            bucket.add(post)
+            if post["when"].date() in bucket.posts:
+                self.locations[post_id] = post
+
+    def untrack(self, post):
+        if post is None:
+            return
+        self.locations.pop(post["id"], None)
+        bucket = self.buckets.get((post["when"].year, post["when"].month))
+        if bucket is not None:
+            bucket.remove(post)
+
+    def invalidate(self, year=None, month=None):
+        # Drop cached months (all of them by default) so they reload lazily,
+        # e.g. after another process wrote to the database.
+        keys = list(self.buckets) if year is None else [(year, month)]
+        for key in keys:
+            bucket = self.buckets.pop(key, None)
+            if bucket is None:
+                continue
+            for day_posts in bucket.posts.values():
+                for post_id in day_posts:
+                    self.locations.pop(post_id, None)
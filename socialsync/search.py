@@ -0,0 +1,343 @@
+"""Full-text and hashtag search over scheduled posts.
+
+``posts_fts`` is an FTS5 external-content table over scheduled_posts
+(caption, hashtags) and ``post_tags`` holds one row per (post, tag) with a
+(tag, schedule_date) index. Triggers on scheduled_posts keep both in
+sync, so every writer (GUI, importer, dispatcher, other processes) stays
+consistent without calling into this module. The triggers use only
+SQLite's own functions, whose lower() folds ASCII letters alone: posts
+whose tags may hold other letters are queued in ``post_tags_queue``, and
+``PostSearch.fold`` re-tags them with ``normalize`` before tags are
+searched.
+"""
+
+import re
+import time
+import unicodedata
+
+from socialsync.store import POST_COLUMNS, format_datetime
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    caption, hashtags,
+    content='scheduled_posts', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3 4'
+);
+CREATE TABLE IF NOT EXISTS post_tags (
+    post_id INTEGER,
+    tag TEXT,
+    schedule_date DATETIME,
+    PRIMARY KEY (post_id, tag)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_post_tags_tag_date
+    ON post_tags (tag, schedule_date);
+CREATE TABLE IF NOT EXISTS post_tags_queue (
+    post_id INTEGER PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+
+def split_words(column, only_if=None):
+    # SQL expression turning a text column into a JSON array of lowercased
+    # words. Triggers may not use WITH, so json_each does the splitting.
+    escaped = f"replace(replace(lower(COALESCE({column}, '')), '\\', '\\\\'), '\"', '\\\"')"
+    for separator in ("','", "char(9)", "char(10)", "char(13)"):
+        escaped = f"replace({escaped}, {separator}, ' ')"
+    array = f"""'["' || replace({escaped}, ' ', '","') || '"]'"""
+    # Other control characters would make the array invalid JSON; such rows
+    # get no tags rather than failing the write.
+    check = f"json_valid({array})"
+    if only_if:
+        check = f"{only_if} AND {check}"
+    return f"CASE WHEN {check} THEN {array} ELSE '[]' END"
+
+
+CAPTION_TAG = "rtrim(ltrim(value, '#'), '.,!?;:)')"
+
+
+def tag_inserts(row, source=""):
+    # Statements adding a post_tags row for every word in hashtags and every
+    # #word in the caption of ``row``: NEW inside triggers, or an alias
+    # declared in ``source`` when backfilling.
+    return (
+        f"""INSERT OR IGNORE INTO post_tags (post_id, tag, schedule_date)
+        SELECT {row}.id, ltrim(value, '#'), {row}.schedule_date
+        FROM {source}json_each({split_words(f"{row}.hashtags")})
+        WHERE ltrim(value, '#') <> ''""",
+        f"""INSERT OR IGNORE INTO post_tags (post_id, tag, schedule_date)
+        SELECT {row}.id, {CAPTION_TAG}, {row}.schedule_date
+        FROM {source}json_each({split_words(f"{row}.caption", f"instr({row}.caption, '#')")})
+        WHERE value LIKE '#%' AND {CAPTION_TAG} <> ''""",
+    )
+
+
+def non_ascii(row, source=""):
+    # Statement queueing ``row`` for fold() when its hashtags, or a caption
+    # with a #, hold anything but ASCII letters, digits, punctuation and
+    # spaces. ``source`` is as in tag_inserts.
+    outside = "'*[^' || char(9, 10, 13) || ' -~]*'"
+    tables = f"FROM {source.rstrip(', ')} " if source else ""
+    return (
+        f"""INSERT OR IGNORE INTO post_tags_queue (post_id)
+        SELECT {row}.id {tables}WHERE ({row}.hashtags GLOB {outside}
+            OR (instr({row}.caption, '#') AND {row}.caption GLOB {outside}))"""
+    )
+
+
+NEW_TAGS = ";\n    ".join(tag_inserts("NEW") + (non_ascii("NEW"),))
+
+
+TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS scheduled_posts_search_ai AFTER INSERT ON scheduled_posts BEGIN
+    INSERT INTO posts_fts (rowid, caption, hashtags)
+        VALUES (NEW.id, NEW.caption, NEW.hashtags);
+    {NEW_TAGS};
+END;
+CREATE TRIGGER IF NOT EXISTS scheduled_posts_search_ad AFTER DELETE ON scheduled_posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, caption, hashtags)
+        VALUES ('delete', OLD.id, OLD.caption, OLD.hashtags);
+    DELETE FROM post_tags WHERE post_id = OLD.id;
+    DELETE FROM post_tags_queue WHERE post_id = OLD.id;
+END;
+CREATE TRIGGER IF NOT EXISTS scheduled_posts_search_au
+AFTER UPDATE OF caption, hashtags ON scheduled_posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, caption, hashtags)
+        VALUES ('delete', OLD.id, OLD.caption, OLD.hashtags);
+    INSERT INTO posts_fts (rowid, caption, hashtags)
+        VALUES (NEW.id, NEW.caption, NEW.hashtags);
+    DELETE FROM post_tags WHERE post_id = OLD.id;
+    {NEW_TAGS};
+END;
+CREATE TRIGGER IF NOT EXISTS scheduled_posts_search_au_date
+AFTER UPDATE OF schedule_date ON scheduled_posts BEGIN
+    UPDATE post_tags SET schedule_date = NEW.schedule_date WHERE post_id = NEW.id;
+END;
+"""
+
+# For the posts with first < id <= last
+SQL_BACKFILL_TAGS = tuple(
+    statement + " AND p.id > ? AND p.id <= ?"
+    for statement in tag_inserts("p", "scheduled_posts p, ") + (non_ascii("p", "scheduled_posts p, "),)
+)
+SQL_MAX_POST = "SELECT MAX(id) FROM scheduled_posts"
+BACKFILL_CHUNK = 20000
+# Pause between the transactions of a long build, as long as SQLite's busy
+# handler sleeps at most, so a writer waiting for the lock gets it
+YIELD_SECONDS = 0.1
+# Earlier versions had no queue, or folded tags with an SQL function only
+# the app's own connections had
+SQL_OUTDATED_TRIGGERS = (
+    "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name IN "
+    "('scheduled_posts_search_ai', 'scheduled_posts_search_au', 'scheduled_posts_search_ad') "
+    "AND (sql NOT LIKE '%post_tags_queue%' OR sql LIKE '%normalize(%')"
+)
+DROP_TAG_TRIGGERS = """
+DROP TRIGGER IF EXISTS scheduled_posts_search_ai;
+DROP TRIGGER IF EXISTS scheduled_posts_search_ad;
+DROP TRIGGER IF EXISTS scheduled_posts_search_au;
+"""
+SQL_INSTALLED = "SELECT 1 FROM sqlite_master WHERE name = 'posts_fts'"
+SQL_QUEUED_POSTS = (
+    "SELECT q.post_id, p.caption, p.hashtags, p.schedule_date FROM post_tags_queue q "
+    "LEFT JOIN scheduled_posts p ON p.id = q.post_id ORDER BY q.post_id LIMIT ?"
+)
+SQL_DELETE_TAGS = "DELETE FROM post_tags WHERE post_id = ?"
+SQL_INSERT_TAG = "INSERT OR IGNORE INTO post_tags (post_id, tag, schedule_date) VALUES (?, ?, ?)"
+SQL_UNQUEUE = "DELETE FROM post_tags_queue WHERE post_id = ?"
+SQL_QUEUED = "SELECT 1 FROM post_tags_queue LIMIT 1"
+FOLD_CHUNK = 1000
+
+SQL_TAG_POSTS = (
+    "SELECT " + POST_COLUMNS + " FROM post_tags t "
+    "JOIN scheduled_posts p ON p.id = t.post_id "
+    "LEFT JOIN profiles pr ON pr.id = p.profile_id "
+    "LEFT JOIN platforms pl ON pl.id = pr.platform_id "
+    "WHERE t.tag = ? AND t.schedule_date >= ? AND t.schedule_date < ?"
+)
+SQL_TEXT_POSTS = (
+    "SELECT " + POST_COLUMNS + " FROM posts_fts f "
+    "JOIN scheduled_posts p ON p.id = f.rowid "
+    "LEFT JOIN profiles pr ON pr.id = p.profile_id "
+    "LEFT JOIN platforms pl ON pl.id = pr.platform_id "
+    "WHERE posts_fts MATCH ?"
+)
+
+WORD = re.compile(r"#?[^\W_]+")
+# What split_words splits on
+SEPARATOR = re.compile(r"[ ,\t\n\r]")
+
+
+def normalize(text):
+    # Lowercase without diacritics, like the unicode61 tokenizer
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def post_tags(caption, hashtags):
+    # The tags tag_inserts finds, folded with normalize
+    tags = {word.lstrip("#") for word in SEPARATOR.split(normalize(hashtags or ""))}
+    if "#" in (caption or ""):
+        tags.update(
+            word.lstrip("#").rstrip(".,!?;:)")
+            for word in SEPARATOR.split(normalize(caption)) if word.startswith("#")
+        )
+    tags.discard("")
+    return tags
+
+
+def needs_rebuild(store):
+    # True when PostSearch(store) would index every post, which takes
+    # seconds on a large database
+    conn = store.conn
+    return (conn.execute(SQL_INSTALLED).fetchone() is None
+            or conn.execute(SQL_OUTDATED_TRIGGERS).fetchone() is not None)
+
+
+def parse_query(text):
+    """Split user input into (words, tags): ``#launch spring`` -> (['spring'], ['launch'])."""
+    words, tags = [], []
+    for token in WORD.findall(text.lower()):
+        if token.startswith("#"):
+            tags.append(normalize(token[1:]))
+        else:
+            words.append(normalize(token))
+    return words, tags
+
+
+def match_expression(words, prefix_last=True):
+    # Every word must match; the last one as a prefix while the user types
+    terms = ['"{}"'.format(word) for word in words]
+    if prefix_last:
+        terms[-1] += "*"
+    return " AND ".join(terms)
+
+
+def text_matches(row, words, prefix_last=True):
+    # The same test as match_expression, for rows already fetched
+    tokens = set(WORD.findall(normalize(f"{row['caption'] or ''} {row['hashtags'] or ''}")))
+    tokens = {token.lstrip("#") for token in tokens}
+    for i, word in enumerate(words):
+        if prefix_last and i == len(words) - 1:
+            if not any(token.startswith(word) for token in tokens):
+                return False
+        elif word not in tokens:
+            return False
+    return True
+
+
+class PostSearch:
+    """Search over captions and hashtags.
+
+    - Hashtag queries range-scan (tag, schedule_date), in date order.
+    - Hashtags plus words walk the tag's posts in date order and check the
+      words on each row, stopping at ``limit``.
+    - Words alone go through FTS5 and return the most recently added
+      matches, so a common prefix typed into the search box never makes
+      SQLite collect and sort every match. That page is then sorted by
+      date.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.conn = store.conn
+        with self.conn:
+            stale = needs_rebuild(store)
+            if stale:
+                self.conn.executescript(DROP_TAG_TRIGGERS)
+            self.conn.executescript(SCHEMA + TRIGGERS)
+        if stale:
+            self.rebuild()
+
+    def rebuild(self):
+        # Re-index everything, e.g. after rows were written with triggers
+        # off. Tags are added a range of posts per transaction, so other
+        # writers are not kept waiting for the whole build; the triggers
+        # keep the posts they write meanwhile tagged.
+        with self.conn:
+            self.conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+            self.conn.execute("DELETE FROM post_tags")
+            self.conn.execute("DELETE FROM post_tags_queue")
+            last = self.conn.execute(SQL_MAX_POST).fetchone()[0] or 0
+        for first in range(0, last, BACKFILL_CHUNK):
+            time.sleep(YIELD_SECONDS)
+            with self.conn:
+                for statement in SQL_BACKFILL_TAGS:
+                    self.conn.execute(statement, (first, first + BACKFILL_CHUNK))
+        self.fold()
+
+    def fold(self):
+        """Re-tag queued posts with normalize; returns how many were handled."""
+        done = 0
+        while self.conn.execute(SQL_QUEUED).fetchone():
+            if done:
+                time.sleep(YIELD_SECONDS)
+            # Read and write under one write lock, so an edit made meanwhile
+            # by another process is not re-tagged from stale text
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(SQL_QUEUED_POSTS, (FOLD_CHUNK,)).fetchall()
+                for row in rows:
+                    self.conn.execute(SQL_DELETE_TAGS, (row["post_id"],))
+                    self.conn.executemany(SQL_INSERT_TAG, (
+                        (row["post_id"], tag, row["schedule_date"])
+                        for tag in post_tags(row["caption"], row["hashtags"])
+                    ))
+                self.conn.executemany(SQL_UNQUEUE, ((row["post_id"],) for row in rows))
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+            done += len(rows)
+        return done
+
+    def search(self, text="", tags=(), start=None, end=None, limit=50, prefix=True):
+        """Posts matching free text and/or hashtags.
+
+        ``text`` may itself contain ``#tags``; ``start``/``end`` bound
+        schedule_date as [start, end).
+        """
+        words, parsed_tags = parse_query(text)
+        tags = [normalize(tag).lstrip("#") for tag in tags] + parsed_tags
+        if tags:
+            self.fold()
+            return self.search_tags(tags, words, start, end, limit, prefix)
+        if words:
+            return self.search_text(words, start, end, limit, prefix)
+        return []
+
+    def search_tags(self, tags, words, start, end, limit, prefix):
+        sql = SQL_TAG_POSTS
+        # "~" sorts after any date string, so an open end still range-scans
+        params = [tags[0], format_datetime(start) if start else "", format_datetime(end) if end else "~"]
+        for tag in tags[1:]:
+            sql += " AND EXISTS (SELECT 1 FROM post_tags o WHERE o.post_id = t.post_id AND o.tag = ?)"
+            params.append(tag)
+        sql += " ORDER BY t.schedule_date"
+        cursor = self.conn.execute(sql, params)
+        results = []
+        # Rows arrive in date order, so stop stepping once the page is full
+        for row in cursor:
+            if not words or text_matches(row, words, prefix):
+                results.append(row)
+                if len(results) == limit:
+                    break
+        cursor.close()
+        return results
+
+    def search_text(self, words, start, end, limit, prefix):
+        sql = SQL_TEXT_POSTS
+        params = [match_expression(words, prefix)]
+        if start is not None:
+            sql += " AND p.schedule_date >= ?"
+            params.append(format_datetime(start))
+        if end is not None:
+            sql += " AND p.schedule_date < ?"
+            params.append(format_datetime(end))
+        sql += " ORDER BY f.rowid DESC LIMIT ?"
+        params.append(limit)
+        rows = self.conn.execute(sql, params).fetchall()
+        # Drafts have no schedule_date yet and sort first
+        return sorted(rows, key=lambda row: (row["schedule_date"] or "", row["id"]))
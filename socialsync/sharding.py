@@ -0,0 +1,115 @@
+"""Splitting dispatch across processes: worker membership and a hash ring.
+
+Every dispatcher registers in ``dispatch_workers`` and heartbeats there.
+The workers heard from within ``ttl`` seconds form a consistent hash ring
+over profile_id, and each one only queues posts of the profiles it owns.
+When a worker joins or dies, only the profiles on its arcs of the ring
+move, so the others keep their queues.
+
+Ownership spreads the work; it is not what prevents double posting. Two
+workers may briefly disagree about the ring, so posts are still claimed
+with the atomic UPDATE in ScheduleStore.claim_posts, which leases them
+to one worker. Workers renew their leases with each heartbeat. When a
+worker crashes, its leases run out and ScheduleStore.reclaim_expired
+hands the posts back. Leases compare wall clocks, so the machines
+sharing a database need synchronized clocks.
+"""
+
+import bisect
+import hashlib
+import os
+import socket
+import time
+
+# Points per worker on the ring; more points even out the arcs
+VNODES = 256
+# A worker is dead when it has not heartbeat for this long (seconds)
+WORKER_TTL = 30.0
+# Rows of workers dead this many TTLs are deleted
+FORGET_AFTER = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dispatch_workers (
+    worker_id TEXT PRIMARY KEY,
+    started REAL,
+    heartbeat REAL
+);
+"""
+
+SQL_HEARTBEAT = (
+    "INSERT INTO dispatch_workers (worker_id, started, heartbeat) VALUES (?, ?, ?) "
+    "ON CONFLICT (worker_id) DO UPDATE SET heartbeat = excluded.heartbeat"
+)
+SQL_LIVE_WORKERS = "SELECT worker_id FROM dispatch_workers WHERE heartbeat >= ? ORDER BY worker_id"
+SQL_FORGET_WORKERS = "DELETE FROM dispatch_workers WHERE heartbeat < ?"
+SQL_LEAVE = "DELETE FROM dispatch_workers WHERE worker_id = ?"
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to members."""
+
+    def __init__(self, members, vnodes=VNODES):
+        self.members = tuple(sorted(members))
+        points = sorted(
+            (ring_hash(f"{member}#{i}"), member)
+            for member in self.members for i in range(vnodes)
+        )
+        self.hashes = [point for point, _ in points]
+        self.owners = [member for _, member in points]
+
+    def owner(self, key):
+        if not self.hashes:
+            return None
+        i = bisect.bisect(self.hashes, ring_hash(str(key)))
+        return self.owners[i % len(self.owners)]
+
+
+class Membership:
+    """This worker's registration and its current view of the ring."""
+
+    def __init__(self, store, worker_id=None, ttl=WORKER_TTL, vnodes=VNODES):
+        self.store = store
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = ttl
+        self.vnodes = vnodes
+        self.ring = HashRing([self.worker_id], vnodes)
+        self.owned = {}  # profile_id -> bool, for the current ring
+        self.started = time.time()
+        with store.conn:
+            store.conn.executescript(SCHEMA)
+
+    def heartbeat(self, now=None):
+        """Record that this worker is alive and refresh the ring.
+
+        Returns True when the set of live workers changed.
+        """
+        now = now or time.time()
+        conn = self.store.conn
+        with conn:
+            conn.execute(SQL_HEARTBEAT, (self.worker_id, self.started, now))
+            conn.execute(SQL_FORGET_WORKERS, (now - self.ttl * FORGET_AFTER,))
+            live = [row[0] for row in conn.execute(SQL_LIVE_WORKERS, (now - self.ttl,))]
+        if tuple(live) == self.ring.members:
+            return False
+        self.ring = HashRing(live, self.vnodes)
+        self.owned.clear()
+        return True
+
+    def owns(self, profile_id):
+        owned = self.owned.get(profile_id)
+        if owned is None:
+            owned = self.owned[profile_id] = self.ring.owner(profile_id) == self.worker_id
+        return owned
+
+    def leave(self):
+        # The others take over this worker's profiles at their next heartbeat
+        with self.store.conn:
+            self.store.conn.execute(SQL_LEAVE, (self.worker_id,))
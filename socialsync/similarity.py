@@ -0,0 +1,339 @@
+"""Near-duplicate caption detection with SimHash and banded LSH.
+
+Platforms penalize an account for repeating itself, so saving a post
+checks its caption against what the same platform (or profile) has
+scheduled within ``days`` on either side of it.
+
+Each caption gets a 64-bit SimHash of its normalized words, the same
+words search sees without the ``#``. Common function words are left
+out: every caption has them, so with them in, unrelated short captions
+come out close. Captions that differ by an edit or
+two land about 5-12 bits apart, and unrelated ones about 32 bits apart.
+The fingerprint is cut into ``BANDS`` disjoint 16-bit bands. Two
+fingerprints within ``DISTANCE`` (11) bits differ in at most 2 bits of
+at least one band. A check therefore probes every band value within
+``RADIUS`` (2) bits of its own, and finds every such pair.
+
+``caption_bands`` holds one row per (band, band value, schedule_at,
+post). Each probe reads only the posts in that bucket and inside the
+time window, as one range of the primary key. The Hamming distance is
+then computed on the fingerprints stored in those rows. Posts are
+joined only for the few candidates left.
+
+Triggers on scheduled_posts queue inserted posts, and edits to caption
+or schedule_at, in ``caption_dirty``. They also drop the index rows of
+deleted posts, including archived ones. All of this is plain SQL, so
+every writer keeps the queue current. ``refresh`` fingerprints whatever
+is queued, in NumPy batches.
+"""
+
+import argparse
+import functools
+import hashlib
+import itertools
+import json
+import time
+
+import numpy as np
+
+from socialsync.search import WORD, normalize
+from socialsync.store import CLAIM_CHUNK, DEFAULT_DB_PATH, POST_COLUMNS, ScheduleStore, chunked
+from socialsync.timezones import epoch_seconds
+
+BANDS = 4
+RADIUS = 2
+# Fingerprints at most this many bits apart are near-duplicates; unrelated
+# captions almost never come closer than ~16. Probing RADIUS bits around
+# each of the BANDS bands finds every pair up to BANDS * (RADIUS + 1) - 1.
+DISTANCE = BANDS * (RADIUS + 1) - 1
+DAYS = 30
+REFRESH_CHUNK = 5000
+STOPWORDS = frozenset("""
+a about an and are as at be but by do for from has have he her his i if in is it its
+me my of on or our she so than that the their them they this to was we were what when
+which who will with you your
+""".split())
+MASK64 = (1 << 64) - 1
+
+
+def band_layout(bands=BANDS):
+    # (band, shift, mask) for disjoint bands covering all 64 bits
+    layout, shift = [], 0
+    for band in range(bands):
+        bits = 64 // bands + (1 if band < 64 % bands else 0)
+        layout.append((band, shift, (1 << bits) - 1))
+        shift += bits
+    return layout
+
+
+LAYOUT = band_layout()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS caption_hashes (
+    post_id INTEGER PRIMARY KEY,
+    simhash INTEGER,
+    schedule_at INTEGER
+);
+CREATE TABLE IF NOT EXISTS caption_bands (
+    band INTEGER,
+    value INTEGER,
+    schedule_at INTEGER,
+    post_id INTEGER,
+    simhash INTEGER,
+    PRIMARY KEY (band, value, schedule_at, post_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS caption_band_layout (
+    band INTEGER PRIMARY KEY,
+    shift INTEGER,
+    mask INTEGER
+);
+CREATE TABLE IF NOT EXISTS caption_dirty (
+    post_id INTEGER PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+# The band rows of a post are found again from its stored fingerprint:
+# SQLite's >> sign-extends, and the mask keeps only the band's own bits
+UNINDEX = """
+    DELETE FROM caption_bands WHERE (band, value, schedule_at, post_id) IN (
+        SELECT l.band, (h.simhash >> l.shift) & l.mask, h.schedule_at, h.post_id
+        FROM caption_hashes h, caption_band_layout l WHERE h.post_id = OLD.id
+    );
+    DELETE FROM caption_hashes WHERE post_id = OLD.id"""
+
+TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS scheduled_posts_similarity_ai AFTER INSERT ON scheduled_posts BEGIN
+    INSERT OR IGNORE INTO caption_dirty (post_id) VALUES (NEW.id);
+END;
+CREATE TRIGGER IF NOT EXISTS scheduled_posts_similarity_ad AFTER DELETE ON scheduled_posts BEGIN
+    {UNINDEX};
+    DELETE FROM caption_dirty WHERE post_id = OLD.id;
+END;
+CREATE TRIGGER IF NOT EXISTS scheduled_posts_similarity_au
+AFTER UPDATE OF caption, schedule_at ON scheduled_posts BEGIN
+    {UNINDEX};
+    INSERT OR IGNORE INTO caption_dirty (post_id) VALUES (NEW.id);
+END;
+"""
+
+SQL_LAYOUT = "INSERT OR REPLACE INTO caption_band_layout (band, shift, mask) VALUES (?, ?, ?)"
+SQL_QUEUE_ALL = "INSERT OR IGNORE INTO caption_dirty (post_id) SELECT id FROM scheduled_posts"
+SQL_DIRTY = (
+    "SELECT d.post_id, p.caption, p.schedule_at FROM caption_dirty d "
+    "LEFT JOIN scheduled_posts p ON p.id = d.post_id ORDER BY d.post_id LIMIT ?"
+)
+SQL_INSERT_HASH = (
+    "INSERT OR REPLACE INTO caption_hashes (post_id, simhash, schedule_at) VALUES (?, ?, ?)"
+)
+SQL_INSERT_BAND = (
+    "INSERT OR REPLACE INTO caption_bands (band, value, schedule_at, post_id, simhash) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+SQL_CLEAN = "DELETE FROM caption_dirty WHERE post_id = ?"
+SQL_PENDING = "SELECT COUNT(*) FROM caption_dirty"
+# One primary-key range per probed bucket (a JSON array per band),
+# inside the window
+SQL_CANDIDATES = " UNION ALL ".join([
+    "SELECT post_id, simhash FROM caption_bands "
+    "WHERE band = ? AND value IN (SELECT value FROM json_each(?)) "
+    "AND schedule_at >= ? AND schedule_at <= ?"
+] * BANDS)
+SCOPES = {
+    "profile": "p.profile_id = ?",
+    "platform": "pr.platform_id = (SELECT platform_id FROM profiles WHERE id = ?)",
+}
+
+
+@functools.lru_cache(maxsize=1 << 18)
+def feature_hash(word):
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def words(caption):
+    tokens = [token.lstrip("#") for token in WORD.findall(normalize(caption or ""))]
+    # A caption of nothing but stopwords still gets a fingerprint
+    return [token for token in tokens if token not in STOPWORDS] or tokens
+
+
+def to_signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def fingerprints(captions):
+    """64-bit SimHash of every caption (None for captions without words).
+
+    Every word votes +1/-1 on each bit of its hash; a bit is set where
+    the votes are positive. One NumPy pass covers the whole batch.
+    """
+    hashes, starts, owners = [], [], []
+    for i, caption in enumerate(captions):
+        features = [feature_hash(word) for word in words(caption)]
+        if features:
+            starts.append(len(hashes))
+            owners.append(i)
+            hashes.extend(features)
+    result = [None] * len(captions)
+    if not hashes:
+        return result
+    bits = np.unpackbits(
+        np.array(hashes, dtype="<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little"
+    )
+    votes = np.add.reduceat(bits.astype(np.int32) * 2 - 1, starts, axis=0)
+    packed = np.packbits(votes > 0, axis=1, bitorder="little").view("<u8").ravel()
+    for i, value in zip(owners, packed.tolist()):
+        result[i] = value
+    return result
+
+
+def fingerprint(caption):
+    return fingerprints([caption])[0]
+
+
+def distance(a, b):
+    return bin((a ^ b) & MASK64).count("1")
+
+
+def bands(value):
+    return [(band, (value >> shift) & mask) for band, shift, mask in LAYOUT]
+
+
+def probes(band_value, bits, radius=RADIUS):
+    # Every value within ``radius`` flipped bits of band_value
+    values = [band_value]
+    for flips in range(1, radius + 1):
+        values.extend(
+            band_value ^ sum(1 << bit for bit in combo)
+            for combo in itertools.combinations(range(bits), flips)
+        )
+    return values
+
+
+class CaptionIndex:
+    """SimHash index over scheduled_posts.caption."""
+
+    def __init__(self, store):
+        self.store = store
+        self.conn = store.conn
+        with self.conn:
+            installed = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'caption_bands'"
+            ).fetchone()
+            self.conn.executescript(SCHEMA + TRIGGERS)
+            self.conn.executemany(SQL_LAYOUT, LAYOUT)
+            if not installed:
+                # Existing posts are fingerprinted by the first refresh
+                self.conn.execute(SQL_QUEUE_ALL)
+
+    def pending(self):
+        return self.conn.execute(SQL_PENDING).fetchone()[0]
+
+    def refresh(self, limit=None):
+        """Fingerprint queued posts; returns how many were handled.
+
+        Drafts (no schedule_at) get a fingerprint but no bands, until
+        they are placed.
+        """
+        done = 0
+        while limit is None or done < limit:
+            chunk = REFRESH_CHUNK if limit is None else min(REFRESH_CHUNK, limit - done)
+            handled = self.refresh_chunk(chunk)
+            done += handled
+            if handled < chunk:
+                break
+        return done
+
+    def refresh_chunk(self, size):
+        # Read and write under one write lock, so an edit made meanwhile by
+        # another process can not be overwritten with a stale fingerprint
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(SQL_DIRTY, (size,)).fetchall()
+            values = fingerprints([row["caption"] for row in rows])
+            hashes, band_rows = [], []
+            for row, value in zip(rows, values):
+                if value is None:
+                    continue  # no words, or deleted since it was queued
+                hashes.append((row["post_id"], to_signed(value), row["schedule_at"]))
+                if row["schedule_at"] is not None:
+                    band_rows.extend(
+                        (band, band_value, row["schedule_at"], row["post_id"], to_signed(value))
+                        for band, band_value in bands(value)
+                    )
+            conn.executemany(SQL_INSERT_HASH, hashes)
+            conn.executemany(SQL_INSERT_BAND, band_rows)
+            conn.executemany(SQL_CLEAN, ((row["post_id"],) for row in rows))
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return len(rows)
+
+    def check(self, caption, profile_id, when, days=DAYS, scope="platform",
+              max_distance=DISTANCE, exclude=(), limit=20):
+        """Posts near-duplicating ``caption`` within ``days`` of ``when``.
+
+        ``scope`` is "platform" (any profile of profile_id's platform) or
+        "profile". ``when`` is an instant (naive means system time) or
+        epoch seconds. Returns (distance, post row) pairs, closest first.
+        """
+        value = fingerprint(caption)
+        if value is None:
+            return []
+        at = epoch_seconds(when)
+        window = int(days * 86400)
+        params = [
+            item for (band, band_value), (_, _, mask) in zip(bands(value), LAYOUT)
+            for item in (
+                band, json.dumps(probes(band_value, mask.bit_length())),
+                at - window, at + window
+            )
+        ]
+        close = {}
+        exclude = set(exclude)
+        for post_id, other in self.conn.execute(SQL_CANDIDATES, params):
+            if post_id not in close and post_id not in exclude:
+                bits = distance(value, other)
+                if bits <= max_distance:
+                    close[post_id] = bits
+        matches = []
+        for chunk in chunked(close, CLAIM_CHUNK):
+            sql = (
+                "SELECT " + POST_COLUMNS + " FROM scheduled_posts p "
+                "LEFT JOIN profiles pr ON pr.id = p.profile_id "
+                "LEFT JOIN platforms pl ON pl.id = pr.platform_id "
+                "WHERE p.id IN ({}) AND {}".format(", ".join("?" * len(chunk)), SCOPES[scope])
+            )
+            matches.extend(
+                (close[row["id"]], row) for row in self.conn.execute(sql, chunk + [profile_id])
+            )
+        matches.sort(key=lambda match: (match[0], abs(match[1]["schedule_at"] - at)))
+        return matches[:limit]
+
+    def check_post(self, post_id, **kwargs):
+        """Near-duplicates of a saved post, the post itself excluded."""
+        post = self.store.get_post(post_id)
+        if post is None or post["schedule_at"] is None:
+            return []
+        return self.check(
+            post["caption"], post["profile_id"], post["schedule_at"],
+            exclude={post_id}, **kwargs
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the near-duplicate caption index.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    store = ScheduleStore(args.db)
+    index = CaptionIndex(store)
+    started = time.monotonic()
+    done = index.refresh()
+    print(f"fingerprinted {done} posts in {time.monotonic() - started:.1f}s")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
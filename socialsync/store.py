@@ -0,0 +1,654 @@
+"""SQLite repository for platforms, profiles and scheduled posts."""
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from socialsync.timezones import GAP, epoch_seconds, zone_table
+
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "social_media_scheduler.db"
+)
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_PROFILE = "Default"
+
+# Platform order of the sidebar (socialsync.profiles)
+PLATFORMS = [
+    "Facebook", "Twitter", "Instagram", "LinkedIn",
+    "TikTok", "YouTube", "Pinterest", "Snapchat",
+    "RedNote", "Lemon8"
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS platforms (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE,
+    added_date DATETIME
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    platform_id INTEGER,
+    profile_name TEXT,
+    added_date DATETIME,
+    timezone TEXT,
+    FOREIGN KEY (platform_id) REFERENCES platforms (id)
+);
+CREATE TABLE IF NOT EXISTS scheduled_posts (
+    id INTEGER PRIMARY KEY,
+    profile_id INTEGER,
+    content_type TEXT,
+    media_path TEXT,
+    caption TEXT,
+    hashtags TEXT,
+    schedule_date DATETIME,
+    status TEXT,
+    last_run DATETIME,
+    rule_id INTEGER,
+    occurrence DATETIME,
+    schedule_at INTEGER,
+    lease_owner TEXT,
+    lease_expires REAL,
+    FOREIGN KEY (profile_id) REFERENCES profiles (id)
+);
+CREATE INDEX IF NOT EXISTS idx_profiles_platform_name
+    ON profiles (platform_id, profile_name);
+CREATE TABLE IF NOT EXISTS post_archives (
+    month TEXT PRIMARY KEY,
+    table_name TEXT,
+    rows INTEGER,
+    min_at INTEGER,
+    max_at INTEGER,
+    min_id INTEGER,
+    max_id INTEGER
+);
+"""
+
+# Columns added after the original schema; older databases get them via
+# ALTER TABLE when the store opens.
+ADDED_COLUMNS = {
+    "profiles": (("timezone", "TEXT"),),
+    "scheduled_posts": (
+        ("rule_id", "INTEGER"), ("occurrence", "DATETIME"), ("schedule_at", "INTEGER"),
+        ("lease_owner", "TEXT"), ("lease_expires", "REAL")
+    ),
+}
+# Time range scans run on schedule_at; the schedule_date indexes they
+# replaced are dropped.
+POST_MIGRATION_SCHEMA = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_scheduled_posts_rule_occurrence
+    ON scheduled_posts (rule_id, occurrence);
+DROP INDEX IF EXISTS idx_scheduled_posts_date;
+DROP INDEX IF EXISTS idx_scheduled_posts_status_date;
+DROP INDEX IF EXISTS idx_scheduled_posts_profile_date;
+DROP INDEX IF EXISTS idx_scheduled_posts_date_profile;
+CREATE INDEX IF NOT EXISTS idx_scheduled_posts_status_at
+    ON scheduled_posts (status, schedule_at, profile_id);
+CREATE INDEX IF NOT EXISTS idx_scheduled_posts_profile_at
+    ON scheduled_posts (profile_id, schedule_at, status);
+CREATE INDEX IF NOT EXISTS idx_scheduled_posts_at_profile
+    ON scheduled_posts (schedule_at, profile_id);
+"""
+
+# Statements are kept as constants so sqlite3's per-connection statement
+# cache reuses the prepared form on every call.
+POST_COLUMNS = (
+    "p.id, p.profile_id, p.content_type, p.media_path, p.caption, p.hashtags, "
+    "p.schedule_date, p.status, p.last_run, p.rule_id, p.occurrence, p.schedule_at, "
+    "pr.profile_name, pl.name AS platform"
+)
+POST_FROM = (
+    "FROM scheduled_posts p "
+    "LEFT JOIN profiles pr ON pr.id = p.profile_id "
+    "LEFT JOIN platforms pl ON pl.id = pr.platform_id "
+)
+
+SQL_SELECT_PLATFORM = "SELECT id FROM platforms WHERE name = ?"
+SQL_INSERT_PLATFORM = "INSERT INTO platforms (name, added_date) VALUES (?, ?)"
+SQL_SELECT_PROFILE = (
+    "SELECT id FROM profiles WHERE platform_id = ? AND profile_name = ?"
+)
+SQL_SELECT_PLATFORM_PROFILE = (
+    "SELECT pr.id FROM profiles pr JOIN platforms pl ON pl.id = pr.platform_id "
+    "WHERE pl.name = ? AND pr.profile_name = ?"
+)
+SQL_INSERT_PROFILE = (
+    "INSERT INTO profiles (platform_id, profile_name, added_date) VALUES (?, ?, ?)"
+)
+SQL_PROFILE_TIMEZONE = "SELECT timezone FROM profiles WHERE id = ?"
+SQL_TIMEZONES_IN_USE = "SELECT DISTINCT timezone FROM profiles"
+SQL_SET_PROFILE_TIMEZONE = "UPDATE profiles SET timezone = ? WHERE id = ?"
+SQL_PROFILE_PLATFORM = (
+    "SELECT pl.name FROM profiles pr JOIN platforms pl ON pl.id = pr.platform_id "
+    "WHERE pr.id = ?"
+)
+SQL_INSERT_POST = (
+    "INSERT INTO scheduled_posts (profile_id, content_type, media_path, caption, "
+    "hashtags, schedule_date, status, schedule_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_UPSERT_POST = (
+    "INSERT INTO scheduled_posts (id, profile_id, content_type, media_path, caption, "
+    "hashtags, schedule_date, status, schedule_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (id) DO UPDATE SET profile_id = excluded.profile_id, "
+    "content_type = excluded.content_type, media_path = excluded.media_path, "
+    "caption = excluded.caption, hashtags = excluded.hashtags, "
+    "schedule_date = excluded.schedule_date, schedule_at = excluded.schedule_at"
+)
+SQL_GET_POST = "SELECT " + POST_COLUMNS + " " + POST_FROM + "WHERE p.id = ?"
+# Archived posts (see socialsync.archive) keep their columns in monthly
+# tables; reads that reach into the past union them back in
+ARCHIVED_COLUMNS = (
+    "id, profile_id, content_type, media_path, caption, hashtags, schedule_date, "
+    "status, last_run, rule_id, occurrence, schedule_at"
+)
+ARCHIVE_FROM = (
+    "FROM ({}) p "
+    "LEFT JOIN profiles pr ON pr.id = p.profile_id "
+    "LEFT JOIN platforms pl ON pl.id = pr.platform_id "
+)
+SQL_ARCHIVES_BETWEEN = (
+    "SELECT table_name FROM post_archives WHERE min_at < ? AND max_at >= ? ORDER BY month"
+)
+SQL_ARCHIVES_WITH_ID = (
+    "SELECT table_name FROM post_archives WHERE min_id <= ? AND max_id >= ? ORDER BY month"
+)
+SQL_ARCHIVE_TABLES = "SELECT table_name FROM post_archives ORDER BY month"
+SQL_DELETE_POST = "DELETE FROM scheduled_posts WHERE id = ?"
+SQL_SET_STATUS = "UPDATE scheduled_posts SET status = ?, last_run = ? WHERE id = ?"
+SQL_DUE_POSTS = (
+    "SELECT " + POST_COLUMNS + " " + POST_FROM +
+    "WHERE p.status = ? AND p.schedule_at <= ? "
+    "ORDER BY p.schedule_at LIMIT ?"
+)
+SQL_DUE_IDS = (
+    "SELECT id, schedule_at, profile_id FROM scheduled_posts "
+    "WHERE status = ? AND schedule_at <= ? ORDER BY schedule_at LIMIT ?"
+)
+# Only the lease holder may finish a post: once its lease has expired and
+# the post was reclaimed, a late finish from the old owner is ignored.
+SQL_FINISH_POST = (
+    "UPDATE scheduled_posts SET status = ?, last_run = ?, lease_owner = NULL, "
+    "lease_expires = NULL WHERE id = ? AND status = 'running' AND lease_owner IS ?"
+)
+# Running rows are few (in flight only) and found through the status
+# prefix of idx_scheduled_posts_status_at.
+SQL_RENEW_LEASES = (
+    "UPDATE scheduled_posts SET lease_expires = ? "
+    "WHERE status = 'running' AND lease_owner = ?"
+)
+SQL_RECLAIM_LEASES = (
+    "UPDATE scheduled_posts SET status = 'pending', lease_owner = NULL, lease_expires = NULL "
+    "WHERE status = 'running' AND (lease_expires IS NULL OR lease_expires < ?) RETURNING id"
+)
+SQL_RELEASE_LEASES = (
+    "UPDATE scheduled_posts SET status = 'pending', lease_owner = NULL, lease_expires = NULL "
+    "WHERE status = 'running' AND lease_owner = ?"
+)
+SQL_MONTH_POSTS = (
+    "SELECT " + POST_COLUMNS + " " + POST_FROM +
+    "WHERE p.schedule_at >= ? AND p.schedule_at < ? "
+    "ORDER BY p.schedule_at"
+)
+SQL_MONTH_POSTS_PROFILE = (
+    "SELECT " + POST_COLUMNS + " " + POST_FROM +
+    "WHERE p.profile_id = ? AND p.schedule_at >= ? AND p.schedule_at < ? "
+    "ORDER BY p.schedule_at"
+)
+# Counted per profile from the covering (schedule_at, profile_id) index,
+# then joined to platform names once per group rather than once per row.
+# One day-bucketing query per run of constant UTC offset in the month;
+# days are numbered per row and formatted once per group.
+SQL_OFFSET_DAY_COUNTS = (
+    "SELECT (schedule_at + ?) / 86400 AS day, profile_id, COUNT(*) AS n "
+    "FROM {} WHERE schedule_at >= ? AND schedule_at < ? "
+    "GROUP BY day, profile_id"
+)
+SQL_MONTH_DAY_COUNTS = (
+    "SELECT date(c.day * 86400, 'unixepoch'), pl.name, SUM(c.n) FROM ({}) c "
+    "LEFT JOIN profiles pr ON pr.id = c.profile_id "
+    "LEFT JOIN platforms pl ON pl.id = pr.platform_id "
+    "GROUP BY c.day, pl.name"
+)
+# Rule occurrences that have a row, from idx_scheduled_posts_rule_occurrence
+SQL_MATERIALIZED = (
+    "SELECT rule_id, occurrence FROM {} "
+    "WHERE rule_id IN (SELECT value FROM json_each(?)) AND occurrence BETWEEN ? AND ?"
+)
+SQL_PENDING_WALL_TIMES = (
+    "SELECT id, schedule_date FROM scheduled_posts "
+    "WHERE profile_id = ? AND status IN ('pending', 'running') AND schedule_date IS NOT NULL"
+)
+SQL_PAST_INSTANTS = (
+    "SELECT id, schedule_at FROM scheduled_posts "
+    "WHERE profile_id = ? AND status NOT IN ('pending', 'running') AND schedule_at IS NOT NULL"
+)
+SQL_MISSING_INSTANTS = (
+    "SELECT id, profile_id, schedule_date FROM scheduled_posts "
+    "WHERE schedule_at IS NULL AND schedule_date IS NOT NULL"
+)
+SQL_SET_WALL_TIME = "UPDATE scheduled_posts SET schedule_date = ? WHERE id = ?"
+SQL_SET_INSTANT = "UPDATE scheduled_posts SET schedule_date = ?, schedule_at = ? WHERE id = ?"
+
+EDITABLE_FIELDS = (
+    "profile_id", "content_type", "media_path", "caption",
+    "hashtags", "schedule_date", "status", "last_run"
+)
+
+
+CLAIM_CHUNK = 500
+# Seconds a claimed post stays leased to its dispatcher without renewal
+LEASE_SECONDS = 60.0
+
+
+def chunked(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def format_datetime(value):
+    if isinstance(value, datetime):
+        return value.strftime(DATE_FORMAT)
+    return value
+
+
+def parse_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.strptime(value, DATE_FORMAT)
+
+
+def month_bounds(year, month):
+    start = datetime(year, month, 1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+class ScheduleStore:
+    """Repository over social_media_scheduler.db.
+
+    A post's time is stored twice. ``schedule_at`` is the UTC epoch
+    second, so the (status, schedule_at) and (profile_id, schedule_at)
+    indexes answer due-post and month queries as integer range scans.
+    ``schedule_date`` is the same moment as "YYYY-MM-DD HH:MM:SS" wall
+    time in the profile's time zone (profiles.timezone, or the system zone
+    when unset). Both are written together; see socialsync.timezones.
+
+    Times passed in may be naive wall times in the profile's zone or
+    aware datetimes for an exact instant. Month queries use the display
+    zone, which is the system zone.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, check_same_thread=True):
+        self.path = path
+        self.conn = sqlite3.connect(
+            path,
+            cached_statements=256,
+            check_same_thread=check_same_thread
+        )
+        self.conn.row_factory = sqlite3.Row
+        self.zones = {}  # profile_id -> ZoneTable
+        self.display_zone = zone_table()
+        # Takes effect only while the file has no tables: new databases can
+        # hand pages freed by archiving back in steps (socialsync.archive)
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self.migrate()
+        self.conn.commit()
+
+    def migrate(self):
+        added = set()
+        for table, columns in ADDED_COLUMNS.items():
+            added.update(self.add_columns(table, columns))
+        # Archive tables follow the columns of scheduled_posts
+        for table in self.archive_tables():
+            self.add_columns(table, ADDED_COLUMNS["scheduled_posts"])
+        if "schedule_at" in added:
+            # Existing rows were written in the system zone
+            self.conn.executemany(SQL_SET_INSTANT, (
+                self.resolve(row[1], row[2]) + (row[0],)
+                for row in self.conn.execute(SQL_MISSING_INSTANTS).fetchall()
+            ))
+        self.conn.executescript(POST_MIGRATION_SCHEMA)
+
+    def add_columns(self, table, columns):
+        existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+        added = []
+        for name, decl in columns:
+            if name not in existing:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+                added.append(name)
+        return added
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Platforms and profiles
+
+    def get_or_create_platform(self, name):
+        row = self.conn.execute(SQL_SELECT_PLATFORM, (name,)).fetchone()
+        if row:
+            return row[0]
+        with self.conn:
+            cur = self.conn.execute(
+                SQL_INSERT_PLATFORM, (name, format_datetime(datetime.now()))
+            )
+        return cur.lastrowid
+
+    def find_profile(self, platform, profile_name=DEFAULT_PROFILE):
+        # Read-only lookup: None until get_or_create_profile makes it
+        row = self.conn.execute(
+            SQL_SELECT_PLATFORM_PROFILE, (platform, profile_name)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_or_create_profile(self, platform, profile_name=DEFAULT_PROFILE):
+        platform_id = self.get_or_create_platform(platform)
+        row = self.conn.execute(
+            SQL_SELECT_PROFILE, (platform_id, profile_name)
+        ).fetchone()
+        if row:
+            return row[0]
+        with self.conn:
+            cur = self.conn.execute(
+                SQL_INSERT_PROFILE,
+                (platform_id, profile_name, format_datetime(datetime.now()))
+            )
+        return cur.lastrowid
+
+    def platform_for_profile(self, profile_id):
+        row = self.conn.execute(SQL_PROFILE_PLATFORM, (profile_id,)).fetchone()
+        return row[0] if row else None
+
+    # Time zones
+
+    def zone_for(self, profile_id):
+        zone = self.zones.get(profile_id)
+        if zone is None:
+            row = self.conn.execute(SQL_PROFILE_TIMEZONE, (profile_id,)).fetchone()
+            zone = self.zones[profile_id] = zone_table(row[0] if row else None)
+        return zone
+
+    def zones_in_use(self):
+        # Every profile zone plus the display zone
+        zones = {self.display_zone}
+        zones.update(zone_table(row[0]) for row in self.conn.execute(SQL_TIMEZONES_IN_USE))
+        return zones
+
+    def set_profile_timezone(self, profile_id, name):
+        """Move a profile to an IANA zone (None for the system zone).
+
+        Posts still to go keep their wall time and get a new instant;
+        posts already sent keep their instant and get a new wall time.
+        """
+        zone = zone_table(name)
+        with self.conn:
+            self.conn.execute(SQL_SET_PROFILE_TIMEZONE, (name, profile_id))
+            self.zones[profile_id] = zone
+            self.conn.executemany(SQL_SET_INSTANT, [
+                self.resolve(profile_id, row[1]) + (row[0],)
+                for row in self.conn.execute(SQL_PENDING_WALL_TIMES, (profile_id,))
+            ])
+            self.conn.executemany(SQL_SET_WALL_TIME, [
+                (format_datetime(zone.to_local(row[1])), row[0])
+                for row in self.conn.execute(SQL_PAST_INSTANTS, (profile_id,))
+            ])
+
+    def post_times(self, profile_id, schedule_date, status):
+        # The (schedule_date, status, schedule_at) tail of SQL_INSERT_POST
+        schedule_date, schedule_at = self.resolve(profile_id, schedule_date)
+        return schedule_date, status, schedule_at
+
+    def resolve(self, profile_id, schedule_date):
+        """(schedule_date text, schedule_at) for a time of this profile.
+
+        A wall time skipped by DST moves forward (socialsync.timezones), and
+        the stored wall time moves with it.
+        """
+        if schedule_date is None:
+            return None, None
+        if isinstance(schedule_date, str):
+            schedule_date = datetime.fromisoformat(schedule_date)
+        zone = self.zone_for(profile_id)
+        schedule_at, resolution = zone.to_epoch(schedule_date)
+        if resolution == GAP or schedule_date.tzinfo is not None:
+            schedule_date = zone.to_local(schedule_at)
+        return format_datetime(schedule_date.replace(microsecond=0)), schedule_at
+
+    # Posts
+
+    def add_post(self, profile_id, schedule_date, caption="", hashtags="",
+                 media_path=None, content_type="text", status="pending"):
+        schedule_date, schedule_at = self.resolve(profile_id, schedule_date)
+        with self.conn:
+            cur = self.conn.execute(SQL_INSERT_POST, (
+                profile_id, content_type, media_path, caption, hashtags,
+                schedule_date, status, schedule_at
+            ))
+        return cur.lastrowid
+
+    def add_posts(self, rows):
+        # rows: iterables of (profile_id, content_type, media_path, caption,
+        # hashtags, schedule_date, status)
+        with self.conn:
+            self.conn.executemany(SQL_INSERT_POST, (
+                (r[0], r[1], r[2], r[3], r[4]) + self.post_times(r[0], r[5], r[6])
+                for r in rows
+            ))
+
+    def get_post(self, post_id):
+        row = self.conn.execute(SQL_GET_POST, (post_id,)).fetchone()
+        if row is None:
+            # Only archives whose id range covers the post are looked at
+            for table in self.conn.execute(SQL_ARCHIVES_WITH_ID, (post_id, post_id)).fetchall():
+                row = self.conn.execute("SELECT " + POST_COLUMNS + " " + ARCHIVE_FROM.format(
+                    f"SELECT {ARCHIVED_COLUMNS} FROM {table[0]} WHERE id = ?"
+                ), (post_id,)).fetchone()
+                if row is not None:
+                    break
+        return row
+
+    def update_post(self, post_id, **fields):
+        unknown = set(fields) - set(EDITABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown post fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+        if "schedule_date" in fields or "profile_id" in fields:
+            # The instant follows the wall time in the (possibly new) profile's zone
+            if "schedule_date" not in fields or "profile_id" not in fields:
+                current = self.conn.execute(
+                    "SELECT profile_id, schedule_date FROM scheduled_posts WHERE id = ?", (post_id,)
+                ).fetchone()
+                if current is None:
+                    return
+                fields.setdefault("profile_id", current[0])
+                fields.setdefault("schedule_date", current[1])
+            fields["schedule_date"], fields["schedule_at"] = self.resolve(
+                fields["profile_id"], fields["schedule_date"]
+            )
+        columns = sorted(fields)
+        sql = "UPDATE scheduled_posts SET {} WHERE id = ?".format(
+            ", ".join(f"{c} = ?" for c in columns)
+        )
+        values = [format_datetime(fields[c]) for c in columns]
+        with self.conn:
+            self.conn.execute(sql, values + [post_id])
+
+    def delete_post(self, post_id):
+        with self.conn:
+            self.conn.execute(SQL_DELETE_POST, (post_id,))
+
+    def set_status(self, post_id, status, last_run=None):
+        with self.conn:
+            self.conn.execute(SQL_SET_STATUS, (
+                status, format_datetime(last_run or datetime.now()), post_id
+            ))
+
+    def get_posts(self, post_ids):
+        rows = []
+        for chunk in chunked(post_ids, CLAIM_CHUNK):
+            sql = "SELECT " + POST_COLUMNS + " " + POST_FROM + "WHERE p.id IN ({})".format(
+                ", ".join("?" * len(chunk))
+            )
+            rows.extend(self.conn.execute(sql, chunk).fetchall())
+        return rows
+
+    # Dispatch state
+
+    def claim_posts(self, post_ids, now=None, owner=None, lease=LEASE_SECONDS):
+        # Atomically move pending posts that are actually due to 'running',
+        # leased to owner for ``lease`` seconds. Rows edited, deleted or
+        # claimed elsewhere since they were loaded simply do not come back.
+        now = now or datetime.now()
+        last_run, now_at = format_datetime(now), epoch_seconds(now)
+        claimed = []
+        # The unary + keeps SQLite on the primary key for the id list rather
+        # than walking every due row of idx_scheduled_posts_status_at
+        with self.conn:
+            for chunk in chunked(post_ids, CLAIM_CHUNK):
+                sql = (
+                    "UPDATE scheduled_posts SET status = 'running', last_run = ?, "
+                    "lease_owner = ?, lease_expires = ? "
+                    "WHERE +status = 'pending' AND +schedule_at <= ? "
+                    "AND id IN ({}) RETURNING id".format(", ".join("?" * len(chunk)))
+                )
+                claimed.extend(
+                    row[0] for row in self.conn.execute(
+                        sql, [last_run, owner, now_at + lease, now_at] + list(chunk)
+                    )
+                )
+        return claimed
+
+    def finish_posts(self, outcomes, owner=None):
+        # outcomes: iterable of (post_id, status, finished_at), for posts
+        # claimed by owner
+        with self.conn:
+            self.mark_finished(outcomes, owner)
+
+    def mark_finished(self, outcomes, owner=None):
+        # finish_posts inside the caller's transaction; commits nothing
+        self.conn.executemany(SQL_FINISH_POST, (
+            (status, format_datetime(finished_at), post_id, owner)
+            for post_id, status, finished_at in outcomes
+        ))
+
+    def renew_leases(self, owner, expires):
+        with self.conn:
+            return self.conn.execute(SQL_RENEW_LEASES, (expires, owner)).rowcount
+
+    def reclaim_expired(self, now=None):
+        """Put running posts whose lease ran out back to pending.
+
+        Their owner died (or stalled past its lease) mid-publish, so the
+        post may or may not have gone out: it is published again.
+        """
+        with self.conn:
+            return [row[0] for row in self.conn.execute(
+                SQL_RECLAIM_LEASES, (epoch_seconds(now or time.time()),)
+            )]
+
+    def release_leases(self, owner):
+        # A worker shutting down cleanly hands its unfinished posts back
+        # instead of leaving them until the lease expires
+        with self.conn:
+            return self.conn.execute(SQL_RELEASE_LEASES, (owner,)).rowcount
+
+    # Range queries
+
+    # ``now`` is a datetime (naive means system time) or epoch seconds
+
+    def due_posts(self, within_seconds=0, now=None, limit=1000, status="pending"):
+        # Everything with the given status scheduled up to now + within_seconds,
+        # including overdue posts.
+        horizon = epoch_seconds(now or time.time()) + within_seconds
+        return self.conn.execute(SQL_DUE_POSTS, (status, horizon, limit)).fetchall()
+
+    def due_post_ids(self, within_seconds=0, now=None, limit=1000, status="pending"):
+        # Index-only variant: served entirely from idx_scheduled_posts_status_at.
+        horizon = epoch_seconds(now or time.time()) + within_seconds
+        return self.conn.execute(SQL_DUE_IDS, (status, horizon, limit)).fetchall()
+
+    def month_range(self, year, month):
+        # The month in the display zone as [start, end) epochs
+        start, end = month_bounds(year, month)
+        return self.display_zone.to_epoch(start)[0], self.display_zone.to_epoch(end)[0]
+
+    def archive_tables(self, start=None, end=None):
+        # Archive tables holding posts in [start, end), or all of them
+        if start is None:
+            rows = self.conn.execute(SQL_ARCHIVE_TABLES)
+        else:
+            rows = self.conn.execute(SQL_ARCHIVES_BETWEEN, (end, start))
+        return [row[0] for row in rows]
+
+    def day_range(self, day):
+        # The day in the display zone as [start, end) epochs
+        start = datetime(day.year, day.month, day.day)
+        return (self.display_zone.to_epoch(start)[0],
+                self.display_zone.to_epoch(start + timedelta(days=1))[0])
+
+    def posts_in_month(self, year, month, profile_id=None):
+        return self.posts_between(*self.month_range(year, month), profile_id=profile_id)
+
+    def posts_on_day(self, day):
+        return self.posts_between(*self.day_range(day))
+
+    def posts_between(self, start, end, profile_id=None):
+        # Posts scheduled in [start, end) epochs, archived ones included
+        archives = self.archive_tables(start, end)
+        if not archives:
+            if profile_id is None:
+                return self.conn.execute(SQL_MONTH_POSTS, (start, end)).fetchall()
+            return self.conn.execute(SQL_MONTH_POSTS_PROFILE, (profile_id, start, end)).fetchall()
+        # A range reaching into the past: the same range scan on every
+        # table that has posts in it, merged before the joins
+        where, params = "schedule_at >= ? AND schedule_at < ?", [start, end]
+        if profile_id is not None:
+            where, params = "profile_id = ? AND " + where, [profile_id] + params
+        tables = ["scheduled_posts"] + archives
+        sql = "SELECT " + POST_COLUMNS + " " + ARCHIVE_FROM.format(" UNION ALL ".join(
+            f"SELECT {ARCHIVED_COLUMNS} FROM {table} WHERE {where}" for table in tables
+        )) + "ORDER BY p.schedule_at"
+        return self.conn.execute(sql, params * len(tables)).fetchall()
+
+    def day_platform_counts(self, year, month):
+        # (YYYY-MM-DD, platform, count) for every day of the month with posts
+        start, end = self.month_range(year, month)
+        runs = self.display_zone.segments(start, end)
+        tables = ["scheduled_posts"] + self.archive_tables(start, end)
+        sql = SQL_MONTH_DAY_COUNTS.format(" UNION ALL ".join(
+            SQL_OFFSET_DAY_COUNTS.format(table) for table in tables for _ in runs
+        ))
+        params = [
+            value for _ in tables for start, end, offset in runs for value in (offset, start, end)
+        ]
+        return self.conn.execute(sql, params).fetchall()
+
+    def materialized_occurrences(self, occurrences, start, end):
+        # The (rule_id, occurrence) pairs of ``occurrences`` that have a
+        # post row; archives holding posts in [start, end) epochs included
+        if not occurrences:
+            return set()
+        rule_ids = sorted({rule_id for rule_id, _ in occurrences})
+        keys = [key for _, key in occurrences]
+        tables = ["scheduled_posts"] + self.archive_tables(start, end)
+        sql = " UNION ALL ".join(SQL_MATERIALIZED.format(table) for table in tables)
+        params = (json.dumps(rule_ids), min(keys), max(keys))
+        found = {tuple(row) for row in self.conn.execute(sql, params * len(tables))}
+        return found.intersection(occurrences)
+
+    def explain(self, sql, params=()):
+        return [row[-1] for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
@@ -0,0 +1,113 @@
+"""Local stub of the platform APIs for offline testing and benchmarks.
+
+    python -m socialsync.stub_server --port 8765 --delay 0.01
+
+Every POST is answered with a small JSON body after ``delay`` seconds, on
+keep-alive connections. A request repeating an earlier Idempotency-Key
+gets the earlier answer back and is counted in ``duplicates``.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+
+
+class StubServer:
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, throttle_rate=0.0):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.throttle_rate = throttle_rate
+        self.requests = 0
+        self.duplicates = 0
+        self.connections = 0
+        self.answered = {}  # idempotency key -> (status, headers, payload)
+        self.ids = itertools.count(1)
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def respond(self, method, path, headers, body):
+        # Returns (status, extra headers, payload); override for custom behaviour.
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            return 429, {"Retry-After": "1"}, {"error": "rate limited"}
+        return 200, {}, {"id": next(self.ids), "path": path}
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readuntil(b"\r\n")
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readuntil(b"\r\n")
+                    if line == b"\r\n":
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                key = headers.get("idempotency-key")
+                if key in self.answered:
+                    self.duplicates += 1
+                    status, extra, payload = self.answered[key]
+                else:
+                    status, extra, payload = self.respond(method, path, headers, body)
+                    if key and status < 400:
+                        self.answered[key] = (status, extra, payload)
+                data = json.dumps(payload).encode("utf-8")
+                lines = [
+                    f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}",
+                    "Content-Type: application/json",
+                    f"Content-Length: {len(data)}",
+                ]
+                lines.extend(f"{k}: {v}" for k, v in extra.items())
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def serve(host, port, delay, throttle_rate=0.0):
+    server = await StubServer(host, port, delay, throttle_rate).start()
+    print(f"stub platform API listening on {server.base_url}")
+    await server.server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the local platform API stub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 429")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.delay, args.throttle_rate))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""IANA time zones with cached UTC offset transition tables.
+
+Posts are stored twice: ``schedule_at`` is the instant as UTC epoch
+seconds, which the dispatcher range-scans, and ``schedule_date`` is the
+wall-clock time in the profile's zone, which recurrence, cadence and
+engagement reason about. A ZoneTable converts between the two. It keeps
+the zone's offset changes as a sorted list of epochs, built once per
+span of years, so each conversion is a bisect rather than a tzinfo call.
+
+Wall times that a DST change skips or repeats are resolved when the post
+is created, never later:
+
+- A skipped time (a gap) moves forward by the length of the gap, so
+  2:30 AM on a spring-forward night becomes 3:30 AM.
+- A repeated time (an overlap) is the first of the two, the earlier
+  instant.
+"""
+
+import bisect
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from dateutil import tz
+
+EPOCH = datetime(1970, 1, 1)
+DAY = 86400
+# Every zone's offset lies within these bounds (seconds east of UTC)
+MIN_OFFSET = -12 * 3600
+MAX_OFFSET = 14 * 3600
+
+# How to_epoch resolved a wall time that DST skips or repeats
+GAP = "gap"
+OVERLAP = "overlap"
+
+
+def get_zone(name=None):
+    """tzinfo for an IANA name, or the system zone for None/""."""
+    zone = tz.gettz(name or None)
+    if zone is None:
+        raise ValueError(f"Unknown time zone {name!r}")
+    return zone
+
+
+def epoch_seconds(value):
+    # datetime (naive = system local time, as datetime.timestamp has it)
+    # or a number that already is epoch seconds
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+def wall_seconds(local):
+    return (local.replace(tzinfo=None) - EPOCH) // timedelta(seconds=1)
+
+
+class ZoneTable:
+    """UTC offsets of one zone as a bisectable transition table.
+
+    The table covers whole calendar years and grows on demand. Offsets
+    are probed daily and each change is then narrowed to the second, so
+    a zone that changed twice within one day would be missed; no real
+    zone does.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.tzinfo = get_zone(name)
+        self.lock = threading.Lock()
+        self.first_year = self.last_year = None
+        self.start = self.end = 0  # epochs covered, [start, end)
+        # (transitions, offsets): epochs where the offset changes, and
+        # offsets[i] holding before transitions[i], the last one after all.
+        # Replaced as one tuple so lock-free readers never mix two builds.
+        self.table = [], []
+
+    def __repr__(self):
+        return f"<ZoneTable {self.name or 'local'} {self.first_year}-{self.last_year}>"
+
+    # Table construction
+
+    def probe(self, epoch):
+        return int(datetime.fromtimestamp(epoch, self.tzinfo).utcoffset().total_seconds())
+
+    def cover(self, epoch):
+        if self.start <= epoch < self.end:
+            return
+        year = (EPOCH + timedelta(seconds=epoch)).year
+        with self.lock:
+            if self.start <= epoch < self.end:
+                return
+            if self.first_year is None:
+                first, last = year - 1, year + 1
+            else:
+                first, last = min(year, self.first_year), max(year, self.last_year)
+            self.build(first, last)
+
+    def build(self, first_year, last_year):
+        start = wall_seconds(datetime(first_year, 1, 1)) - DAY
+        end = wall_seconds(datetime(last_year + 1, 1, 1)) + DAY
+        transitions = []
+        offsets = [self.probe(start)]
+        t = start
+        while t < end:
+            step = min(DAY, end - t)
+            offset = self.probe(t + step)
+            if offset != offsets[-1]:
+                # Narrow the change down to the first second of the new offset
+                lo, hi = t, t + step
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    if self.probe(mid) == offsets[-1]:
+                        lo = mid
+                    else:
+                        hi = mid
+                transitions.append(hi)
+                offsets.append(offset)
+            t += step
+        # Publish the table before the bounds that let readers skip the lock
+        self.table = transitions, offsets
+        self.first_year, self.last_year = first_year, last_year
+        self.start, self.end = start + DAY, end - DAY
+
+    # Conversions
+
+    def offset_at(self, epoch):
+        self.cover(epoch)
+        transitions, offsets = self.table
+        return offsets[bisect.bisect_right(transitions, epoch)]
+
+    def to_local(self, epoch):
+        """Naive wall-clock datetime for an epoch."""
+        return EPOCH + timedelta(seconds=epoch + self.offset_at(epoch))
+
+    def to_epoch(self, local):
+        """(epoch, resolution) for a wall-clock time in this zone.
+
+        resolution is None, GAP or OVERLAP; see the module docstring for
+        how the latter two are resolved. Aware datetimes are exact.
+        """
+        if local.tzinfo is not None:
+            return int(local.timestamp()), None
+        wall = wall_seconds(local)
+        # Every instant that shows this wall time lies in this window
+        self.cover(wall - MAX_OFFSET)
+        self.cover(wall - MIN_OFFSET)
+        transitions, offsets = self.table
+        lo = bisect.bisect_right(transitions, wall - MAX_OFFSET)
+        hi = bisect.bisect_right(transitions, wall - MIN_OFFSET)
+        if lo == hi:
+            # No offset change anywhere near: the usual case
+            return wall - offsets[lo], None
+        candidates = sorted({
+            wall - offset for offset in offsets[lo:hi + 1]
+            if self.offset_at(wall - offset) == offset
+        })
+        if len(candidates) == 1:
+            return candidates[0], None
+        if candidates:
+            return candidates[0], OVERLAP
+        for i in range(lo, hi):
+            before, after = offsets[i], offsets[i + 1]
+            if transitions[i] + before <= wall < transitions[i] + after:
+                return wall - before, GAP
+        raise AssertionError(f"{local} neither exists nor falls in a gap in {self.name}")
+
+    def segments(self, start, end):
+        """(from, to, offset) runs of constant offset covering [start, end)."""
+        self.cover(start)
+        self.cover(end)
+        transitions, offsets = self.table
+        runs = []
+        i = bisect.bisect_right(transitions, start)
+        while start < end:
+            stop = min(end, transitions[i]) if i < len(transitions) else end
+            runs.append((start, stop, offsets[i]))
+            start, i = stop, i + 1
+        return runs
+
+
+def zone_table(name=None):
+    """Shared ZoneTable per zone name; None (or "") is the system zone."""
+    return cached_zone_table(name or None)
+
+
+@lru_cache(maxsize=None)
+def cached_zone_table(name):
+    return ZoneTable(name)
@@ -0,0 +1,318 @@
+"""Opt-in timing of Tk callbacks and detection of main-loop stalls.
+
+Tk calls back into Python through tkinter.CallWrapper: button commands,
+event bindings, variable traces and after()/after_idle() alike. install()
+swaps in a timed subclass, so every callback registered afterwards is
+measured. Install it before the widgets are built.
+
+Each callback gets a log-bucketed duration histogram (p50/p99/max). A
+watchdog thread watches the main thread from outside:
+
+- A callback still running after ``slow_ms`` has the main thread's stack
+  sampled, which shows where it is spending the time.
+- A heartbeat rescheduled with after() every ``heartbeat_ms`` stops while
+  the loop is blocked; no beat for ``stall_ms`` is recorded as a stall,
+  with a stack, even when the time goes to Tcl rather than to a callback.
+
+The results can be written as a JSON summary, or as a Chrome trace to
+open in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import json
+import math
+import sys
+import threading
+import time
+import tkinter
+import traceback
+from collections import deque
+
+SLOW_MS = 50
+STALL_MS = 250
+HEARTBEAT_MS = 50
+WATCH_INTERVAL = 0.02
+MAX_EVENTS = 200000
+MAX_RECORDS = 1000
+STACK_LIMIT = 40
+
+# Histogram buckets grow by RATIO, so percentiles are within 5%
+RATIO = 1.05
+LOG_RATIO = math.log(RATIO)
+BASE = 1e-6
+LOOP_LAG = "(event loop lag)"
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        index = int(math.log(seconds / BASE) / LOG_RATIO) if seconds > BASE else 0
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile, in seconds."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(BASE * RATIO ** (index + 1), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+def callback_target(func):
+    """The function behind a Tk callback, looking through tkinter's wrappers."""
+    for _ in range(5):
+        code = getattr(func, "__code__", None)
+        # after() registers a local closure that calls the real function
+        if code is not None and code.co_name == "callit" and "func" in code.co_freevars:
+            func = func.__closure__[code.co_freevars.index("func")].cell_contents
+        elif code is None and hasattr(func, "func"):
+            func = func.func  # functools.partial
+        else:
+            break
+    return func
+
+
+def callback_name(func):
+    func = getattr(func, "__func__", func)
+    name = getattr(func, "__qualname__", None) or type(func).__qualname__
+    code = getattr(func, "__code__", None)
+    if code is not None and "<lambda>" in name:
+        return f"{name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+    return name
+
+
+class Running:
+    __slots__ = ("name", "start", "stack")
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.stack = None
+
+
+class LoopMonitor:
+    """Callback histograms, slow callbacks and stalls of one Tk main loop."""
+
+    def __init__(self, slow_ms=SLOW_MS, stall_ms=STALL_MS, heartbeat_ms=HEARTBEAT_MS):
+        self.slow = slow_ms / 1000
+        self.stall_after = stall_ms / 1000
+        self.heartbeat_ms = heartbeat_ms
+        self.origin = time.perf_counter()
+        self.stats = {}
+        self.names = {}
+        self.events = deque(maxlen=MAX_EVENTS)  # (name, start, duration)
+        self.slow_calls = deque(maxlen=MAX_RECORDS)
+        self.stalls = deque(maxlen=MAX_RECORDS)
+        self.running = []  # callbacks on the main thread's stack, outermost first
+        self.lock = threading.Lock()
+        self.root = None
+        self.main_ident = threading.main_thread().ident
+        self.last_beat = None
+        self.stall = None
+        self.beat_id = None
+        self.stop_event = threading.Event()
+        self.watchdog = None
+        self.original_wrapper = None
+
+    # Setup
+
+    def install(self):
+        """Time every Tk callback registered from now on."""
+        if self.original_wrapper is not None:
+            return
+        self.original_wrapper = tkinter.CallWrapper
+        monitor = self
+
+        class TimedCallWrapper(self.original_wrapper):
+            def __call__(self, *args):
+                return monitor.call(self, args)
+
+        tkinter.CallWrapper = TimedCallWrapper
+
+    def uninstall(self):
+        # Callbacks registered while installed stay timed
+        if self.original_wrapper is not None:
+            tkinter.CallWrapper = self.original_wrapper
+            self.original_wrapper = None
+
+    def start(self, root):
+        """Start the heartbeat on root and the watchdog thread."""
+        self.root = root
+        self.last_beat = time.perf_counter()
+        self.beat_id = root.after(self.heartbeat_ms, self.beat)
+        self.stop_event.clear()
+        self.watchdog = threading.Thread(target=self.watch, name="tk-watchdog", daemon=True)
+        self.watchdog.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.watchdog is not None:
+            self.watchdog.join()
+            self.watchdog = None
+        if self.root is not None and self.beat_id is not None:
+            try:
+                self.root.after_cancel(self.beat_id)
+            except tkinter.TclError:
+                pass  # root already destroyed
+        self.beat_id = None
+        self.close_stall(time.perf_counter())
+
+    # Main thread
+
+    def call(self, wrapper, args):
+        func = callback_target(wrapper.func)
+        if getattr(func, "__self__", None) is self:
+            return self.original_call(wrapper, args)  # the heartbeat
+        # Lambdas and bound methods are new objects each time; their code is not
+        key = getattr(getattr(func, "__func__", func), "__code__", func)
+        name = self.names.get(key)
+        if name is None:
+            name = self.names[key] = callback_name(func)
+        entry = Running(name, time.perf_counter())
+        running = self.running
+        running.append(entry)
+        try:
+            return self.original_call(wrapper, args)
+        finally:
+            duration = time.perf_counter() - entry.start
+            running.pop()
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = Histogram()
+            stats.add(duration)
+            self.events.append((name, entry.start, duration))
+            if duration >= self.slow:
+                self.slow_calls.append({
+                    "callback": name,
+                    "at_ms": round((entry.start - self.origin) * 1000, 3),
+                    "duration_ms": round(duration * 1000, 3),
+                    "stack": entry.stack,
+                })
+
+    def original_call(self, wrapper, args):
+        return self.original_wrapper.__call__(wrapper, *args)
+
+    def beat(self):
+        now = time.perf_counter()
+        lag = now - self.last_beat - self.heartbeat_ms / 1000
+        stats = self.stats.get(LOOP_LAG)
+        if stats is None:
+            stats = self.stats[LOOP_LAG] = Histogram()
+        stats.add(max(lag, 0.0))
+        self.last_beat = now
+        self.close_stall(now)
+        self.beat_id = self.root.after(self.heartbeat_ms, self.beat)
+
+    def close_stall(self, now):
+        with self.lock:
+            stall, self.stall = self.stall, None
+        if stall is not None:
+            stall["duration_ms"] = round((now - stall.pop("start")) * 1000, 3)
+            self.stalls.append(stall)
+
+    # Watchdog thread
+
+    def sample(self):
+        frame = sys._current_frames().get(self.main_ident)
+        if frame is None:
+            return None
+        # The monitor's own frames are the same in every stack
+        stack = [entry for entry in traceback.extract_stack(frame, limit=STACK_LIMIT)
+                 if entry.filename != __file__]
+        return [line.rstrip() for line in traceback.format_list(stack)]
+
+    def watch(self):
+        while not self.stop_event.wait(WATCH_INTERVAL):
+            now = time.perf_counter()
+            try:
+                outer = self.running[0]
+            except IndexError:
+                outer = None
+            if outer is not None and outer.stack is None and now - outer.start >= self.slow:
+                outer.stack = self.sample()
+            last_beat = self.last_beat
+            if now - last_beat >= self.stall_after:
+                with self.lock:
+                    if self.stall is None and self.last_beat == last_beat:
+                        self.stall = {
+                            "start": last_beat,
+                            "at_ms": round((last_beat - self.origin) * 1000, 3),
+                            "callback": outer.name if outer is not None else None,
+                            "stack": self.sample(),
+                        }
+
+    # Reports
+
+    def summary(self):
+        callbacks = {name: stats.summary() for name, stats in self.stats.items()}
+        return {
+            "slow_ms": self.slow * 1000,
+            "stall_ms": self.stall_after * 1000,
+            "callbacks": dict(sorted(callbacks.items(), key=lambda item: -item[1]["p99_ms"])),
+            "slow_callbacks": list(self.slow_calls),
+            "stalls": list(self.stalls),
+        }
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def chrome_trace(self):
+        """Trace Event Format: one complete ("X") event per callback and stall."""
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "Tk main loop"}},
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": 2, "args": {"name": "stalls"}},
+        ]
+        for name, start, duration in self.events:
+            events.append({
+                "name": name, "cat": "callback", "ph": "X", "pid": 1, "tid": 1,
+                "ts": round((start - self.origin) * 1e6, 1),
+                "dur": round(duration * 1e6, 1),
+            })
+        for record in self.slow_calls:
+            events.append({
+                "name": f"slow: {record['callback']}", "cat": "slow", "ph": "i", "s": "t",
+                "pid": 1, "tid": 1, "ts": record["at_ms"] * 1000,
+                "args": {"duration_ms": record["duration_ms"], "stack": record["stack"]},
+            })
+        for stall in self.stalls:
+            events.append({
+                "name": "stall", "cat": "stall", "ph": "X", "pid": 1, "tid": 2,
+                "ts": stall["at_ms"] * 1000, "dur": stall["duration_ms"] * 1000,
+                "args": {"callback": stall["callback"], "stack": stall["stack"]},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def report(self, limit=15):
+        lines = [f"{'callback':48} {'count':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+        for name, row in list(self.summary()["callbacks"].items())[:limit]:
+            lines.append(f"{name[:48]:48} {row['count']:7d} {row['p50_ms']:8.2f} "
+                         f"{row['p99_ms']:8.2f} {row['max_ms']:8.2f}")
+        lines.append(f"{len(self.slow_calls)} callbacks over {self.slow * 1000:g} ms, "
+                     f"{len(self.stalls)} stalls over {self.stall_after * 1000:g} ms")
+        return "\n".join(lines)
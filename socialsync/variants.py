@@ -0,0 +1,256 @@
+"""Per-platform media variants rendered on a process pool.
+
+Every platform gets a copy of the source media that fits its constraints
+(aspect ratio, resolution, file size, format). Variants are keyed by the
+source content hash plus the effective spec, so platforms with identical
+specs share one render, and outputs are stored content-addressed on disk
+so re-scheduling the same asset costs nothing.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+from socialsync.media import MediaError, content_hash, media_kind
+
+DEFAULT_VARIANT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "socialsync", "variants")
+
+
+class VariantSpec:
+    def __init__(self, aspect=None, max_size=(1080, 1080), max_bytes=5 * 1024 ** 2,
+                 image_format="JPEG", max_duration=None):
+        # aspect: (min, max) width/height ratio the output must fall within
+        self.aspect = aspect
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.image_format = image_format
+        self.max_duration = max_duration
+
+    def key(self, kind="image"):
+        # Only the fields that affect the output for this kind of media
+        if kind == "image":
+            return (self.aspect, self.max_size, self.max_bytes, self.image_format)
+        return (self.aspect, self.max_size, self.max_duration)
+
+
+PLATFORM_SPECS = {
+    "Facebook": VariantSpec(None, (2048, 2048), 4 * 1024 ** 2, max_duration=240 * 60),
+    "Twitter": VariantSpec(None, (4096, 4096), 5 * 1024 ** 2, max_duration=140),
+    "Instagram": VariantSpec((0.8, 1.91), (1080, 1350), 8 * 1024 ** 2, max_duration=90),
+    "LinkedIn": VariantSpec((1.91, 1.91), (1200, 627), 5 * 1024 ** 2, max_duration=600),
+    "TikTok": VariantSpec((0.5625, 0.5625), (1080, 1920), 5 * 1024 ** 2, max_duration=600),
+    "YouTube": VariantSpec((1.7778, 1.7778), (1280, 720), 2 * 1024 ** 2),
+    "Pinterest": VariantSpec((0.6667, 0.6667), (1000, 1500), 20 * 1024 ** 2, max_duration=300),
+    "Snapchat": VariantSpec((0.5625, 0.5625), (1080, 1920), 5 * 1024 ** 2, max_duration=60),
+    "RedNote": VariantSpec((0.75, 0.75), (1080, 1440), 5 * 1024 ** 2, max_duration=900),
+    "Lemon8": VariantSpec((0.75, 0.75), (1080, 1440), 5 * 1024 ** 2, max_duration=180),
+}
+
+JPEG_QUALITIES = (90, 85, 80, 75, 70, 60, 50, 40)
+
+
+def variant_key(source_hash, kind, spec):
+    return hashlib.blake2b(
+        repr((source_hash, spec.key(kind))).encode(), digest_size=16
+    ).hexdigest()
+
+
+# Rendering; these run inside worker processes
+
+def crop_to_aspect(img, aspect):
+    low, high = aspect
+    ratio = img.width / img.height
+    if ratio > high:
+        width = round(img.height * high)
+        left = (img.width - width) // 2
+        return img.crop((left, 0, left + width, img.height))
+    if ratio < low:
+        height = round(img.width / low)
+        top = (img.height - height) // 2
+        return img.crop((0, top, img.width, top + height))
+    return img
+
+
+def render_image(source_path, spec):
+    with Image.open(source_path) as img:
+        img.draft("RGB", spec.max_size)
+        img = ImageOps.exif_transpose(img)
+        if spec.aspect:
+            img = crop_to_aspect(img, spec.aspect)
+        img.thumbnail(spec.max_size, Image.LANCZOS, reducing_gap=3.0)
+        if spec.image_format == "JPEG" and img.mode != "RGB":
+            img = img.convert("RGB")
+
+        # Step quality down until the file fits, then shrink as a last resort
+        while True:
+            for quality in JPEG_QUALITIES:
+                buffer = io.BytesIO()
+                img.save(buffer, spec.image_format, quality=quality, optimize=True)
+                if buffer.tell() <= spec.max_bytes:
+                    return buffer.getvalue(), spec.image_format.lower().replace("jpeg", "jpg")
+            if min(img.size) < 64:
+                raise MediaError("Could not fit image under the size limit")
+            img = img.resize((img.width * 3 // 4, img.height * 3 // 4), Image.LANCZOS)
+
+
+def render_video(source_path, spec, output_path):
+    if not shutil.which("ffmpeg"):
+        raise MediaError("ffmpeg is required to prepare video variants")
+    width, height = spec.max_size
+    filters = []
+    if spec.aspect:
+        target = spec.aspect[0]
+        filters.append(
+            f"crop='min(iw,ih*{target})':'min(ih,iw/{target})'"
+        )
+    filters.append(f"scale='min({width},iw)':'min({height},ih)':force_original_aspect_ratio=decrease")
+    filters.append("scale=trunc(iw/2)*2:trunc(ih/2)*2")
+    command = ["ffmpeg", "-v", "error", "-y", "-i", source_path, "-vf", ",".join(filters),
+               "-c:v", "libx264", "-preset", "veryfast", "-crf", "23",
+               "-c:a", "aac", "-movflags", "+faststart"]
+    if spec.max_duration:
+        command += ["-t", str(spec.max_duration)]
+    try:
+        subprocess.run(command + [output_path], capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise MediaError(f"ffmpeg failed: {e.stderr.decode(errors='replace')[-200:]}") from e
+
+
+def render_variant(source_path, kind, spec, directory):
+    """Render one variant into the content-addressed store; returns its path."""
+    if kind == "image":
+        data, ext = render_image(source_path, spec)
+    else:
+        fd, tmp = tempfile.mkstemp(suffix=".mp4", dir=directory)
+        os.close(fd)
+        try:
+            render_video(source_path, spec, tmp)
+            with open(tmp, "rb") as f:
+                data = f.read()
+        finally:
+            os.remove(tmp)
+        ext = "mp4"
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    path = os.path.join(directory, "objects", f"{digest}.{ext}")
+    if not os.path.exists(path):
+        write_atomic(path, data)
+    return path
+
+
+def write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class VariantCache:
+    """``index/<variant key>`` files pointing at ``objects/<content hash>``."""
+
+    def __init__(self, directory=DEFAULT_VARIANT_DIR):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "index"), exist_ok=True)
+
+    def index_path(self, key):
+        return os.path.join(self.directory, "index", key)
+
+    def get(self, key):
+        try:
+            with open(self.index_path(key)) as f:
+                path = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return path if os.path.exists(path) else None
+
+    def put(self, key, path):
+        write_atomic(self.index_path(key), path.encode())
+
+
+class MediaPreparer:
+    """Prepares platform variants of media files using every core."""
+
+    def __init__(self, cache=None, workers=None, specs=None):
+        self.cache = cache or VariantCache()
+        self.specs = specs or PLATFORM_SPECS
+        self.workers = workers or os.cpu_count()
+        self.pool = None
+        self.lock = threading.Lock()
+        self.hashes = {}
+
+    def executor(self):
+        # Started on first use so idle GUIs do not pay for worker processes
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self.pool
+
+    def source_hash(self, path):
+        stat = os.stat(path)
+        cache_key = (path, stat.st_size, stat.st_mtime_ns)
+        if cache_key not in self.hashes:
+            self.hashes[cache_key] = content_hash(path)
+        return self.hashes[cache_key]
+
+    def submit(self, items):
+        """Start rendering for ``[(path, platforms), ...]``.
+
+        Returns ``(results, futures)``: ``results`` maps (path, platform) to
+        a cached variant path, ``futures`` maps (path, platform) to a future
+        for the variants that still have to be rendered. Identical
+        (source, spec) pairs share one future.
+        """
+        results = {}
+        futures = {}
+        by_key = {}
+        for path, platforms in items:
+            kind = media_kind(path)
+            if kind is None:
+                raise MediaError(f"Unsupported file type: {os.path.basename(path)}")
+            source = self.source_hash(path)
+            for platform in platforms:
+                spec = self.specs.get(platform)
+                if spec is None:
+                    results[(path, platform)] = path
+                    continue
+                key = variant_key(source, kind, spec)
+                cached = self.cache.get(key)
+                if cached:
+                    results[(path, platform)] = cached
+                    continue
+                if key not in by_key:
+                    future = self.executor().submit(
+                        render_variant, path, kind, spec, self.cache.directory
+                    )
+                    future.add_done_callback(self.indexer(key))
+                    by_key[key] = future
+                futures[(path, platform)] = by_key[key]
+        return results, futures
+
+    def indexer(self, key):
+        def done(future):
+            if future.exception() is None:
+                self.cache.put(key, future.result())
+        return done
+
+    def prepare_many(self, items):
+        results, futures = self.submit(items)
+        for item, future in futures.items():
+            results[item] = future.result()
+        return results
+
+    def prepare(self, path, platforms):
+        results = self.prepare_many([(path, platforms)])
+        return {platform: results[(path, platform)] for platform in platforms}
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None